@@ -1,15 +1,11 @@
 # auth_admin/services.py
 from config.supabase_client import supabase # Import supabase instance
 from typing import Dict, Optional, Any
-# (QUAN TRỌNG) Import Argon2
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError # Lỗi khi xác thực sai
+# (QUAN TRỌNG) Argon2 chạy trong process pool giới hạn (config/password_pool.py)
+from config.password_pool import verify_argon2, PasswordPoolBusy
 
 ADMIN_TABLE = 'admins' # Tên bảng admin
 
-# Tạo một instance của PasswordHasher để sử dụng lại
-ph = PasswordHasher()
-
 class AuthAdminService:
     """Service layer for handling admin authentication"""
 
@@ -50,17 +46,13 @@ class AuthAdminService:
             # --- PHẦN KIỂM TRA PASSWORD (SỬ DỤNG ARGON2) ---
             is_password_valid = False # Đặt mặc định là không hợp lệ
             try:
-                # ph.verify() nhận vào hash (string) và password (string)
-                # Nếu khớp: hàm chạy thành công
-                # Nếu không khớp: ném ra lỗi VerifyMismatchError
-                ph.verify(stored_password_hash, password)
-                
-                # Nếu không có lỗi, mật khẩu là đúng
-                is_password_valid = True 
+                # verify_argon2() nhận vào hash (string) và password (string)
+                # Trả về True nếu khớp, False nếu không khớp
+                is_password_valid = verify_argon2(stored_password_hash, password)
                 
-            except VerifyMismatchError:
-                # Lỗi này có nghĩa là password KHÔNG khớp
-                is_password_valid = False
+            except PasswordPoolBusy:
+                # Hàng đợi kiểm tra mật khẩu đầy -> để view trả 503
+                raise
             except Exception as e:
                 # Bắt các lỗi Argon2 khác (ví dụ: hash không hợp lệ)
                 print(f"AuthAdminService: Argon2 verification error for {email}: {e}")
@@ -77,6 +69,8 @@ class AuthAdminService:
                 # Sai password
                 return None
 
+        except PasswordPoolBusy:
+            raise
         except Exception as e:
             print(f"AuthAdminService: Error during authentication for {email}: {e}")
             return None # Trả về None nếu có lỗi chung xảy ra
\ No newline at end of file
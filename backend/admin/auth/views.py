@@ -1,6 +1,7 @@
 # auth_admin/views.py
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .serializers import AdminTokenObtainPairSerializer # Import serializer tùy chỉnh
+from config.rate_limit import scoped_throttle
 
 class AdminTokenObtainPairView(TokenObtainPairView):
     """
@@ -8,6 +9,7 @@ class AdminTokenObtainPairView(TokenObtainPairView):
     Sử dụng serializer tùy chỉnh để xác thực qua bảng 'admins'.
     """
     serializer_class = AdminTokenObtainPairSerializer
+    throttle_classes = [scoped_throttle('admin_login')]
 
 class AdminTokenRefreshView(TokenRefreshView):
     """
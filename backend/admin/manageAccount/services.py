@@ -1,5 +1,7 @@
 # account/services.py
 from config.supabase_client import supabase # Import supabase instance
+from student.login.accounts import forget_unknown_login # Cache email đăng nhập không tồn tại
+from student.dashboard.cache import invalidate_account # Cache dashboard/bootstrap (user_name, image_path)
 from typing import Dict, List, Optional, Any
 import math
 
@@ -77,6 +79,7 @@ class AccountService:
             # Insert trả về data là list chứa object vừa tạo
             if response.data and len(response.data) > 0:
                  created_account = response.data[0]
+                 forget_unknown_login(email=created_account.get('email'))
                  # Xóa password khỏi dữ liệu trả về
                  created_account.pop('password', None) 
                  return {'success': True, 'data': created_account}
@@ -118,6 +121,8 @@ class AccountService:
 
             if response.data and len(response.data) > 0:
                  updated_account = response.data[0]
+                 forget_unknown_login(email=updated_account.get('email'))
+                 invalidate_account(account_id)
                  updated_account.pop('password', None) # Xóa password khỏi response
                  return {'success': True, 'data': updated_account}
             else:
@@ -161,6 +166,7 @@ class AccountService:
 
             # Update thành công thường trả về data (dù có thể không cần)
             if response.data:
+                invalidate_account(account_id)
                 return {'success': True}
             else:
                 # Có thể xảy ra nếu có lỗi mạng giữa check và update
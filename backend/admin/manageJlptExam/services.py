@@ -1,5 +1,6 @@
 # exam/services.py
 from config.supabase_client import supabase # Import supabase instance
+from student.exam.cache import invalidate_exam, invalidate_catalog # Xóa cache đề thi đã biên dịch / danh mục đề (lịch sử bài làm)
 from typing import Dict, List, Optional, Any
 import math
 
@@ -71,6 +72,7 @@ class JlptExamService:
                 .execute()
 
             if response.data and len(response.data) > 0:
+                 invalidate_catalog()
                  return {'success': True, 'data': response.data[0]}
             else:
                  return {'success': False, 'error': 'Failed to create exam, no data returned.'}
@@ -98,6 +100,8 @@ class JlptExamService:
                 .execute()
 
             if response.data and len(response.data) > 0:
+                 invalidate_exam(exam_id)
+                 invalidate_catalog()
                  return {'success': True, 'data': response.data[0]}
             else:
                  # Có thể xảy ra nếu ID không tồn tại hoặc đã bị xóa
@@ -131,6 +135,8 @@ class JlptExamService:
                 .execute()
 
             if response.data:
+                invalidate_exam(exam_id)
+                invalidate_catalog()
                 return {'success': True}
             else:
                 return {'success': False, 'error': 'Failed to soft delete exam.'}
@@ -1,5 +1,6 @@
 # level/services.py
 from config.supabase_client import supabase # Import supabase instance
+from student.exam.cache import invalidate_catalog # Danh mục đề thi (tên level trong lịch sử bài làm)
 from typing import Dict, List, Optional, Any
 import math
 
@@ -98,6 +99,7 @@ class LevelService:
                 .execute()
 
             if response.data and len(response.data) > 0:
+                 invalidate_catalog()
                  return {'success': True, 'data': response.data[0]}
             else:
                  # Có thể xảy ra nếu ID không tồn tại hoặc đã bị xóa
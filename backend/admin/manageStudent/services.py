@@ -3,6 +3,8 @@ Business logic for student operations in admin panel
 Handles all Supabase queries for student-related functionality
 """
 from config.supabase_client import supabase
+from student.login.accounts import forget_unknown_login # Cache mã học viên/email đăng nhập không tồn tại
+from student.dashboard.cache import invalidate_student # Cache dashboard/bootstrap của học viên
 from typing import Dict, List, Optional
 import uuid
 from django.contrib.auth.hashers import make_password
@@ -71,6 +73,8 @@ class StudentService:
             response = supabase.table('students')\
                 .insert(student_data)\
                 .execute()
+            for student in response.data or []:
+                forget_unknown_login(student_id=student.get('id'))
             
             return {
                 'success': True,
@@ -90,6 +94,9 @@ class StudentService:
                 .update(student_data)\
                 .eq('id', student_id)\
                 .execute()
+            # Học viên có thể vừa được liên kết tài khoản
+            forget_unknown_login(student_id=student_id)
+            invalidate_student(student_id)
             
             return {
                 'success': True,
@@ -109,6 +116,7 @@ class StudentService:
                 .update({'deleted_at': 'now()'})\
                 .eq('id', student_id)\
                 .execute()
+            invalidate_student(student_id)
             
             return {
                 'success': True,
@@ -382,6 +390,7 @@ class StudentService:
                 .execute()
             
             if response.data and len(response.data) > 0:
+                forget_unknown_login(email=account_insert_data.get('email'))
                 return {
                     'success': True,
                     'data': {'account_id': account_id}
@@ -579,6 +588,7 @@ class StudentService:
                     .execute()
                 if student_response.data and len(student_response.data) > 0:
                     created_student = student_response.data[0]
+                    forget_unknown_login(student_id=student_id)
                     results['data'].append(created_student)
                     results['success_count'] += 1
                 else:
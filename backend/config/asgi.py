@@ -2,6 +2,12 @@
 ASGI config for samurai_app_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is the production entry point (see Procfile): the read endpoints are async
+views (config/async_views.py) that await Supabase on the event loop, so one
+process keeps many requests in flight. Sync views still work; Django runs each
+of them in a worker thread.
+
+    uvicorn config.asgi:application --host 0.0.0.0 --port $PORT --workers 2
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
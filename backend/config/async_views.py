@@ -0,0 +1,91 @@
+"""
+Async DRF views (handlers awaited on the event loop under ASGI)
+
+DRF 3.16 dispatches synchronously, so APIView / @api_view cannot run
+`async def` handlers. AsyncAPIView keeps DRF's request parsing, authentication,
+permissions, throttling, exception handling and rendering, and only changes
+how the handler runs:
+    - initial() (authentication, permissions, throttles: JWT decode plus
+      Redis / cached Supabase lookups) runs in a worker thread, off the loop
+    - the handler is awaited on the event loop, so its Supabase calls
+      (config/supabase_client.get_async_supabase_client) do not hold a thread
+
+Under WSGI the views still work: Django runs each one in its own event loop.
+
+Usage:
+    class LevelsView(AsyncAPIView):
+        async def get(self, request): ...
+
+    @async_api_view(['GET'])
+    @authentication_classes([StudentJWTAuthentication])
+    async def get_exam_history(request): ...
+"""
+import inspect
+from typing import Callable, List, Optional
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """APIView whose HTTP handlers are coroutines"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial, thread_sensitive=False)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            # options() / http_method_not_allowed() are synchronous
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def async_api_view(http_method_names: Optional[List[str]] = None) -> Callable:
+    """
+    @api_view for `async def` function views. Reads the same policy decorators
+    (@authentication_classes, @throttle_classes, @permission_classes, ...),
+    which must be placed below it.
+    """
+    http_method_names = ['GET'] if http_method_names is None else http_method_names
+
+    def decorator(func):
+        WrappedAPIView = type('WrappedAPIView', (AsyncAPIView,), {'__doc__': func.__doc__})
+
+        allowed_methods = set(http_method_names) | {'options'}
+        WrappedAPIView.http_method_names = [method.lower() for method in allowed_methods]
+
+        async def handler(self, *args, **kwargs):
+            return await func(*args, **kwargs)
+
+        for method in http_method_names:
+            setattr(WrappedAPIView, method.lower(), handler)
+
+        WrappedAPIView.__name__ = func.__name__
+        WrappedAPIView.__module__ = func.__module__
+
+        WrappedAPIView.renderer_classes = getattr(func, 'renderer_classes', APIView.renderer_classes)
+        WrappedAPIView.parser_classes = getattr(func, 'parser_classes', APIView.parser_classes)
+        WrappedAPIView.authentication_classes = getattr(func, 'authentication_classes', APIView.authentication_classes)
+        WrappedAPIView.throttle_classes = getattr(func, 'throttle_classes', APIView.throttle_classes)
+        WrappedAPIView.permission_classes = getattr(func, 'permission_classes', APIView.permission_classes)
+        WrappedAPIView.schema = getattr(func, 'schema', APIView.schema)
+
+        return WrappedAPIView.as_view()
+
+    return decorator
@@ -0,0 +1,92 @@
+"""
+Bounded thread pool for fanning out independent Supabase (PostgREST) queries
+
+Every Supabase call is a blocking HTTP round-trip, so queries that do not depend
+on each other can be sent at the same time and joined afterwards. The pool is
+shared by the whole process and capped by SUPABASE_QUERY_WORKERS so a burst of
+requests cannot open an unbounded number of connections.
+
+Async code (async services under ASGI) uses gather_parallel() instead: the
+queries run on the event loop, no thread is involved.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional
+from django.conf import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_worker_state = threading.local()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'SUPABASE_QUERY_WORKERS', 8),
+                    thread_name_prefix='supabase-query',
+                    initializer=_mark_worker_thread,
+                )
+    return _executor
+
+
+def _mark_worker_thread() -> None:
+    _worker_state.is_worker = True
+
+
+def parallel_enabled() -> bool:
+    """Whether independent queries should be sent concurrently"""
+    return getattr(settings, 'SUPABASE_PARALLEL_QUERIES', True)
+
+
+def run_parallel(*funcs: Callable[[], Any]) -> List[Any]:
+    """
+    Run zero-argument callables concurrently and return their results in order.
+
+    The first exception raised (in argument order) is re-raised in the caller,
+    after every call has finished. Falls back to running the callables one after
+    another when parallel mode is disabled, when there is only one callable, or
+    when called from inside a pool worker (nested fan-out could otherwise
+    exhaust the bounded pool and deadlock).
+    """
+    if len(funcs) < 2 or not parallel_enabled() or getattr(_worker_state, 'is_worker', False):
+        return [func() for func in funcs]
+
+    # Mỗi tác vụ chạy trong bản sao context của caller (query metrics của request, ...)
+    futures = [_get_executor().submit(contextvars.copy_context().run, func) for func in funcs]
+    errors = [future.exception() for future in futures]
+    for error in errors:
+        if error is not None:
+            raise error
+    return [future.result() for future in futures]
+
+
+async def gather_parallel(*awaitables: Awaitable[Any]) -> List[Any]:
+    """
+    Async counterpart of run_parallel: await everything concurrently and return
+    the results in order. The first exception (in argument order) is re-raised
+    after every awaitable has finished. Runs them one after another when
+    parallel mode is disabled.
+    """
+    if not parallel_enabled():
+        results = []
+        for index, awaitable in enumerate(awaitables):
+            try:
+                results.append(await awaitable)
+            except BaseException:
+                # Coroutines that will never run must be closed (no "never awaited" warnings)
+                for pending in awaitables[index + 1:]:
+                    if asyncio.iscoroutine(pending):
+                        pending.close()
+                raise
+        return results
+
+    results = await asyncio.gather(*awaitables, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return list(results)
@@ -3,7 +3,8 @@ Custom middleware to handle BrokenPipeError and other connection errors graceful
 """
 import sys
 import logging
-from django.http import HttpResponse
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.http import HttpResponse, JsonResponse
 
 logger = logging.getLogger(__name__)
 
@@ -12,29 +13,46 @@ class BrokenPipeErrorMiddleware:
     """
     Middleware to catch and suppress BrokenPipeError exceptions.
     This error occurs when client closes connection before server finishes sending response.
+    Sync and async capable (WSGI and ASGI).
     """
+    sync_capable = True
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
         try:
             response = self.get_response(request)
             return response
-        except BrokenPipeError:
+        except Exception as e:
+            return self._handle_error(request, e)
+
+    async def __acall__(self, request):
+        try:
+            return await self.get_response(request)
+        except Exception as e:
+            return self._handle_error(request, e)
+
+    def _handle_error(self, request, e: Exception):
+        if isinstance(e, BrokenPipeError):
             # Client closed connection - this is normal when user reloads page or navigates away
             # Suppress the error to avoid cluttering logs
             logger.debug(f"BrokenPipeError: Client closed connection for {request.path}")
             # Return empty response since client is already gone
             return HttpResponse(status=499)  # 499 Client Closed Request
-        except (ConnectionResetError, ConnectionAbortedError) as e:
+        if isinstance(e, (ConnectionResetError, ConnectionAbortedError)):
             # Similar connection errors
             logger.debug(f"Connection error: {e} for {request.path}")
             return HttpResponse(status=499)
-        except Exception as e:
-            # Log other exceptions but don't suppress them
-            logger.error(f"Unexpected error in middleware: {e}", exc_info=True)
-            raise
+        # Log other exceptions but don't suppress them
+        logger.error(f"Unexpected error in middleware: {e}", exc_info=True)
+        raise e
 
 
 class RequestTimeoutMiddleware:
@@ -58,3 +76,89 @@ class RequestTimeoutMiddleware:
         
         return response
 
+
+
+class ActiveSessionMiddleware:
+    """
+    Rejects student requests whose token session was revoked (device limit).
+
+    The Bearer token is decoded once here and kept on the request
+    (request.student_jwt) for StudentJWTAuthentication; the session check is a
+    single Redis ZSCORE. Requests without a student token, or with a token that
+    does not decode, are left to the views. Login/registration paths are exempt.
+    Tokens issued before STUDENT_SESSION_CHECK_SINCE (rollout of the Redis
+    registry) have no registered session and are not checked.
+    Under ASGI the Redis check runs in a worker thread, off the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        import jwt
+        from django.conf import settings
+        from student.common.authentication import SECRET_KEY
+        from student.login.sessions import session_registry
+        self.get_response = get_response
+        self.jwt = jwt
+        self.secret_key = SECRET_KEY
+        self.registry = session_registry
+        self.enabled = getattr(settings, 'STUDENT_SESSION_CHECK', False)
+        self.check_since = getattr(settings, 'STUDENT_SESSION_CHECK_SINCE', 0)
+        self.path_prefix = getattr(settings, 'STUDENT_SESSION_PATH_PREFIX', '/api/v1/student/')
+        self.exempt_paths = tuple(getattr(settings, 'STUDENT_SESSION_EXEMPT_PATHS', ()))
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        session = self._session_to_check(request)
+        if session and not self._is_active(*session):
+            return self._revoked_response()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        session = self._session_to_check(request)
+        if session and not await sync_to_async(self._is_active, thread_sensitive=False)(*session):
+            return self._revoked_response()
+        return await self.get_response(request)
+
+    def _session_to_check(self, request):
+        """Decode the student token (kept on request.student_jwt); (account_id, jti) to check, or None"""
+        if not self.enabled or not request.path.startswith(self.path_prefix) or request.path.startswith(self.exempt_paths):
+            return None
+        
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return None
+        
+        jwt_token = auth_header.split(' ')[1]
+        try:
+            payload = self.jwt.decode(jwt_token, self.secret_key, algorithms=["HS256"])
+        except self.jwt.InvalidTokenError:
+            return None
+        request.student_jwt = (jwt_token, payload)
+        
+        account_id, jti = payload.get('id'), payload.get('jti')
+        if (payload.get('iat') or 0) < self.check_since:
+            # Token cấp trước khi triển khai registry: chưa có phiên để kiểm tra
+            return None
+        if account_id and jti:
+            return account_id, jti
+        return None
+
+    def _is_active(self, account_id, jti) -> bool:
+        try:
+            return self.registry.is_session_active(account_id, jti)
+        except Exception as e:
+            # Redis down: do not lock every student out
+            logger.error(f"Session check failed: {e}")
+            return True
+
+    @staticmethod
+    def _revoked_response():
+        return JsonResponse(
+            {"error": "Phiên đã bị thu hồi hoặc hết hạn (do giới hạn thiết bị). Vui lòng đăng nhập lại."},
+            status=401
+        )
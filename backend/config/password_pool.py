@@ -0,0 +1,158 @@
+"""
+Bounded process pool for password hashing / verification (Argon2)
+
+Argon2 is deliberately CPU- and memory-hard. Run inline, a burst of logins
+pins every web worker and starves cheap endpoints. Here the work runs in a
+small pool of low-priority (niced) processes, capped at
+PASSWORD_HASH_WORKERS per web process. At most PASSWORD_HASH_MAX_PENDING
+jobs may be queued or running. Beyond that the caller fails fast with
+PasswordPoolBusy, which DRF renders as 503 + Retry-After.
+
+Shared by student login, admin login and password reset:
+    check_password(raw, encoded)   Django hashers (account.password)
+    verify_argon2(encoded, raw)    argon2-cffi PasswordHasher (admins.password)
+    make_password(raw)             Django hashers (new passwords)
+
+The pool is created lazily in each process (after the gunicorn fork) and is
+rebuilt if the process id changes.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordPoolBusy(APIException):
+    """Too many password checks in flight: answered with 503 and Retry-After"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Hệ thống đang bận xử lý đăng nhập, vui lòng thử lại sau giây lát.'
+    default_code = 'password_pool_busy'
+
+    def __init__(self, detail=None, wait: int = 1):
+        super().__init__(detail)
+        # DRF's exception handler turns `wait` into a Retry-After header
+        self.wait = wait
+
+
+# --- Chạy trong tiến trình con ---
+
+def _init_worker(nice: int) -> None:
+    if nice:
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _check_password(password: str, encoded: str) -> bool:
+    from django.contrib.auth.hashers import check_password
+    return check_password(password, encoded)
+
+
+def _make_password(password: str) -> str:
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
+
+
+def _verify_argon2(encoded: str, password: str) -> bool:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerifyMismatchError
+    try:
+        return PasswordHasher().verify(encoded, password)
+    except VerifyMismatchError:
+        return False
+
+
+# --- Phía web worker ---
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_lock = threading.Lock()
+_pending = 0
+
+
+def _enabled() -> bool:
+    return getattr(settings, 'PASSWORD_HASH_POOL', True)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        _executor = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 1),
+            # spawn: children never inherit the web worker's threads, sockets or Supabase client
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(getattr(settings, 'PASSWORD_HASH_NICE', 10),),
+        )
+        _executor_pid = pid
+    return _executor
+
+
+def _release(_future=None) -> None:
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def _run(func: Callable, *args):
+    """Run func(*args) in the pool, or raise PasswordPoolBusy when the queue is full"""
+    global _executor
+    if not _enabled():
+        return func(*args)
+
+    global _pending
+    with _lock:
+        if _pending >= getattr(settings, 'PASSWORD_HASH_MAX_PENDING', 8):
+            raise PasswordPoolBusy()
+        _pending += 1
+        executor = _get_executor()
+    try:
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            _release()
+            raise
+        # The slot is freed when the job really ends, not when this request stops waiting:
+        # a timed-out hash that is already running keeps its slot until the child finishes it
+        future.add_done_callback(_release)
+        try:
+            return future.result(timeout=getattr(settings, 'PASSWORD_HASH_TIMEOUT', 10))
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordPoolBusy()
+    except BrokenProcessPool:
+        # A child died (e.g. OOM): start a fresh pool on the next call
+        with _lock:
+            if _executor is executor:
+                _executor = None
+        raise PasswordPoolBusy()
+
+
+def check_password(password: str, encoded: str) -> bool:
+    """django.contrib.auth.hashers.check_password, off the request thread"""
+    return _run(_check_password, password, encoded)
+
+
+def make_password(password: str) -> str:
+    """django.contrib.auth.hashers.make_password, off the request thread"""
+    return _run(_make_password, password)
+
+
+def verify_argon2(encoded: str, password: str) -> bool:
+    """argon2 PasswordHasher.verify; False on mismatch, other argon2 errors are raised"""
+    return _run(_verify_argon2, encoded, password)
+
+
+def pending() -> int:
+    """Jobs queued or running in this process, timed-out ones included (exposed for benchmarks/metrics)"""
+    return _pending
@@ -0,0 +1,214 @@
+"""
+Pooled direct Postgres connections for hot read paths
+
+settings.DATABASES['default'] points at the Supabase Postgres. Reads that run on
+every exam-day request can go straight to it (student/common/read_repository.py)
+instead of through PostgREST, which saves the HTTP round trip and the JSON
+re-encoding of every row.
+
+    fetch_value(statement, *params)   first column of the first row (or None)
+
+Connections come from a psycopg2 ThreadedConnectionPool (PG_POOL_* settings).
+Callers beyond PG_POOL_MAX_CONNECTIONS wait up to PG_POOL_TIMEOUT seconds for a
+free connection. Connections run in autocommit mode, so every read is a single
+statement / transaction, which is what a PgBouncer / Supavisor pool in
+transaction mode expects.
+
+Statements are written with $1..$n placeholders. With PG_PREPARED_STATEMENTS
+each connection PREPAREs a statement the first time it runs it and EXECUTEs it
+afterwards (the plan is parsed once per server connection). Behind a
+transaction-mode pooler the server connection can change between calls, so a
+missing or duplicate prepared statement is tolerated; leave the setting off
+there unless the pooler keeps prepared statements.
+
+After a fork the child builds its own pool; connections are never shared across
+processes.
+"""
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, List, Optional
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.pool
+from django.conf import settings
+
+from config.query_metrics import record as record_query
+
+_PLACEHOLDER = re.compile(r'\$(\d+)')
+_MISSING = object()
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+class Statement:
+    """Named SQL statement using $1..$n placeholders"""
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql.strip()
+        # Same query for a plain execute: $n -> %(pn)s (a parameter may appear several times)
+        self.client_sql = _PLACEHOLDER.sub(r'%(p\1)s', self.sql)
+
+    def __repr__(self) -> str:
+        return f'<Statement {self.name}>'
+
+
+class _Connection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers the statements it has PREPAREd"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def _connect_kwargs() -> dict:
+    database = _setting('DATABASES', {}).get('default', {})
+    if not database.get('HOST') or not database.get('NAME'):
+        raise ValueError("Missing Postgres credentials in DATABASES['default'] (DB_HOST, DB_NAME, ...)")
+    return {
+        'dbname': database.get('NAME'),
+        'user': database.get('USER'),
+        'password': database.get('PASSWORD'),
+        'host': database.get('HOST'),
+        'port': database.get('PORT') or '5432',
+        'connect_timeout': _setting('PG_CONNECT_TIMEOUT', 5),
+        'application_name': 'jlpt-backend-reads',
+        'keepalives': 1,
+        'connection_factory': _Connection,
+    }
+
+
+class PostgresPool:
+    """
+    Thread-safe connection pool (one per process, created on first use)
+    """
+
+    def __init__(self):
+        self._pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> psycopg2.pool.ThreadedConnectionPool:
+        if self._pid != os.getpid():
+            self.reset()
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    max_connections = _setting('PG_POOL_MAX_CONNECTIONS', 10)
+                    self._slots = threading.BoundedSemaphore(max_connections)
+                    self._pool = psycopg2.pool.ThreadedConnectionPool(
+                        _setting('PG_POOL_MIN_CONNECTIONS', 1),
+                        max_connections,
+                        **_connect_kwargs()
+                    )
+        return self._pool
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; one that failed at the connection level is closed instead of reused"""
+        pool = self._get_pool()
+        slots = self._slots
+        if not slots.acquire(timeout=_setting('PG_POOL_TIMEOUT', 10)):
+            raise psycopg2.pool.PoolError("Postgres pool exhausted (PG_POOL_MAX_CONNECTIONS)")
+        conn = None
+        broken = False
+        try:
+            conn = pool.getconn()
+            if not conn.autocommit:
+                conn.autocommit = True
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if conn is not None:
+                pool.putconn(conn, close=broken or bool(conn.closed))
+            slots.release()
+
+    def reset(self) -> None:
+        """Forget the pool without closing it (forked child: the sockets belong to the parent)"""
+        if self._pool is not None:
+            # Keep a reference: closing the inherited connections would end the parent's sessions
+            _inherited_pools.append(self._pool)
+        self._pool = None
+        self._slots = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def close_all(self) -> None:
+        """Close every pooled connection (worker shutdown, benchmarks)"""
+        with self._lock:
+            pool, self._pool, self._slots = self._pool, None, None
+        if pool is not None:
+            pool.closeall()
+
+
+_inherited_pools: List[psycopg2.pool.ThreadedConnectionPool] = []
+
+pg_pool = PostgresPool()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=pg_pool.reset)
+
+
+def _execute(cursor, statement: Statement, params: tuple) -> None:
+    if not _setting('PG_PREPARED_STATEMENTS', False):
+        cursor.execute(statement.client_sql, {f'p{i}': value for i, value in enumerate(params, 1)})
+        return
+
+    conn = cursor.connection
+    execute_sql = f"EXECUTE {statement.name} ({', '.join(['%s'] * len(params))})" if params \
+        else f'EXECUTE {statement.name}'
+    for attempt in range(2):
+        if statement.name not in conn.prepared:
+            try:
+                cursor.execute(f'PREPARE {statement.name} AS {statement.sql}')
+            except psycopg2.errors.DuplicatePreparedStatement:
+                pass  # Server connection đã có sẵn (pooler dùng lại kết nối)
+            conn.prepared.add(statement.name)
+        try:
+            cursor.execute(execute_sql, params)
+            return
+        except psycopg2.errors.InvalidSqlStatementName:
+            # Pooler chuyển sang server connection khác -> PREPARE lại một lần
+            conn.prepared.discard(statement.name)
+            if attempt:
+                raise
+
+
+def fetch_value(statement: Statement, *params) -> Any:
+    """
+    Run `statement` and return the first column of its first row (None if no row).
+    A connection-level failure is retried once on a fresh connection (reads only).
+    Recorded in the request metrics as operation 'sql' (config/query_metrics.py).
+    """
+    started = time.perf_counter()
+    value = _MISSING
+    try:
+        value = _fetch_value(statement, params)
+        return value
+    finally:
+        rows = len(value) if isinstance(value, list) else int(value is not None)
+        record_query(statement.name, 'sql', started, rows=rows, failed=value is _MISSING)
+
+
+def _fetch_value(statement: Statement, params: tuple) -> Any:
+    for attempt in range(2):
+        try:
+            with pg_pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    _execute(cursor, statement, params)
+                    row = cursor.fetchone()
+                    return row[0] if row else None
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            if attempt:
+                raise
+            print(f"Postgres read {statement.name} failed, retrying on a new connection: {str(e)}")
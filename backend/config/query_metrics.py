@@ -0,0 +1,395 @@
+"""
+Instrumentation of Supabase (PostgREST) calls
+
+install() wraps execute() of the postgrest request builders (sync and async),
+so every `.execute()` in the services is measured without touching them:
+table (or rpc function), operation, latency, row count and response bytes.
+
+Calls are collected per HTTP request by QueryMetricsMiddleware (a context
+variable: it follows the request into run_parallel threads, sync_to_async
+threads and asyncio tasks) and reported twice:
+    - Server-Timing response header: total time / calls, then one entry per
+      table + operation, visible in the browser devtools
+          Server-Timing: supabase;dur=84.2;desc="7 calls, 215803 B", select.jlpt_questions;dur=12.5;desc="1 call", ...
+    - Prometheus histograms, aggregated in Redis across workers (one pipeline
+      per request) and served as text by metrics_view (/metrics):
+          supabase_query_duration_seconds{table, operation}
+          supabase_query_rows{table, operation}
+          supabase_query_response_bytes{table, operation}
+          supabase_query_errors_total{table, operation}
+          http_request_supabase_calls{endpoint}
+          http_request_supabase_duration_seconds{endpoint}
+
+Direct Postgres reads (config/postgres.py) are recorded as operation 'sql'.
+Calls made outside a request (management commands, submission worker) are not
+recorded.
+"""
+import contextvars
+import functools
+import hmac
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django_redis import get_redis_connection
+
+METRICS_KEY = 'metrics:supabase'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CALL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+# name -> (help, label names, buckets)
+HISTOGRAMS = {
+    'supabase_query_duration_seconds': ('Latency of one Supabase call', ('table', 'operation'), DURATION_BUCKETS),
+    'supabase_query_rows': ('Rows returned by one Supabase call', ('table', 'operation'), ROW_BUCKETS),
+    'supabase_query_response_bytes': ('Response payload of one Supabase call', ('table', 'operation'), BYTE_BUCKETS),
+    'http_request_supabase_calls': ('Supabase calls made by one HTTP request', ('endpoint',), CALL_BUCKETS),
+    'http_request_supabase_duration_seconds': ('Time one HTTP request spent in Supabase calls', ('endpoint',), DURATION_BUCKETS),
+}
+COUNTERS = {
+    'supabase_query_errors_total': ('Supabase calls that raised', ('table', 'operation')),
+}
+
+_SEPARATOR = '\x1f'  # giữa các phần của 1 field trong hash Redis
+_TOKEN_UNSAFE = re.compile(r'[^A-Za-z0-9_.\-]')
+
+
+class QueryCall:
+    __slots__ = ('table', 'operation', 'seconds', 'rows', 'nbytes', 'failed')
+
+    def __init__(self, table: str, operation: str, seconds: float, rows: int, nbytes: int, failed: bool):
+        self.table = table
+        self.operation = operation
+        self.seconds = seconds
+        self.rows = rows
+        self.nbytes = nbytes
+        self.failed = failed
+
+
+class RequestMetrics:
+    """Supabase calls of one HTTP request (appended from any thread / task of the request)"""
+
+    def __init__(self):
+        self.calls: List[QueryCall] = []
+        self._lock = threading.Lock()
+
+    def add(self, call: QueryCall) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def by_query(self) -> Dict[Tuple[str, str], Tuple[int, float]]:
+        """{(operation, table): (calls, seconds)} in first-call order"""
+        grouped = {}
+        for call in self.calls:
+            count, seconds = grouped.get((call.operation, call.table), (0, 0.0))
+            grouped[(call.operation, call.table)] = (count + 1, seconds + call.seconds)
+        return grouped
+
+
+_current: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar('query_metrics', default=None)
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def record(table: str, operation: str, started: float, rows: int = 0, nbytes: int = 0, failed: bool = False) -> None:
+    """Record one call (started = time.perf_counter() before it) on the current request"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add(QueryCall(table, operation, time.perf_counter() - started, rows, nbytes, failed))
+
+
+# --- postgrest instrumentation ---
+
+def _describe(request_config) -> Tuple[str, str]:
+    """(table, operation) of a postgrest RequestConfig"""
+    path = str(request_config.path).rstrip('/')
+    name = path.rsplit('/', 1)[-1]
+    if path.rsplit('/', 2)[-2:-1] == ['rpc']:
+        return name, 'rpc'
+    method = request_config.http_method
+    if method == 'POST':
+        prefer = request_config.headers.get('Prefer', '')
+        return name, 'upsert' if 'resolution=' in prefer else 'insert'
+    return name, {'GET': 'select', 'HEAD': 'count', 'PATCH': 'update', 'DELETE': 'delete'}.get(method, method.lower())
+
+
+def _size(request_config, response) -> Tuple[int, int]:
+    """(rows, response bytes) of a finished call"""
+    http_response = getattr(request_config, 'last_response', None)
+    nbytes = len(http_response.content) if http_response is not None else 0
+    data = getattr(response, 'data', None)
+    if isinstance(data, list):
+        rows = len(data)
+    else:
+        rows = 0 if data is None else 1
+    return rows, nbytes
+
+
+def _instrument(builder_class) -> None:
+    execute = builder_class.execute
+    if getattr(execute, '_query_metrics', False):
+        return
+
+    if iscoroutinefunction(execute):
+        @functools.wraps(execute)
+        async def measured_execute(self, *args, **kwargs):
+            if _current.get() is None:
+                return await execute(self, *args, **kwargs)
+            started = time.perf_counter()
+            response = None
+            try:
+                response = await execute(self, *args, **kwargs)
+                return response
+            finally:
+                record(*_describe(self.request), started, *_size(self.request, response), failed=response is None)
+    else:
+        @functools.wraps(execute)
+        def measured_execute(self, *args, **kwargs):
+            if _current.get() is None:
+                return execute(self, *args, **kwargs)
+            started = time.perf_counter()
+            response = None
+            try:
+                response = execute(self, *args, **kwargs)
+                return response
+            finally:
+                record(*_describe(self.request), started, *_size(self.request, response), failed=response is None)
+
+    measured_execute._query_metrics = True
+    builder_class.execute = measured_execute
+
+
+def _keep_response(request_config_class) -> None:
+    """RequestConfig.send() keeps the httpx response (for its size) on the request config"""
+    send = request_config_class.send
+    if getattr(send, '_query_metrics', False):
+        return
+
+    @functools.wraps(send)
+    def send_and_keep(self):
+        result = send(self)
+        if not hasattr(result, '__await__'):
+            self.last_response = result
+            return result
+
+        async def keep():
+            self.last_response = await result
+            return self.last_response
+        return keep()
+
+    send_and_keep._query_metrics = True
+    request_config_class.send = send_and_keep
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install() -> None:
+    """Instrument the postgrest request builders (idempotent; QUERY_METRICS_ENABLED)"""
+    global _installed
+    if _installed or not _setting('QUERY_METRICS_ENABLED', True):
+        return
+    with _install_lock:
+        if _installed:
+            return
+        from postgrest._async.request_builder import AsyncQueryRequestBuilder, AsyncSingleRequestBuilder
+        from postgrest._sync.request_builder import SyncQueryRequestBuilder, SyncSingleRequestBuilder
+        from postgrest.base_request_builder import RequestConfig
+
+        _keep_response(RequestConfig)
+        # MaybeSingle builders call SingleRequestBuilder.execute: already measured there
+        for builder_class in (SyncQueryRequestBuilder, SyncSingleRequestBuilder,
+                              AsyncQueryRequestBuilder, AsyncSingleRequestBuilder):
+            _instrument(builder_class)
+        _installed = True
+
+
+# --- Server-Timing ---
+
+def _plural(calls: int) -> str:
+    return f'{calls} call' if calls == 1 else f'{calls} calls'
+
+
+def server_timing(metrics: RequestMetrics, limit: int = 12) -> str:
+    total = sum(call.seconds for call in metrics.calls)
+    nbytes = sum(call.nbytes for call in metrics.calls)
+    entries = [f'supabase;dur={total * 1000:.1f};desc="{_plural(len(metrics.calls))}, {nbytes} B"']
+    grouped = sorted(metrics.by_query().items(), key=lambda item: -item[1][1])
+    for (operation, table), (count, seconds) in grouped[:limit]:
+        name = _TOKEN_UNSAFE.sub('_', f'{operation}.{table}')
+        entries.append(f'{name};dur={seconds * 1000:.1f};desc="{_plural(count)}"')
+    return ', '.join(entries)
+
+
+# --- Prometheus aggregation (Redis) ---
+
+def _field(*parts) -> str:
+    return _SEPARATOR.join(str(part) for part in parts)
+
+
+def _bucket_index(buckets: Tuple, value: float) -> int:
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            return i
+    return len(buckets)  # +Inf
+
+
+def _observe(increments: Dict[str, float], name: str, labels: Tuple, value: float) -> None:
+    buckets = HISTOGRAMS[name][2]
+    for field, amount in ((_field(name, 'bucket', _bucket_index(buckets, value), *labels), 1),
+                          (_field(name, 'sum', '', *labels), value),
+                          (_field(name, 'count', '', *labels), 1)):
+        increments[field] = increments.get(field, 0) + amount
+
+
+def flush(metrics: RequestMetrics, endpoint: str) -> None:
+    """Add the calls of a finished request to the shared histograms (one Redis pipeline)"""
+    increments: Dict[str, float] = {}
+    for call in metrics.calls:
+        labels = (call.table, call.operation)
+        if call.failed:
+            field = _field('supabase_query_errors_total', 'count', '', *labels)
+            increments[field] = increments.get(field, 0) + 1
+            continue
+        _observe(increments, 'supabase_query_duration_seconds', labels, call.seconds)
+        _observe(increments, 'supabase_query_rows', labels, call.rows)
+        _observe(increments, 'supabase_query_response_bytes', labels, call.nbytes)
+    _observe(increments, 'http_request_supabase_calls', (endpoint,), len(metrics.calls))
+    _observe(increments, 'http_request_supabase_duration_seconds', (endpoint,),
+             sum((call.seconds for call in metrics.calls), 0.0))
+    try:
+        pipe = get_redis_connection('default').pipeline(transaction=False)
+        for field, amount in increments.items():
+            if not amount:
+                continue
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(METRICS_KEY, field, amount)
+            else:
+                pipe.hincrby(METRICS_KEY, field, amount)
+        pipe.execute()
+    except Exception as e:
+        print(f"Query metrics: flush failed: {str(e)}")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Tuple, values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}'
+
+
+def render_prometheus(fields: Dict[str, str]) -> str:
+    """Prometheus text exposition of the aggregated hash"""
+    series: Dict[str, Dict[Tuple, Dict]] = {}
+    for raw_field, raw_value in fields.items():
+        field = raw_field.decode() if isinstance(raw_field, bytes) else raw_field
+        name, kind, index, *labels = field.split(_SEPARATOR)
+        entry = series.setdefault(name, {}).setdefault(tuple(labels), {'buckets': {}, 'sum': 0.0, 'count': 0})
+        value = float(raw_value)
+        if kind == 'bucket':
+            entry['buckets'][int(index)] = value
+        else:
+            entry[kind] = value
+
+    lines = []
+    for name, (help_text, label_names, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels, entry in sorted(series.get(name, {}).items()):
+            cumulative = 0
+            for i, bound in enumerate(buckets + ('+Inf',)):
+                cumulative += entry['buckets'].get(i, 0)
+                le = 'le="%s"' % bound
+                lines.append(f'{name}_bucket{_labels(label_names, labels, le)} {cumulative:g}')
+            lines.append(f'{name}_sum{_labels(label_names, labels)} {entry["sum"]:g}')
+            lines.append(f'{name}_count{_labels(label_names, labels)} {entry["count"]:g}')
+    for name, (help_text, label_names) in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for labels, entry in sorted(series.get(name, {}).items()):
+            lines.append(f'{name}{_labels(label_names, labels)} {entry["count"]:g}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """GET /metrics (Prometheus). Requires 'Authorization: Bearer <METRICS_TOKEN>'; 404 while METRICS_TOKEN is unset"""
+    token = _setting('METRICS_TOKEN', '')
+    if not token:
+        return HttpResponse(status=404)
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return HttpResponse(status=401)
+    try:
+        fields = get_redis_connection('default').hgetall(METRICS_KEY)
+    except Exception as e:
+        print(f"Query metrics: read failed: {str(e)}")
+        return HttpResponse('metrics unavailable\n', status=503, content_type='text/plain')
+    return HttpResponse(render_prometheus(fields), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- Middleware ---
+
+def _endpoint(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '/' + match.route if match.route else match.view_name
+
+
+class QueryMetricsMiddleware:
+    """
+    Collects the Supabase calls of each request, adds the Server-Timing header
+    and flushes the calls to the shared histograms. Sync and async capable.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        install()
+        self.get_response = get_response
+        self.enabled = _setting('QUERY_METRICS_ENABLED', True)
+        self.server_timing = _setting('QUERY_METRICS_SERVER_TIMING', True)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._report(request, response, metrics)
+        flush(metrics, _endpoint(request))
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._report(request, response, metrics)
+        await sync_to_async(flush, thread_sensitive=False)(metrics, _endpoint(request))
+        return response
+
+    def _report(self, request, response, metrics: RequestMetrics) -> None:
+        if self.server_timing and metrics.calls:
+            response['Server-Timing'] = server_timing(metrics)
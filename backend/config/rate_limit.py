@@ -0,0 +1,173 @@
+"""
+Redis token-bucket rate limiting (DRF throttle classes)
+
+Each rule of a scope is a bucket holding up to `burst` tokens, refilled at
+`rate` (e.g. '10/min'). A request takes one token from every bucket of its
+scope. It is allowed only if all of them have one. The check-and-take for all
+buckets is a single Lua call on the django_redis "default" connection, so there
+is no database hit and no race between gunicorn workers.
+
+Scopes are configured in settings.RATE_LIMITS:
+    RATE_LIMITS = {
+        'login': [
+            {'key': 'ip', 'rate': '30/min', 'burst': 10},
+            {'key': 'email', 'rate': '5/min', 'burst': 5},
+        ],
+    }
+Keys: 'ip' (client address; behind a proxy it is taken from X-Forwarded-For
+according to REST_FRAMEWORK['NUM_PROXIES']), 'account' (account id of a valid
+student JWT, decoded here when the view does not authenticate; else ip) and
+'email' (request body email / student_id, else ip).
+
+Usage:
+    class LoginView(APIView):
+        throttle_classes = [scoped_throttle('login')]
+
+    @api_view(['POST'])
+    @throttle_classes([scoped_throttle('forgot_password')])
+    def forgot_password(request): ...
+
+If Redis is unreachable, requests are allowed (logged) rather than rejected.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django_redis import get_redis_connection
+from rest_framework.throttling import BaseThrottle
+
+BUCKET_KEY = 'rate_limit:{scope}:{key}:{ident}'
+
+# KEYS = bucket keys; ARGV[1] = now (seconds), then per bucket: capacity, refill rate (tokens/s), cost
+# Returns {allowed (1/0), seconds until allowed (string)}
+TAKE_TOKENS = """
+local now = tonumber(ARGV[1])
+local allowed = 1
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local base = 2 + (i - 1) * 3
+    local capacity, rate, cost = tonumber(ARGV[base]), tonumber(ARGV[base + 1]), tonumber(ARGV[base + 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    if tokens < cost then
+        allowed = 0
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+    levels[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+    local base = 2 + (i - 1) * 3
+    local capacity, rate, cost = tonumber(ARGV[base]), tonumber(ARGV[base + 1]), tonumber(ARGV[base + 2])
+    local tokens = levels[i]
+    if allowed == 1 then
+        tokens = tokens - cost
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {allowed, tostring(wait)}
+"""
+
+PERIODS = {
+    's': 1, 'sec': 1, 'second': 1,
+    'm': 60, 'min': 60, 'minute': 60,
+    'h': 3600, 'hour': 3600,
+    'd': 86400, 'day': 86400,
+}
+
+_script = None
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """'10/min' -> (10, 10 / 60 tokens per second)"""
+    num, period = rate.split('/')
+    num = int(num)
+    return num, num / PERIODS[period.strip().lower()]
+
+
+def take_tokens(buckets: List[Tuple[str, int, float]], cost: int = 1) -> Tuple[bool, float]:
+    """
+    buckets = [(redis_key, capacity, tokens_per_second), ...]
+    Take `cost` tokens from every bucket if all have enough (one Redis call).
+    Returns (allowed, seconds to wait when rejected).
+    """
+    global _script
+    redis = get_redis_connection('default')
+    if _script is None:
+        _script = redis.register_script(TAKE_TOKENS)
+    args = [time.time()]
+    for _, capacity, per_second in buckets:
+        args.extend([capacity, per_second, cost])
+    allowed, wait = _script(keys=[key for key, _, _ in buckets], args=args, client=redis)
+    return bool(allowed), float(wait)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """DRF throttle backed by the Redis token buckets of `scope` (see settings.RATE_LIMITS)"""
+    scope: Optional[str] = None
+
+    def __init__(self):
+        self._wait = None
+
+    def get_rules(self) -> List[Dict]:
+        return getattr(settings, 'RATE_LIMITS', {}).get(self.scope, [])
+
+    def get_ident_for(self, key: str, request) -> str:
+        if key == 'account':
+            payload = request.auth if isinstance(request.auth, dict) else None
+            if payload is None:
+                # View không dùng StudentJWTAuthentication (vd. full_data): tự giải mã Bearer token,
+                # không thì cả lớp sau cùng một NAT chung 1 bucket
+                from student.common.authentication import student_token_payload
+                payload = student_token_payload(request)
+            if payload and payload.get('id'):
+                return str(payload['id'])
+        elif key == 'email':
+            # Read the raw body first so views that json.loads(request.body) still can
+            try:
+                request._request.body
+            except Exception:
+                pass
+            data = request.data if hasattr(request.data, 'get') else {}
+            ident = data.get('email') or data.get('student_id')
+            if ident:
+                return str(ident).strip().lower()
+        return self.get_ident(request)
+
+    def allow_request(self, request, view) -> bool:
+        if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+            return True
+        rules = self.get_rules()
+        if not rules:
+            return True
+
+        buckets = []
+        for rule in rules:
+            num, per_second = parse_rate(rule['rate'])
+            ident = self.get_ident_for(rule['key'], request)
+            buckets.append((
+                BUCKET_KEY.format(scope=self.scope, key=rule['key'], ident=ident),
+                rule.get('burst', num),
+                per_second,
+            ))
+        try:
+            allowed, self._wait = take_tokens(buckets)
+        except Exception as e:
+            print(f"Rate limit: Redis check failed for scope '{self.scope}': {str(e)}")
+            return True
+        return allowed
+
+    def wait(self) -> Optional[float]:
+        return self._wait
+
+
+_throttles: Dict[str, type] = {}
+
+
+def scoped_throttle(scope: str) -> type:
+    """TokenBucketThrottle subclass bound to one scope of settings.RATE_LIMITS"""
+    if scope not in _throttles:
+        _throttles[scope] = type(f'TokenBucketThrottle_{scope}', (TokenBucketThrottle,), {'scope': scope})
+    return _throttles[scope]
@@ -48,6 +48,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # Custom middleware to handle BrokenPipeError
     'config.middleware.BrokenPipeErrorMiddleware',
+    # Kiểm tra phiên đăng nhập còn hiệu lực (giới hạn thiết bị) - 1 lệnh Redis
+    'config.middleware.ActiveSessionMiddleware',
+    # Đo các lệnh gọi Supabase của request (Server-Timing + /metrics)
+    'config.query_metrics.QueryMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -116,6 +120,14 @@ PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
 ]
 
+# Kiểm tra/hash mật khẩu (Argon2) trong process pool giới hạn (config/password_pool.py):
+# số tiến trình mỗi web worker, độ ưu tiên (nice), số việc tối đa đang chờ trước khi trả 503
+PASSWORD_HASH_POOL = os.getenv('PASSWORD_HASH_POOL', 'True') == 'True'
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 1))
+PASSWORD_HASH_NICE = int(os.getenv('PASSWORD_HASH_NICE', 10))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 8))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -168,6 +180,102 @@ CACHES = {
 }
 
 
+# Kết nối HTTP tới Supabase (config/supabase_client.py): mỗi thread giữ 1 client keep-alive,
+# HTTP/2 nếu server hỗ trợ. Giới hạn tính theo từng client (từng thread).
+SUPABASE_HTTP2 = os.getenv('SUPABASE_HTTP2', 'True') == 'True'
+SUPABASE_HTTP_MAX_CONNECTIONS = int(os.getenv('SUPABASE_HTTP_MAX_CONNECTIONS', 20))
+# AsyncClient của event loop (view async chạy dưới ASGI) dùng chung cho mọi request của tiến trình
+SUPABASE_ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('SUPABASE_ASYNC_HTTP_MAX_CONNECTIONS', 100))
+SUPABASE_HTTP_MAX_KEEPALIVE = int(os.getenv('SUPABASE_HTTP_MAX_KEEPALIVE', 10))
+SUPABASE_HTTP_KEEPALIVE_EXPIRY = float(os.getenv('SUPABASE_HTTP_KEEPALIVE_EXPIRY', 60))
+SUPABASE_HTTP_TIMEOUT = float(os.getenv('SUPABASE_HTTP_TIMEOUT', 30))
+SUPABASE_HTTP_CONNECT_TIMEOUT = float(os.getenv('SUPABASE_HTTP_CONNECT_TIMEOUT', 5))
+
+# Gửi song song các truy vấn Supabase độc lập (xem config/concurrency.py)
+SUPABASE_PARALLEL_QUERIES = os.getenv('SUPABASE_PARALLEL_QUERIES', 'True') == 'True'
+SUPABASE_QUERY_WORKERS = int(os.getenv('SUPABASE_QUERY_WORKERS', 8))
+
+# Cách tải toàn bộ đề thi khi cache miss:
+# 'postgrest' = nhiều truy vấn batch, 'rpc' = 1 lần gọi hàm get_full_exam_json (backend/sql/)
+EXAM_DATA_BACKEND = os.getenv('EXAM_DATA_BACKEND', 'postgrest')
+
+# Đường đọc nóng (tải đề thi, đáp án chấm điểm, điểm luyện đề Dashboard, lịch sử bài làm):
+# 'supabase' = qua PostgREST, 'postgres' = 1 truy vấn trực tiếp tới DATABASES['default']
+# (student/common/read_repository.py, pool psycopg2 trong config/postgres.py). Lỗi -> quay về PostgREST.
+HOT_READ_BACKEND = os.getenv('HOT_READ_BACKEND', 'supabase')
+PG_POOL_MIN_CONNECTIONS = int(os.getenv('PG_POOL_MIN_CONNECTIONS', 1))
+PG_POOL_MAX_CONNECTIONS = int(os.getenv('PG_POOL_MAX_CONNECTIONS', 10))
+PG_POOL_TIMEOUT = float(os.getenv('PG_POOL_TIMEOUT', 10))
+PG_CONNECT_TIMEOUT = int(os.getenv('PG_CONNECT_TIMEOUT', 5))
+# PREPARE / EXECUTE trên từng kết nối. Chỉ bật khi kết nối thẳng hoặc pooler ở session mode
+# (Supavisor / PgBouncer transaction mode, cổng 6543, không giữ prepared statement giữa các lần gọi)
+PG_PREPARED_STATEMENTS = os.getenv('PG_PREPARED_STATEMENTS', 'False') == 'True'
+
+# Cách ghi bài nộp: 'postgrest' = nhiều lệnh insert,
+# 'rpc' = 1 lần gọi hàm submit_exam_result (backend/sql/), ghi 4 bảng trong 1 transaction
+EXAM_SUBMIT_BACKEND = os.getenv('EXAM_SUBMIT_BACKEND', 'postgrest')
+
+# Nộp bài bất đồng bộ: chấm điểm + tạo exam_results trong request, phần còn lại
+# (save_answers, exam_result_sections, certificates) do worker xử lý qua hàng đợi Redis
+# (python manage.py run_submission_worker). Cần chạy tiến trình worker khi bật.
+EXAM_SUBMIT_ASYNC = os.getenv('EXAM_SUBMIT_ASYNC', 'False') == 'True'
+SUBMISSION_QUEUE_MAX_ATTEMPTS = int(os.getenv('SUBMISSION_QUEUE_MAX_ATTEMPTS', 5))
+# Worker không gia hạn heartbeat quá số giây này bị coi là đã dừng: worker khác đưa job của nó về hàng đợi
+SUBMISSION_WORKER_HEARTBEAT_TTL = int(os.getenv('SUBMISSION_WORKER_HEARTBEAT_TTL', 60))
+# Chu kỳ (giây) worker quét job của các worker đã dừng (ngoài lần quét khi khởi động)
+SUBMISSION_WORKER_RECOVER_INTERVAL = int(os.getenv('SUBMISSION_WORKER_RECOVER_INTERVAL', 30))
+
+# Điểm trung bình luyện đề trên Dashboard: 'rows' = tính từ toàn bộ exam_result_sections của học sinh,
+# 'rollup' = đọc bảng tổng hợp student_practice_summary, được cộng dồn khi nộp bài
+# (chạy backend/sql/student_practice_summary.sql rồi python manage.py backfill_practice_summary trước khi bật),
+# 'sql' = GROUP BY trong Postgres qua RPC practice_summary_by_section (backend/sql/practice_summary_by_section.sql)
+PRACTICE_SUMMARY_BACKEND = os.getenv('PRACTICE_SUMMARY_BACKEND', 'rows')
+
+# Thời gian cache GET dashboard/bootstrap/ theo account (giây). Cache bị xóa khi nộp bài,
+# cập nhật onboarding hoặc admin cập nhật tài khoản / học viên; TTL chỉ là lưới an toàn.
+DASHBOARD_BOOTSTRAP_TIMEOUT = int(os.getenv('DASHBOARD_BOOTSTRAP_TIMEOUT', 300))
+
+# Lịch sử bài làm (GET exam-results/history/?limit=&cursor=): số dòng mặc định / tối đa mỗi trang
+EXAM_HISTORY_PAGE_SIZE = int(os.getenv('EXAM_HISTORY_PAGE_SIZE', 20))
+EXAM_HISTORY_MAX_PAGE_SIZE = int(os.getenv('EXAM_HISTORY_MAX_PAGE_SIZE', 100))
+
+# Thời gian giữ bộ đệm autosave câu trả lời trong Redis (giây), gia hạn sau mỗi lần lưu
+EXAM_AUTOSAVE_TIMEOUT = int(os.getenv('EXAM_AUTOSAVE_TIMEOUT', 60 * 60 * 12))
+
+# Cache account_id -> student_id cho StudentJWTAuthentication (student/common/authentication.py):
+# trong tiến trình (LRU có TTL) rồi tới Redis, chỉ khi miss cả hai mới truy vấn Supabase
+STUDENT_ID_LOCAL_CACHE_TIMEOUT = int(os.getenv('STUDENT_ID_LOCAL_CACHE_TIMEOUT', 300))
+STUDENT_ID_CACHE_TIMEOUT = int(os.getenv('STUDENT_ID_CACHE_TIMEOUT', 60 * 60 * 24))
+
+# Cache ngắn hạn cho email / mã học viên không tồn tại khi đăng nhập (student/login/accounts.py),
+# chặn việc dò tài khoản đi thẳng xuống DB. Bị xóa khi đăng ký / admin tạo học viên.
+LOGIN_NEGATIVE_LOCAL_CACHE_TIMEOUT = int(os.getenv('LOGIN_NEGATIVE_LOCAL_CACHE_TIMEOUT', 10))
+LOGIN_NEGATIVE_CACHE_TIMEOUT = int(os.getenv('LOGIN_NEGATIVE_CACHE_TIMEOUT', 60))
+
+# Thời gian sống của đề thi đã biên dịch trong Redis (giây).
+# Cache được xóa chủ động khi admin cập nhật/xóa đề, TTL chỉ là lưới an toàn.
+EXAM_CACHE_TIMEOUT = int(os.getenv('EXAM_CACHE_TIMEOUT', 60 * 60 * 24))
+# Danh mục đề thi (tên đề / level gắn vào lịch sử bài làm), xóa khi admin sửa đề / level.
+# Cũng là TTL của các đề được tải riêng vì thiếu trong danh mục (kể cả kết quả "không có đề")
+EXAM_CATALOG_TIMEOUT = int(os.getenv('EXAM_CATALOG_TIMEOUT', 60 * 60))
+
+# Single flight (config/single_flight.py): các request giống nhau đến cùng lúc (đề thi, levels,
+# danh sách đề theo level, đáp án chấm điểm) chỉ gây ra 1 lần tải, kể cả giữa các worker:
+# worker giữ lock Redis tải dữ liệu, worker khác chờ kết quả được chia sẻ trong Redis.
+SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'True') == 'True'
+SINGLE_FLIGHT_LOCK_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_LOCK_TIMEOUT', 10))
+SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', 10))
+SINGLE_FLIGHT_RESULT_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_RESULT_TIMEOUT', 5))
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv('SINGLE_FLIGHT_POLL_INTERVAL', 0.05))
+
+# Đo các lệnh gọi Supabase / Postgres (config/query_metrics.py): header Server-Timing trên mỗi response
+# và histogram Prometheus tại /metrics. /metrics yêu cầu 'Authorization: Bearer <METRICS_TOKEN>';
+# chưa đặt METRICS_TOKEN thì /metrics trả 404 (không công khai số liệu)
+QUERY_METRICS_ENABLED = os.getenv('QUERY_METRICS_ENABLED', 'True') == 'True'
+QUERY_METRICS_SERVER_TIMING = os.getenv('QUERY_METRICS_SERVER_TIMING', 'True') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+
 # [5] CẤU HÌNH JWT VÀ QUẢN LÝ PHIÊN
 # Khóa bí mật JWT, dùng khóa bí mật của Django để ký token
 JWT_SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
@@ -178,6 +286,58 @@ ACCESS_TOKEN_LIFETIME = timedelta(minutes=30)
 # Giới hạn số lượng phiên đăng nhập đồng thời (2 thiết bị)
 MAX_CONCURRENT_SESSIONS = 2
 
+# Kiểm tra phiên (JTI) của token học viên ở middleware (config/middleware.py ActiveSessionMiddleware).
+# Phiên được lưu trong Redis (student/login/sessions.py); token không có phiên bị trả 401.
+# Tắt mặc định: token cấp trước khi có registry này không có phiên trong Redis.
+# STUDENT_SESSION_CHECK_SINCE (unix time, thời điểm triển khai registry): token có 'iat' trước mốc này
+# chưa được đăng ký nên không bị kiểm tra -> bật kiểm tra mà không đăng xuất toàn bộ học viên.
+STUDENT_SESSION_CHECK = os.getenv('STUDENT_SESSION_CHECK', 'False') == 'True'
+STUDENT_SESSION_CHECK_SINCE = int(os.getenv('STUDENT_SESSION_CHECK_SINCE', 0))
+STUDENT_SESSION_PATH_PREFIX = '/api/v1/student/'
+# Các endpoint không cần phiên (đăng nhập, đăng ký, quên mật khẩu)
+STUDENT_SESSION_EXEMPT_PATHS = [
+    '/api/v1/student/login/userlogin/',
+    '/api/v1/student/register/',
+    '/api/v1/student/auth/',
+]
+
+# Giới hạn tần suất (token bucket trên Redis, config/rate_limit.py).
+# Mỗi scope gồm các bucket: key = 'ip' | 'account' | 'email', rate = 'số/đơn vị', burst = dung lượng
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True') == 'True'
+# Số reverse proxy phía trước app (Railway: 1). DRF lấy IP client từ X-Forwarded-For
+# theo số proxy này, nên client không tự giả IP bằng header được
+REST_FRAMEWORK = {
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
+}
+RATE_LIMITS = {
+    # Gọi Gemini (tính phí)
+    'translate_gemini': [
+        {'key': 'account', 'rate': '20/min', 'burst': 10},
+        {'key': 'ip', 'rate': '60/min', 'burst': 20},
+    ],
+    # Argon2 (CPU). Giới hạn chính theo email/mã học viên; bucket IP chỉ là trần cao
+    # (cả lớp học sau cùng một NAT đăng nhập cùng lúc không bị 429)
+    'login': [
+        {'key': 'email', 'rate': '10/min', 'burst': 5},
+        {'key': 'ip', 'rate': '600/min', 'burst': 200},
+    ],
+    'admin_login': [
+        {'key': 'ip', 'rate': '10/min', 'burst': 5},
+        {'key': 'email', 'rate': '5/min', 'burst': 5},
+    ],
+    # Gửi email SMTP (forgot_password, resend_reset_email)
+    'password_reset_email': [
+        {'key': 'email', 'rate': '3/hour', 'burst': 3},
+        {'key': 'ip', 'rate': '10/hour', 'burst': 5},
+    ],
+    # Payload lớn nhất của hệ thống. Theo tài khoản; bucket IP chỉ là trần cao
+    # (cả lớp sau cùng một NAT mở cùng một đề lúc bắt đầu thi)
+    'exam_full_data': [
+        {'key': 'account', 'rate': '30/min', 'burst': 10},
+        {'key': 'ip', 'rate': '600/min', 'burst': 200},
+    ],
+}
+
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "smtp.gmail.com"
 EMAIL_PORT = 587
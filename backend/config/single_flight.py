@@ -0,0 +1,258 @@
+"""
+Single-flight request coalescing for identical concurrent reads
+
+When many requests miss on the same key at once (60 students opening the same
+exam, the compiled exam expiring on exam day), only one of them queries
+Supabase; the others wait for its result.
+
+Two levels:
+    - in the process: the first caller of a key (the leader) runs the fetch,
+      concurrent callers of the same key wait on its Future (threads of a
+      gthread worker, coroutines of the ASGI event loop)
+    - across workers: the leader also takes a short Redis lock
+      (single_flight:lock:<key>, SET NX PX). A worker that finds the lock
+      taken polls for the result the lock holder publishes under
+      single_flight:result:<key> (SINGLE_FLIGHT_RESULT_TIMEOUT seconds) and
+      only fetches itself if the holder gives up (lock released or expired
+      without a result) or SINGLE_FLIGHT_WAIT_TIMEOUT passes.
+
+Usage:
+    result = coalesce(f'levels', fetch_levels, share=lambda r: r['success'])
+    result = await acoalesce(f'levels', afetch_levels, share=lambda r: r['success'])
+
+`share` decides whether a result may be handed to other workers (failed
+results are only shared with the callers already waiting in the process).
+Every caller gets its own copy of the result (the services mutate the dicts
+they return), exactly as if each had read it from the cache.
+If Redis is unreachable, coalescing stays in-process only.
+"""
+import asyncio
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+
+LOCK_KEY = 'single_flight:lock:{key}'
+RESULT_KEY = 'single_flight:result:{key}'
+
+_MISSING = object()
+
+# KEYS[1] = lock key, ARGV[1] = owner token; only the owner may release
+RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_flights: Dict[str, Future] = {}
+_flights_lock = threading.Lock()
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def _enabled() -> bool:
+    return _setting('SINGLE_FLIGHT_ENABLED', True)
+
+
+def _share_all(result: Any) -> bool:
+    return True
+
+
+def _join(key: str) -> Tuple[Future, bool]:
+    """Return (future of the key, True if the caller is its leader)"""
+    with _flights_lock:
+        future = _flights.get(key)
+        if future is not None:
+            return future, False
+        future = _flights[key] = Future()
+        return future, True
+
+
+def _land(key: str, future: Future, result: Any = _MISSING, error: BaseException = None) -> None:
+    """Hand the leader's outcome to the waiting callers (as a pickled snapshot, see _unpack)"""
+    with _flights_lock:
+        if _flights.get(key) is future:
+            del _flights[key]
+    if error is None:
+        try:
+            future.set_result(pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+            return
+        except Exception as e:
+            error = e
+    future.set_exception(error)
+
+
+def _unpack(snapshot: bytes) -> Any:
+    return pickle.loads(snapshot)
+
+
+# --- Cross-worker part (Redis) ---
+
+def _get_shared(key: str) -> Any:
+    try:
+        return cache.get(RESULT_KEY.format(key=key), _MISSING)
+    except Exception as e:
+        print(f"Single flight: result read failed for {key}: {str(e)}")
+        return _MISSING
+
+
+def _publish(key: str, result: Any) -> None:
+    try:
+        cache.set(RESULT_KEY.format(key=key), result, _setting('SINGLE_FLIGHT_RESULT_TIMEOUT', 5))
+    except Exception as e:
+        print(f"Single flight: result write failed for {key}: {str(e)}")
+
+
+def _acquire(key: str) -> Optional[str]:
+    """Take the cross-worker lock. Returns the owner token, '' if Redis is down (fetch anyway), None if taken"""
+    token = uuid.uuid4().hex
+    try:
+        lock_ms = int(_setting('SINGLE_FLIGHT_LOCK_TIMEOUT', 10) * 1000)
+        if get_redis_connection('default').set(LOCK_KEY.format(key=key), token, nx=True, px=lock_ms):
+            return token
+        return None
+    except Exception as e:
+        print(f"Single flight: lock failed for {key}: {str(e)}")
+        return ''
+
+
+def _release(key: str, token: str) -> None:
+    if not token:
+        return
+    try:
+        get_redis_connection('default').eval(RELEASE_LOCK, 1, LOCK_KEY.format(key=key), token)
+    except Exception as e:
+        print(f"Single flight: unlock failed for {key}: {str(e)}")
+
+
+def _lock_held(key: str) -> bool:
+    try:
+        return bool(get_redis_connection('default').exists(LOCK_KEY.format(key=key)))
+    except Exception:
+        return False
+
+
+def _poll_shared(key: str) -> Tuple[bool, Any]:
+    """
+    One poll of a worker waiting on another worker's lock:
+    (True, result) when published, (True, _MISSING) when the holder gave up, (False, _MISSING) otherwise
+    """
+    result = _get_shared(key)
+    if result is not _MISSING:
+        return True, result
+    if not _lock_held(key):
+        # Kết quả có thể được ghi ngay trước khi lock được nhả
+        return True, _get_shared(key)
+    return False, _MISSING
+
+
+def _fetch_across_workers(key: str, fetch: Callable[[], Any], share: Callable[[Any], bool]) -> Any:
+    result = _get_shared(key)
+    if result is not _MISSING:
+        return result
+
+    deadline = time.monotonic() + _setting('SINGLE_FLIGHT_WAIT_TIMEOUT', 10)
+    interval = _setting('SINGLE_FLIGHT_POLL_INTERVAL', 0.05)
+    while True:
+        token = _acquire(key)
+        if token is not None:
+            try:
+                result = fetch()
+                if token and share(result):
+                    _publish(key, result)
+                return result
+            finally:
+                _release(key, token)
+
+        # Worker khác đang tải -> chờ kết quả của nó
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            done, result = _poll_shared(key)
+            if done:
+                break
+        else:
+            print(f"Single flight: gave up waiting for {key}, fetching directly")
+            return fetch()
+        if result is not _MISSING:
+            return result
+        # Lock holder failed without a result: try to become the leader
+        if time.monotonic() >= deadline:
+            return fetch()
+
+
+async def _afetch_across_workers(key: str, fetch: Callable[[], Awaitable], share: Callable[[Any], bool]) -> Any:
+    """_fetch_across_workers for coroutines (Redis calls in a worker thread, non-blocking waits)"""
+    result = await sync_to_async(_get_shared, thread_sensitive=False)(key)
+    if result is not _MISSING:
+        return result
+
+    deadline = time.monotonic() + _setting('SINGLE_FLIGHT_WAIT_TIMEOUT', 10)
+    interval = _setting('SINGLE_FLIGHT_POLL_INTERVAL', 0.05)
+    while True:
+        token = await sync_to_async(_acquire, thread_sensitive=False)(key)
+        if token is not None:
+            try:
+                result = await fetch()
+                if token and share(result):
+                    await sync_to_async(_publish, thread_sensitive=False)(key, result)
+                return result
+            finally:
+                await sync_to_async(_release, thread_sensitive=False)(key, token)
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+            done, result = await sync_to_async(_poll_shared, thread_sensitive=False)(key)
+            if done:
+                break
+        else:
+            print(f"Single flight: gave up waiting for {key}, fetching directly")
+            return await fetch()
+        if result is not _MISSING:
+            return result
+        if time.monotonic() >= deadline:
+            return await fetch()
+
+
+# --- Public API ---
+
+def coalesce(key: str, fetch: Callable[[], Any], share: Callable[[Any], bool] = _share_all) -> Any:
+    """Run fetch() once for all concurrent callers of `key` (in this process and across workers)"""
+    if not _enabled():
+        return fetch()
+
+    future, leader = _join(key)
+    if not leader:
+        return _unpack(future.result())
+    try:
+        result = _fetch_across_workers(key, fetch, share)
+    except BaseException as e:
+        _land(key, future, error=e)
+        raise
+    _land(key, future, result)
+    return result
+
+
+async def acoalesce(key: str, fetch: Callable[[], Awaitable], share: Callable[[Any], bool] = _share_all) -> Any:
+    """coalesce() for coroutines: `fetch` is an async callable, waiting callers do not block the loop"""
+    if not _enabled():
+        return await fetch()
+
+    future, leader = _join(key)
+    if not leader:
+        return _unpack(await asyncio.wrap_future(future))
+    try:
+        result = await _afetch_across_workers(key, fetch, share)
+    except BaseException as e:
+        _land(key, future, error=e)
+        raise
+    _land(key, future, result)
+    return result
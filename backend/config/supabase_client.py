@@ -1,24 +1,228 @@
 """
 Supabase client configuration for backend
+
+Clients are pooled: each thread gets one Supabase client built on its own
+keep-alive httpx client (HTTP/2 when the server supports it). The TCP/TLS
+connection is set up once and reused by every later request served by that
+thread, instead of opening a new one per request.
+
+    get_supabase_client()   the calling thread's client (cheap, call it anywhere)
+    supabase                module-level handle that resolves to the calling
+                            thread's client on every use
+    get_async_supabase_client()
+                            the running event loop's AsyncClient (async views /
+                            services, config/asgi.py); one per loop, same limits
+
+Pool limits and timeouts come from settings (SUPABASE_HTTP_*). After a fork
+(gunicorn workers, multiprocessing) the child drops the clients inherited from
+the parent and builds fresh ones; connections are never shared across processes.
 """
+import asyncio
 import os
-from typing import Optional
-from supabase import create_client, Client
+import threading
+import weakref
+from typing import Dict, Tuple
+import httpx
+from supabase import create_client, Client, AsyncClient
+from supabase.lib.client_options import AsyncClientOptions, SyncClientOptions
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def get_supabase_client() -> Client:
-    """
-    Create and return Supabase client
-    """
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        # Dùng ngoài Django (script, shell) -> giá trị mặc định
+        return default
+
+
+def _credentials() -> Tuple[str, str]:
     supabase_url = os.getenv('SUPABASE_URL')
     supabase_key = os.getenv('SUPABASE_SECRET_KEY')
-    
+
     if not supabase_url or not supabase_key:
         raise ValueError("Missing Supabase credentials in environment variables")
-    
-    return create_client(supabase_url, supabase_key)
 
-# Create singleton instance
-supabase = get_supabase_client()
\ No newline at end of file
+    return supabase_url, supabase_key
+
+
+def _http_options(max_connections_setting: str = 'SUPABASE_HTTP_MAX_CONNECTIONS', default_max: int = 20) -> Dict:
+    return {
+        'http2': _setting('SUPABASE_HTTP2', True),
+        'limits': httpx.Limits(
+            max_connections=_setting(max_connections_setting, default_max),
+            max_keepalive_connections=_setting('SUPABASE_HTTP_MAX_KEEPALIVE', 10),
+            keepalive_expiry=_setting('SUPABASE_HTTP_KEEPALIVE_EXPIRY', 60),
+        ),
+        'timeout': httpx.Timeout(
+            _setting('SUPABASE_HTTP_TIMEOUT', 30),
+            connect=_setting('SUPABASE_HTTP_CONNECT_TIMEOUT', 5),
+        ),
+        'follow_redirects': True,
+    }
+
+
+def build_http_client() -> httpx.Client:
+    """httpx client with the configured pool limits / timeouts (one per thread)"""
+    return httpx.Client(**_http_options())
+
+
+def build_async_http_client() -> httpx.AsyncClient:
+    """httpx AsyncClient for one event loop: every in-flight request of the process shares its pool"""
+    return httpx.AsyncClient(**_http_options('SUPABASE_ASYNC_HTTP_MAX_CONNECTIONS', 100))
+
+
+def create_supabase_client(supabase_url: str, supabase_key: str, http_client: httpx.Client = None) -> Client:
+    """New Supabase client on `http_client` (a fresh pooled one if omitted)"""
+    return create_client(
+        supabase_url,
+        supabase_key,
+        options=SyncClientOptions(httpx_client=http_client or build_http_client()),
+    )
+
+
+class SupabaseClientManager:
+    """
+    One Supabase client per (thread, credentials), reset in forked children.
+    Credentials are part of the key so changing SUPABASE_URL (tests, benchmarks)
+    yields a new client.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._http_clients = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _clients(self) -> Dict[Tuple[str, str], Client]:
+        if self._pid != os.getpid():
+            self.reset()
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        return clients
+
+    def get(self) -> Client:
+        credentials = _credentials()
+        clients = self._clients()
+        client = clients.get(credentials)
+        if client is None:
+            http_client = build_http_client()
+            client = create_supabase_client(*credentials, http_client=http_client)
+            clients[credentials] = client
+            with self._lock:
+                self._http_clients.add(http_client)
+        return client
+
+    def reset(self) -> None:
+        """Forget every client without closing it (used in a forked child: the sockets belong to the parent)"""
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._http_clients = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def close_all(self) -> None:
+        """Close the connections of every thread's client (worker shutdown)"""
+        with self._lock:
+            http_clients = list(self._http_clients)
+            self._http_clients = weakref.WeakSet()
+        for http_client in http_clients:
+            try:
+                http_client.close()
+            except Exception as e:
+                print(f"Supabase client: close failed: {str(e)}")
+        self._local = threading.local()
+
+
+client_manager = SupabaseClientManager()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=client_manager.reset)
+
+
+def get_supabase_client() -> Client:
+    """
+    Return the calling thread's pooled Supabase client
+    """
+    return client_manager.get()
+
+
+class AsyncSupabaseClientManager:
+    """
+    One AsyncClient per (event loop, credentials). httpx async connections are
+    bound to the loop that opened them, so clients are never shared across
+    loops; entries of closed loops are dropped on the next miss.
+    """
+
+    def __init__(self):
+        self._loops: Dict[int, Tuple[asyncio.AbstractEventLoop, Dict[Tuple[str, str], AsyncClient]]] = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def get(self) -> AsyncClient:
+        loop = asyncio.get_running_loop()
+        credentials = _credentials()
+        if self._pid != os.getpid():
+            self.reset()
+        entry = self._loops.get(id(loop))
+        if entry is None or entry[0] is not loop:
+            with self._lock:
+                for key, (other_loop, _) in list(self._loops.items()):
+                    if other_loop.is_closed():
+                        del self._loops[key]
+                entry = self._loops[id(loop)] = (loop, {})
+        clients = entry[1]
+        client = clients.get(credentials)
+        if client is None:
+            # The constructor is synchronous (no await -> no duplicate clients on one loop).
+            # The service key is already in the headers, so AsyncClient.create() adds nothing.
+            client = AsyncClient(*credentials, options=AsyncClientOptions(httpx_client=build_async_http_client()))
+            clients[credentials] = client
+        return client
+
+    def reset(self) -> None:
+        """Forget every client without closing it (forked child)"""
+        self._loops = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    async def aclose(self) -> None:
+        """Close the clients of the running loop (ASGI lifespan shutdown, benchmarks)"""
+        entry = self._loops.pop(id(asyncio.get_running_loop()), None)
+        if entry is None:
+            return
+        for client in entry[1].values():
+            try:
+                await client.options.httpx_client.aclose()
+            except Exception as e:
+                print(f"Supabase async client: close failed: {str(e)}")
+
+
+async_client_manager = AsyncSupabaseClientManager()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=async_client_manager.reset)
+
+
+def get_async_supabase_client() -> AsyncClient:
+    """
+    Return the running event loop's Supabase AsyncClient (call from a coroutine)
+    """
+    return async_client_manager.get()
+
+
+class _ThreadClient:
+    """Forwards attribute access to the calling thread's client (supabase.table(...), .rpc(...))"""
+
+    def __getattr__(self, name):
+        return getattr(client_manager.get(), name)
+
+    def __repr__(self) -> str:
+        return '<Supabase client (per thread)>'
+
+
+# Handle dùng chung cho các module: `from config.supabase_client import supabase`
+supabase = _ThreadClient()
@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from config.query_metrics import metrics_view
+
 urlpatterns = [
     
     path('api/v1/student/', include('student.urls')),
     path('api/v1/admin/', include('admin.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
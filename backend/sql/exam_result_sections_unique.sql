@@ -0,0 +1,17 @@
+-- Unique (exam_result_id, exam_section_id) on exam_result_sections.
+--
+-- ExamService.submit_listening_exam writes all listening section scores with one
+-- PostgREST upsert (on_conflict = exam_result_id,exam_section_id), which needs
+-- this constraint. It also stops a retried submission from duplicating rows.
+--
+-- Apply with the Supabase SQL editor or: psql "$DATABASE_URL" -f sql/exam_result_sections_unique.sql
+
+-- Keep the first row of any existing duplicates
+delete from exam_result_sections a
+using exam_result_sections b
+where a.exam_result_id = b.exam_result_id
+  and a.exam_section_id = b.exam_section_id
+  and a.ctid > b.ctid;
+
+create unique index if not exists exam_result_sections_result_section_key
+  on exam_result_sections (exam_result_id, exam_section_id);
@@ -0,0 +1,12 @@
+-- Index for the paginated exam history (GET exam-results/history/?limit=&cursor=).
+--
+-- ResultService reads one page of a student's exam_results newest first with a
+-- keyset on (datetime, id): "after the last row of the previous page" instead
+-- of an OFFSET. With this index every page is a short index range scan that
+-- stops after limit + 1 rows, however long the student's history is.
+--
+-- Apply with the Supabase SQL editor or: psql "$DATABASE_URL" -f sql/exam_results_history_index.sql
+-- (concurrently: the table stays writable while the index builds; cannot run inside a transaction)
+
+create index concurrently if not exists exam_results_student_history_idx
+  on exam_results (student_id, datetime desc, id desc);
@@ -0,0 +1,99 @@
+-- Single-round-trip exam loader used by ExamService when EXAM_DATA_BACKEND = 'rpc'.
+--
+-- Returns the same nested structure as ExamService._build_full_exam_data:
+--   { exam: {..., level, sections: [durations]},
+--     sections: [{..., question_types: [{..., question_guides, passages,
+--                  questions: [{..., jlpt_question_passages, answers}]}]}] }
+-- Returns NULL when the exam does not exist.
+--
+-- Apply with the Supabase SQL editor or: psql "$DATABASE_URL" -f sql/get_full_exam_json.sql
+
+create or replace function public.get_full_exam_json(p_exam_id text)
+returns jsonb
+language sql
+stable
+set search_path = public
+as $$
+  select jsonb_build_object(
+    'exam', to_jsonb(e) || jsonb_build_object(
+      'level', (
+        select jsonb_build_object('id', l.id, 'title', l.title, 'description', l.description)
+        from levels l
+        where l.id = e.level_id
+      ),
+      'sections', coalesce((
+        select jsonb_agg(
+          jsonb_build_object(
+            'id', s.id,
+            'duration', s.duration,
+            'position', s.position,
+            'is_listening', s.is_listening,
+            'type', s.type
+          ) order by s.position
+        )
+        from jlpt_exam_sections s
+        where s.exam_id = e.id
+      ), '[]'::jsonb)
+    ),
+    'sections', coalesce((
+      select jsonb_agg(
+        to_jsonb(s) || jsonb_build_object(
+          'question_types', coalesce((
+            select jsonb_agg(
+              to_jsonb(qt) || jsonb_build_object(
+                'question_guides', (
+                  select jsonb_build_object('id', g.id, 'name', g.name)
+                  from jlpt_question_guides g
+                  where g.id = qt.question_guides_id
+                ),
+                'passages', coalesce((
+                  select jsonb_agg(jsonb_build_object(
+                    'id', p.id,
+                    'question_type_id', p.question_type_id,
+                    'content', p.content,
+                    'underline_text', p.underline_text
+                  ))
+                  from jlpt_question_passages p
+                  where p.question_type_id = qt.id
+                ), '[]'::jsonb),
+                'questions', coalesce((
+                  select jsonb_agg(
+                    to_jsonb(q) || jsonb_build_object(
+                      'jlpt_question_passages', (
+                        select jsonb_build_array(jsonb_build_object(
+                          'id', p.id,
+                          'question_type_id', p.question_type_id,
+                          'content', p.content,
+                          'underline_text', p.underline_text
+                        ))
+                        from jlpt_question_passages p
+                        where p.id = q.question_passages_id
+                      ),
+                      'answers', coalesce((
+                        select jsonb_agg(to_jsonb(a) order by a.show_order)
+                        from jlpt_answers a
+                        where a.question_id = q.id
+                          and a.deleted_at is null
+                      ), '[]'::jsonb)
+                    ) order by q.position
+                  )
+                  from jlpt_questions q
+                  where q.question_type_id = qt.id
+                    and q.deleted_at is null
+                ), '[]'::jsonb)
+              ) order by qt.id
+            )
+            from jlpt_question_types qt
+            where qt.exam_section_id = s.id
+          ), '[]'::jsonb)
+        ) order by s.position
+      )
+      from jlpt_exam_sections s
+      where s.exam_id = e.id
+    ), '[]'::jsonb)
+  )
+  from jlpt_exams e
+  where e.id::text = p_exam_id;
+$$;
+
+grant execute on function public.get_full_exam_json(text) to service_role;
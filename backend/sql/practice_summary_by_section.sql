@@ -0,0 +1,49 @@
+-- Practice averages of one student aggregated in the database, used by the
+-- dashboard when PRACTICE_SUMMARY_BACKEND = 'sql'.
+--
+-- Same grouping as DashboardService.summarize_practice (level title x section
+-- vietsub over every exam_result_sections row of the student), but only one
+-- row per level and section leaves the database instead of every joined row.
+-- The sums are returned rather than rounded averages so the final rounding
+-- stays in Python (Postgres round() and Python round() differ on .5) and the
+-- result matches the Python loop exactly.
+--
+-- request_score is the one of the student's latest exam of the level.
+--
+-- Apply with the Supabase SQL editor or: psql "$DATABASE_URL" -f sql/practice_summary_by_section.sql
+
+-- p_student_id takes the type of exam_results.student_id (index on student_id stays usable)
+create or replace function public.practice_summary_by_section(p_student_id exam_results.student_id%type)
+returns table (
+  level_title      text,
+  section_title    text,
+  request_score    numeric,
+  section_position numeric,
+  score_sum        numeric,
+  max_sum          numeric,
+  result_count     integer
+)
+language sql
+stable
+set search_path = public
+as $$
+  select l.title::text,
+         es.vietsub::text,
+         (array_agg(e.request_score order by r.datetime desc))[1]::numeric,
+         min(es.position)::numeric,
+         sum(coalesce(rs.score, 0))::numeric,
+         sum(coalesce(rs.max_score, 0))::numeric,
+         count(*)::integer
+    from exam_result_sections rs
+    join exam_results r on r.id = rs.exam_result_id
+    join jlpt_exams e on e.id = r.exam_id
+    join levels l on l.id = e.level_id
+    join jlpt_exam_sections es on es.id = rs.exam_section_id
+   where r.student_id = p_student_id
+     and coalesce(l.title, '') <> ''
+     and coalesce(es.vietsub, '') <> ''
+   group by l.title, es.vietsub
+   order by l.title, min(es.position);
+$$;
+
+grant execute on function public.practice_summary_by_section to service_role;
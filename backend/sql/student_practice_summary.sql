@@ -0,0 +1,203 @@
+-- Per-student practice summary rollup used by the dashboard when
+-- PRACTICE_SUMMARY_BACKEND = 'rollup'.
+--
+-- One row per student x level x section title with the running sums the
+-- dashboard averages (score_sum / result_count, max_sum / result_count), so
+-- DashboardService reads O(levels x sections) rows instead of every
+-- exam_result_sections row the student ever produced.
+--
+--   apply_practice_summary(p_payload)      adds the section scores of one submission
+--   save_result_sections(p_payload)        writes the exam_result_sections rows of one
+--                                          exam_result and applies their deltas, in one transaction
+--   rebuild_practice_summary(p_student_id) recomputes from exam_result_sections
+--                                          (python manage.py backfill_practice_summary)
+--
+-- p_payload = {
+--   "student_id": ...,
+--   "sections": [{exam_section_id, score, max_score, result_count}]
+-- }
+-- score / max_score / result_count are deltas: a full submission adds
+-- (score, max_score, 1); a resubmitted listening section adds
+-- (new - old score, new - old max, 0).
+--
+-- save_result_sections needs the unique index of sql/exam_result_sections_unique.sql.
+-- Apply with the Supabase SQL editor or: psql "$DATABASE_URL" -f sql/student_practice_summary.sql
+-- then run the backfill before switching PRACTICE_SUMMARY_BACKEND to 'rollup'.
+
+-- Column types follow exam_results.student_id / jlpt_exams.level_id
+create table if not exists public.student_practice_summary as
+select r.student_id,
+       e.level_id,
+       es.vietsub                 as section_title,
+       l.title                    as level_title,
+       e.request_score,
+       es.position                as section_position,
+       0::double precision        as score_sum,
+       0::double precision        as max_sum,
+       0::integer                 as result_count,
+       now()                      as updated_at
+  from exam_results r
+  join jlpt_exams e on e.id = r.exam_id
+  join levels l on l.id = e.level_id
+  cross join jlpt_exam_sections es
+with no data;
+
+do $$
+begin
+  if not exists (select 1 from pg_constraint where conname = 'student_practice_summary_pkey') then
+    alter table public.student_practice_summary
+      add constraint student_practice_summary_pkey primary key (student_id, level_id, section_title);
+  end if;
+end;
+$$;
+
+create or replace function public.apply_practice_summary(p_payload jsonb)
+returns void
+language plpgsql
+volatile
+set search_path = public
+as $$
+declare
+  v_student_id student_practice_summary.student_id%type := p_payload ->> 'student_id';
+begin
+  insert into student_practice_summary as ps
+         (student_id, level_id, section_title, level_title, request_score, section_position,
+          score_sum, max_sum, result_count, updated_at)
+  select v_student_id, e.level_id, es.vietsub, max(l.title), max(e.request_score), min(es.position),
+         sum(coalesce(s.score, 0)), sum(coalesce(s.max_score, 0)),
+         sum(coalesce((item ->> 'result_count')::integer, 1)), now()
+    from jsonb_array_elements(coalesce(p_payload -> 'sections', '[]'::jsonb)) item
+   cross join lateral jsonb_populate_record(null::exam_result_sections, item) s
+    join jlpt_exam_sections es on es.id = s.exam_section_id
+    join jlpt_exams e on e.id = es.exam_id
+    join levels l on l.id = e.level_id
+   where coalesce(l.title, '') <> ''
+     and coalesce(es.vietsub, '') <> ''
+   group by e.level_id, es.vietsub
+  on conflict (student_id, level_id, section_title) do update
+     set score_sum        = ps.score_sum + excluded.score_sum,
+         max_sum          = ps.max_sum + excluded.max_sum,
+         result_count     = ps.result_count + excluded.result_count,
+         level_title      = excluded.level_title,
+         request_score    = excluded.request_score,
+         section_position = least(ps.section_position, excluded.section_position),
+         updated_at       = excluded.updated_at;
+end;
+$$;
+
+-- Sections of one exam_result, written together with their rollup deltas.
+--
+-- p_payload = {
+--   "exam_result_id": ...,
+--   "sections": [{exam_section_id, score, max_score}],
+--   "replace": false | true
+-- }
+-- replace = false (submission worker): inserts the sections not saved yet and
+--   adds (score, max_score, 1) for them. A retried job skips the rows a previous
+--   attempt committed, and those rows were committed with their deltas.
+-- replace = true (resubmitted listening part): upserts the sections, adds
+--   (new - old score, new - old max, 1 if the section is new) to the rollup and
+--   the score change to exam_results.sum_score.
+-- The deltas come from the rows as stored when the write happens, not from
+-- scores the caller read earlier. The exam_results row is locked first, so
+-- concurrent calls for one result run one after the other.
+-- Returns the exam_results row.
+create or replace function public.save_result_sections(p_payload jsonb)
+returns jsonb
+language plpgsql
+volatile
+set search_path = public
+as $$
+declare
+  v_result_id exam_results.id%type := p_payload ->> 'exam_result_id';
+  v_replace boolean := coalesce((p_payload ->> 'replace')::boolean, false);
+  v_sections jsonb := coalesce(p_payload -> 'sections', '[]'::jsonb);
+  v_result exam_results;
+  v_deltas jsonb;
+begin
+  select * into v_result from exam_results where id = v_result_id for update;
+  if not found then
+    raise exception 'exam_result % not found', v_result_id;
+  end if;
+
+  select coalesce(jsonb_agg(jsonb_build_object(
+           'exam_section_id', n.exam_section_id,
+           'score', coalesce(n.score, 0) - coalesce(o.score, 0),
+           'max_score', coalesce(n.max_score, 0) - coalesce(o.max_score, 0),
+           'result_count', case when o.exam_section_id is null then 1 else 0 end
+         )), '[]'::jsonb)
+    into v_deltas
+    from jsonb_populate_recordset(null::exam_result_sections, v_sections) n
+    left join exam_result_sections o
+      on o.exam_result_id = v_result_id and o.exam_section_id = n.exam_section_id
+   where v_replace or o.exam_section_id is null;
+
+  if v_replace then
+    insert into exam_result_sections (exam_result_id, exam_section_id, score, max_score)
+    select v_result_id, s.exam_section_id, s.score, s.max_score
+      from jsonb_populate_recordset(null::exam_result_sections, v_sections) s
+    on conflict (exam_result_id, exam_section_id) do update
+       set score     = excluded.score,
+           max_score = excluded.max_score;
+
+    update exam_results
+       set sum_score = coalesce(sum_score, 0)
+                       + (select coalesce(sum((d ->> 'score')::numeric), 0) from jsonb_array_elements(v_deltas) d)
+     where id = v_result_id
+    returning * into v_result;
+  else
+    insert into exam_result_sections (exam_result_id, exam_section_id, score, max_score)
+    select v_result_id, s.exam_section_id, s.score, s.max_score
+      from jsonb_populate_recordset(null::exam_result_sections, v_sections) s
+    on conflict (exam_result_id, exam_section_id) do nothing;
+  end if;
+
+  perform apply_practice_summary(jsonb_build_object('student_id', v_result.student_id, 'sections', v_deltas));
+
+  return to_jsonb(v_result);
+end;
+$$;
+
+-- p_student_id = null rebuilds every student. Returns the number of rows written.
+-- The table lock makes concurrent apply_practice_summary / save_result_sections
+-- calls wait for the rebuild; run it outside exam-day peaks.
+create or replace function public.rebuild_practice_summary(p_student_id text default null)
+returns integer
+language plpgsql
+volatile
+set search_path = public
+as $$
+declare
+  v_student_id student_practice_summary.student_id%type := p_student_id;
+  v_rows integer;
+begin
+  lock table student_practice_summary in share row exclusive mode;
+
+  delete from student_practice_summary
+   where v_student_id is null or student_id = v_student_id;
+
+  insert into student_practice_summary
+         (student_id, level_id, section_title, level_title, request_score, section_position,
+          score_sum, max_sum, result_count, updated_at)
+  select r.student_id, e.level_id, es.vietsub, max(l.title),
+         (array_agg(e.request_score order by r.datetime desc))[1], min(es.position),
+         sum(coalesce(rs.score, 0)), sum(coalesce(rs.max_score, 0)), count(*), now()
+    from exam_result_sections rs
+    join exam_results r on r.id = rs.exam_result_id
+    join jlpt_exams e on e.id = r.exam_id
+    join levels l on l.id = e.level_id
+    join jlpt_exam_sections es on es.id = rs.exam_section_id
+   where (v_student_id is null or r.student_id = v_student_id)
+     and coalesce(l.title, '') <> ''
+     and coalesce(es.vietsub, '') <> ''
+   group by r.student_id, e.level_id, es.vietsub;
+
+  get diagnostics v_rows = row_count;
+  return v_rows;
+end;
+$$;
+
+grant select on public.student_practice_summary to service_role;
+grant execute on function public.apply_practice_summary(jsonb) to service_role;
+grant execute on function public.save_result_sections(jsonb) to service_role;
+grant execute on function public.rebuild_practice_summary(text) to service_role;
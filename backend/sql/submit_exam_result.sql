@@ -0,0 +1,56 @@
+-- Transactional submission writer used by ExamService when EXAM_SUBMIT_BACKEND = 'rpc'.
+--
+-- p_payload = {
+--   "result":   {exam_id, student_id, sum_score, duration, datetime, created_at},
+--   "answers":  [{exam_section_id, exam_question_id, chosen_answer_id, position, created_at}],
+--   "sections": [{exam_section_id, score, max_score}],
+--   "practice_summary": true   (optional, PRACTICE_SUMMARY_BACKEND = 'rollup')
+-- }
+--
+-- Inserts exam_results, save_answers, exam_result_sections and certificates in
+-- one transaction (a function call is atomic) and returns the new exam_results
+-- row. Any failure rolls back every insert, so no partial submission is left.
+-- With "practice_summary" the section scores are also added to the dashboard
+-- rollup (sql/student_practice_summary.sql) in the same transaction.
+--
+-- Apply with the Supabase SQL editor or: psql "$DATABASE_URL" -f sql/submit_exam_result.sql
+
+create or replace function public.submit_exam_result(p_payload jsonb)
+returns jsonb
+language plpgsql
+volatile
+set search_path = public
+as $$
+declare
+  v_result exam_results;
+begin
+  insert into exam_results (exam_id, student_id, sum_score, duration, datetime, created_at)
+  select r.exam_id, r.student_id, r.sum_score, r.duration,
+         coalesce(r.datetime, now()), coalesce(r.created_at, now())
+  from jsonb_populate_record(null::exam_results, p_payload -> 'result') r
+  returning * into v_result;
+
+  insert into save_answers (exam_result_id, exam_section_id, exam_question_id, chosen_answer_id, position, created_at)
+  select v_result.id, a.exam_section_id, a.exam_question_id, a.chosen_answer_id, a.position,
+         coalesce(a.created_at, now())
+  from jsonb_populate_recordset(null::save_answers, coalesce(p_payload -> 'answers', '[]'::jsonb)) a;
+
+  insert into exam_result_sections (exam_result_id, exam_section_id, score, max_score)
+  select v_result.id, s.exam_section_id, s.score, s.max_score
+  from jsonb_populate_recordset(null::exam_result_sections, coalesce(p_payload -> 'sections', '[]'::jsonb)) s;
+
+  insert into certificates (student_id, exam_result_id, created_at)
+  values (v_result.student_id, v_result.id, now());
+
+  if coalesce((p_payload ->> 'practice_summary')::boolean, false) then
+    perform apply_practice_summary(jsonb_build_object(
+      'student_id', v_result.student_id,
+      'sections', coalesce(p_payload -> 'sections', '[]'::jsonb)
+    ));
+  end if;
+
+  return to_jsonb(v_result);
+end;
+$$;
+
+grant execute on function public.submit_exam_result(jsonb) to service_role;
@@ -2,8 +2,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .services import TranslationService
+from config.rate_limit import scoped_throttle
 
 class GeminiTranslateView(APIView):
+    # Mỗi lần dịch là 1 lần gọi Gemini (tính phí) -> giới hạn theo tài khoản và IP
+    throttle_classes = [scoped_throttle('translate_gemini')]
+
     def post(self, request, *args, **kwargs):
         # Lấy văn bản cần dịch từ body của request
         text_to_translate = request.data.get('text', '').strip()
@@ -3,12 +3,14 @@ from django.views.decorators.csrf import csrf_exempt
 from django.core.mail import send_mail
 from config.supabase_client import get_supabase_client
 from django.conf import settings
-from django.contrib.auth.hashers import make_password
+from config.password_pool import make_password, PasswordPoolBusy
 import json, secrets, hashlib, os
 from datetime import datetime, timezone, timedelta
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, throttle_classes
+from config.rate_limit import scoped_throttle
 
 @api_view(['POST'])
+@throttle_classes([scoped_throttle('password_reset_email')])
 @csrf_exempt
 def forgot_password(request):
     if request.method != "POST":
@@ -119,7 +121,11 @@ def reset_password(request):
 
     # Cập nhật mật khẩu mới 
     # Dùng Argon2 với salt để mã hóa 
-    hashed_password = make_password(new_password)
+    # (chạy trong process pool giới hạn; quá tải -> 503, token chưa bị đánh dấu đã dùng)
+    try:
+        hashed_password = make_password(new_password)
+    except PasswordPoolBusy as e:
+        return JsonResponse({"error": str(e.detail)}, status=e.status_code, headers={'Retry-After': str(e.wait)})
     supabase.table("account").update({"password": hashed_password}).eq("id", user_id).execute()
 
     # Đánh dấu token là đã dùng
@@ -208,6 +214,7 @@ def check_token_status(request):
     })
 
 @api_view(['POST'])
+@throttle_classes([scoped_throttle('password_reset_email')])
 @csrf_exempt
 def resend_reset_email(request):
     """Gửi lại email đặt lại mật khẩu"""
@@ -0,0 +1,159 @@
+"""
+Shared DRF authentication for student endpoints
+
+StudentJWTAuthentication decodes the Bearer token once and resolves the
+account_id it carries to the student's id. The account -> student mapping never
+changes once the profile exists, so it is cached in-process (TTL LRU) and in
+Redis; only the first request of an account after a cold start hits Supabase.
+
+Usage on function views:
+    @api_view(['GET'])
+    @authentication_classes([StudentJWTAuthentication])
+    def view(request):
+        student_id = request.user.student_id
+"""
+import os
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+
+from config.local_cache import LocalTTLCache
+from config.supabase_client import supabase
+
+# Cùng khóa với student/login/views.py (nơi ký token)
+SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "b)-hy#9mu$@)@ahd5z+mp-t-4jsmkdq&gd#-@1+3g&4ss4e%_v")
+
+STUDENT_ID_KEY = 'student_id:account:{account_id}'
+
+_student_ids = LocalTTLCache(
+    maxsize=getattr(settings, 'STUDENT_ID_LOCAL_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'STUDENT_ID_LOCAL_CACHE_TIMEOUT', 300),
+)
+
+
+class StudentUser:
+    """Authenticated student attached to request.user"""
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, account_id: str, student_id: str, jti: str = None):
+        self.account_id = account_id
+        self.student_id = student_id
+        self.jti = jti
+
+    @property
+    def id(self) -> str:
+        return self.student_id
+
+    def __str__(self) -> str:
+        return f"student {self.student_id} (account {self.account_id})"
+
+
+def get_student_id(account_id: str):
+    """account_id -> students.id: in-process cache, then Redis, then Supabase (None if no profile)"""
+    student_id = _student_ids.get(account_id)
+    if student_id is not None:
+        return student_id
+
+    redis_key = STUDENT_ID_KEY.format(account_id=account_id)
+    try:
+        student_id = cache.get(redis_key)
+    except Exception as e:
+        print(f"Student id cache: read failed for {account_id}: {str(e)}")
+
+    if student_id is None:
+        student_res = supabase.table('students')\
+            .select('id')\
+            .eq('account_id', account_id)\
+            .limit(1)\
+            .execute()
+        if not student_res.data:
+            return None
+        student_id = student_res.data[0]['id']
+        try:
+            cache.set(redis_key, student_id, getattr(settings, 'STUDENT_ID_CACHE_TIMEOUT', 60 * 60 * 24))
+        except Exception as e:
+            print(f"Student id cache: write failed for {account_id}: {str(e)}")
+
+    _student_ids.set(account_id, student_id)
+    return student_id
+
+
+def forget_student_id(account_id: str) -> None:
+    """Drop a cached mapping (e.g. when a student profile is deleted)"""
+    _student_ids.delete(account_id)
+    try:
+        cache.delete(STUDENT_ID_KEY.format(account_id=account_id))
+    except Exception as e:
+        print(f"Student id cache: delete failed for {account_id}: {str(e)}")
+
+
+def student_token_payload(request):
+    """
+    Payload of a valid student Bearer token, or None (missing / invalid / expired token).
+    Reuses and keeps the decode on request.student_jwt (see ActiveSessionMiddleware).
+    Used where the account matters without requiring a login (rate limiting per account).
+    """
+    request = getattr(request, '_request', request)
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    jwt_token = auth_header.split(' ')[1]
+
+    decoded = getattr(request, 'student_jwt', None)
+    if decoded and decoded[0] == jwt_token:
+        return decoded[1]
+    try:
+        payload = jwt.decode(jwt_token, SECRET_KEY, algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return None
+    request.student_jwt = (jwt_token, payload)
+    return payload
+
+
+class StudentJWTAuthentication(BaseAuthentication):
+    """
+    Bearer JWT -> request.user (StudentUser), request.auth (token payload).
+    Error messages and status codes are the ones the views used to return by hand.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth_header = request.headers.get('Authorization', None)
+
+        if not auth_header or not auth_header.startswith(self.keyword + ' '):
+            raise exceptions.NotAuthenticated("Thiếu token xác thực.")
+
+        jwt_token = auth_header.split(' ')[1]
+
+        # ActiveSessionMiddleware đã giải mã token này -> dùng lại payload
+        decoded = getattr(request._request, 'student_jwt', None)
+        if decoded and decoded[0] == jwt_token:
+            payload = decoded[1]
+        else:
+            try:
+                payload = jwt.decode(jwt_token, SECRET_KEY, algorithms=["HS256"])
+            except jwt.ExpiredSignatureError:
+                raise exceptions.AuthenticationFailed("Token đã hết hạn.")
+            except jwt.InvalidTokenError:
+                raise exceptions.AuthenticationFailed("Token không hợp lệ.")
+
+        account_id = payload.get('id')
+        if not account_id:
+            raise exceptions.AuthenticationFailed("Token không hợp lệ (thiếu ID).")
+
+        try:
+            student_id = get_student_id(account_id)
+        except Exception as e:
+            raise exceptions.APIException(f"Lỗi xác thực: {e}")
+
+        if student_id is None:
+            raise exceptions.NotFound("Không tìm thấy hồ sơ học sinh cho tài khoản này.")
+
+        return StudentUser(account_id, student_id, payload.get('jti')), payload
+
+    def authenticate_header(self, request):
+        # Makes DRF answer 401 (not 403) when authentication fails
+        return self.keyword
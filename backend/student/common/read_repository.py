@@ -0,0 +1,223 @@
+"""
+Direct Postgres implementation of the hot read paths (HOT_READ_BACKEND = 'postgres')
+
+Each read is ONE statement on a pooled connection (config/postgres.py) instead
+of several PostgREST requests:
+    full_exam_parts(exam_id)         ExamService._build_full_exam_data (cache miss)
+    answer_key_rows(exam_id)         answer_key.compile_answer_key
+    practice_rows(student_id)        DashboardService._get_practice_summary
+    practice_rollup(student_id)      DashboardService._get_practice_summary (PRACTICE_SUMMARY_BACKEND = 'rollup')
+    practice_aggregates(student_id)  DashboardService._get_practice_summary (PRACTICE_SUMMARY_BACKEND = 'sql')
+    exam_history(student_id, ...)    ResultService.get_exam_history_by_student (one page)
+
+Rows are built with to_json / json_agg inside Postgres, the same serialization
+PostgREST uses, so the services receive the same dicts (same keys, nesting,
+number / timestamp formats) as from the Supabase client and keep their
+assembly code unchanged. Sync only: async services call it through
+sync_to_async(thread_sensitive=False).
+"""
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+
+from config.postgres import Statement, fetch_value
+
+# Cùng dữ liệu với ExamQueries (exam_row, section_durations, exam_sections,
+# question_types_for_sections, questions_for_types, passages_for_types, answers_for_questions)
+FULL_EXAM = Statement('hot_full_exam', """
+WITH exam AS (
+    SELECT e.*,
+           (SELECT json_build_object('id', l.id, 'title', l.title, 'description', l.description)
+              FROM levels l
+             WHERE l.id = e.level_id) AS level
+      FROM jlpt_exams e
+     WHERE e.id = $1
+),
+sections AS (
+    SELECT s.*
+      FROM jlpt_exam_sections s
+     WHERE s.exam_id IN (SELECT id FROM exam)
+),
+question_types AS (
+    SELECT qt.*,
+           (SELECT json_build_object('id', g.id, 'name', g.name)
+              FROM jlpt_question_guides g
+             WHERE g.id = qt.question_guides_id) AS question_guides
+      FROM jlpt_question_types qt
+     WHERE qt.exam_section_id IN (SELECT id FROM sections)
+),
+questions AS (
+    SELECT q.*
+      FROM jlpt_questions q
+     WHERE q.question_type_id IN (SELECT id FROM question_types)
+       AND q.deleted_at IS NULL
+)
+SELECT json_build_object(
+    'exam', (SELECT to_json(exam) FROM exam),
+    'section_durations', (
+        SELECT coalesce(json_agg(json_build_object(
+                   'id', s.id, 'duration', s.duration, 'position', s.position,
+                   'is_listening', s.is_listening, 'type', s.type
+               ) ORDER BY s.position), '[]')
+          FROM sections s
+    ),
+    'sections', (SELECT coalesce(json_agg(s ORDER BY s.position), '[]') FROM sections s),
+    'question_types', (SELECT coalesce(json_agg(qt ORDER BY qt.id), '[]') FROM question_types qt),
+    'questions', (SELECT coalesce(json_agg(q ORDER BY q.position), '[]') FROM questions q),
+    'passages', (
+        SELECT coalesce(json_agg(json_build_object(
+                   'id', p.id, 'question_type_id', p.question_type_id,
+                   'content', p.content, 'underline_text', p.underline_text
+               )), '[]')
+          FROM jlpt_question_passages p
+         WHERE p.question_type_id IN (SELECT id FROM question_types)
+    ),
+    'answers', (
+        SELECT coalesce(json_agg(a ORDER BY a.show_order), '[]')
+          FROM jlpt_answers a
+         WHERE a.question_id IN (SELECT id FROM questions)
+           AND a.deleted_at IS NULL
+    )
+)
+""")
+
+# Cùng dữ liệu với 3 truy vấn của compile_answer_key
+ANSWER_KEY = Statement('hot_answer_key', """
+WITH sections AS (
+    SELECT s.id, s.type, s.is_listening, s.position
+      FROM jlpt_exam_sections s
+     WHERE s.exam_id = $1
+),
+questions AS (
+    SELECT q.id, q.score, q.question_type_id, q.exam_section_id, q.position
+      FROM jlpt_questions q
+     WHERE q.exam_section_id IN (SELECT id FROM sections)
+       AND q.deleted_at IS NULL
+)
+SELECT json_build_object(
+    'sections', (SELECT coalesce(json_agg(s ORDER BY s.position), '[]') FROM sections s),
+    'questions', (SELECT coalesce(json_agg(q ORDER BY q.position), '[]') FROM questions q),
+    'answers', (
+        SELECT coalesce(json_agg(a), '[]')
+          FROM (SELECT a.id, a.question_id, a.points, a.position, a.is_correct
+                  FROM jlpt_answers a
+                 WHERE a.question_id IN (SELECT id FROM questions)
+                   AND a.deleted_at IS NULL) a
+    )
+)
+""")
+
+# Cùng hình dạng với select exam_result_sections + exam_results!inner(jlpt_exams!inner(levels!inner)) + jlpt_exam_sections!inner
+PRACTICE_ROWS = Statement('hot_practice_rows', """
+SELECT coalesce(json_agg(json_build_object(
+           'score', rs.score,
+           'max_score', rs.max_score,
+           'exam_results', json_build_object(
+               'student_id', r.student_id,
+               'datetime', r.datetime,
+               'jlpt_exams', json_build_object(
+                   'request_score', e.request_score,
+                   'levels', json_build_object('title', l.title)
+               )
+           ),
+           'jlpt_exam_sections', json_build_object('id', es.id, 'vietsub', es.vietsub)
+       )), '[]')
+  FROM exam_result_sections rs
+  JOIN exam_results r ON r.id = rs.exam_result_id
+  JOIN jlpt_exams e ON e.id = r.exam_id
+  JOIN levels l ON l.id = e.level_id
+  JOIN jlpt_exam_sections es ON es.id = rs.exam_section_id
+ WHERE r.student_id = $1
+""")
+
+# Cùng dữ liệu với select PRACTICE_ROLLUP_COLUMNS from student_practice_summary (sql/student_practice_summary.sql)
+PRACTICE_ROLLUP = Statement('hot_practice_rollup', """
+SELECT coalesce(json_agg(json_build_object(
+           'level_title', ps.level_title,
+           'section_title', ps.section_title,
+           'request_score', ps.request_score,
+           'score_sum', ps.score_sum,
+           'max_sum', ps.max_sum,
+           'result_count', ps.result_count
+       ) ORDER BY ps.level_title, ps.section_position), '[]')
+  FROM student_practice_summary ps
+ WHERE ps.student_id = $1
+""")
+
+# Cùng dữ liệu với RPC practice_summary_by_section (sql/practice_summary_by_section.sql)
+PRACTICE_AGGREGATES = Statement('hot_practice_aggregates', """
+SELECT coalesce(json_agg(t ORDER BY t.level_title, t.section_position), '[]')
+  FROM practice_summary_by_section($1) t
+""")
+
+# Cùng dữ liệu với ResultService._history_query: trang đầu / trang sau cursor (datetime, id)
+# (dùng index exam_results (student_id, datetime desc, id desc), sql/exam_results_history_index.sql)
+EXAM_HISTORY = Statement('hot_exam_history', """
+SELECT coalesce(json_agg(h ORDER BY h.datetime DESC, h.id DESC), '[]')
+  FROM (SELECT r.id, r.exam_id, r.sum_score, r.duration, r.datetime
+          FROM exam_results r
+         WHERE r.student_id = $1
+         ORDER BY r.datetime DESC, r.id DESC
+         LIMIT $2) h
+""")
+
+EXAM_HISTORY_AFTER = Statement('hot_exam_history_after', """
+SELECT coalesce(json_agg(h ORDER BY h.datetime DESC, h.id DESC), '[]')
+  FROM (SELECT r.id, r.exam_id, r.sum_score, r.duration, r.datetime
+          FROM exam_results r
+         WHERE r.student_id = $1
+           AND (r.datetime, r.id) < ($2, $3)
+         ORDER BY r.datetime DESC, r.id DESC
+         LIMIT $4) h
+""")
+
+
+def use_postgres_reads() -> bool:
+    """True when HOT_READ_BACKEND selects the direct Postgres read path"""
+    return getattr(settings, 'HOT_READ_BACKEND', 'supabase') == 'postgres'
+
+
+class PostgresReadRepository:
+    """Hot reads over a pooled Postgres connection (one round trip each)"""
+
+    @staticmethod
+    def full_exam_parts(exam_id: str) -> Optional[Dict]:
+        """
+        {'exam', 'section_durations', 'sections', 'question_types', 'questions',
+        'passages', 'answers'} as the batch PostgREST loader fetches them, or None
+        when the exam does not exist.
+        """
+        parts = fetch_value(FULL_EXAM, exam_id)
+        if not parts or parts.get('exam') is None:
+            return None
+        return parts
+
+    @staticmethod
+    def answer_key_rows(exam_id: str) -> Dict:
+        """{'sections', 'questions', 'answers'} used to build an AnswerKey"""
+        return fetch_value(ANSWER_KEY, exam_id)
+
+    @staticmethod
+    def practice_rows(student_id: str) -> List[Dict]:
+        """exam_result_sections rows of a student joined with level / section"""
+        return fetch_value(PRACTICE_ROWS, student_id) or []
+
+    @staticmethod
+    def practice_rollup(student_id: str) -> List[Dict]:
+        """student_practice_summary rows of a student (one per level x section)"""
+        return fetch_value(PRACTICE_ROLLUP, student_id) or []
+
+    @staticmethod
+    def practice_aggregates(student_id: str) -> List[Dict]:
+        """Score totals of a student per level x section, grouped in the database"""
+        return fetch_value(PRACTICE_AGGREGATES, student_id) or []
+
+    @staticmethod
+    def exam_history(student_id: str, limit: int, after: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """
+        Up to limit + 1 exam_results of a student (newest first) after the (datetime, id)
+        keyset `after`; exam titles are attached from the exam catalog by the service
+        """
+        if after:
+            after_datetime, after_id = after
+            return fetch_value(EXAM_HISTORY_AFTER, student_id, after_datetime, after_id, limit + 1) or []
+        return fetch_value(EXAM_HISTORY, student_id, limit + 1) or []
@@ -0,0 +1,60 @@
+"""
+Dashboard bootstrap cache backed by the shared Redis cache (django_redis)
+
+GET /dashboard/bootstrap/ (profile + grid + onboarding of one account) is
+stored per account for DASHBOARD_BOOTSTRAP_TIMEOUT seconds. The writers that
+change what it shows drop it:
+    - exam submission (full, listening, queued details)    invalidate_student(student_id)
+    - onboarding PATCH, admin account / student updates    invalidate_account(account_id) / invalidate_student(student_id)
+
+Submissions only know the student id, so every stored bootstrap also writes a
+student -> account pointer next to it.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from typing import Dict, Optional
+
+BOOTSTRAP_KEY = 'dashboard:bootstrap:{account_id}'
+STUDENT_ACCOUNT_KEY = 'dashboard:bootstrap:student:{student_id}'
+
+
+def _timeout() -> int:
+    return getattr(settings, 'DASHBOARD_BOOTSTRAP_TIMEOUT', 300)
+
+
+def get_bootstrap(account_id: str) -> Optional[Dict]:
+    """Return the cached bootstrap data of an account, or None on a miss"""
+    try:
+        return cache.get(BOOTSTRAP_KEY.format(account_id=account_id))
+    except Exception as e:
+        print(f"Dashboard cache: read failed for {account_id}: {str(e)}")
+        return None
+
+
+def set_bootstrap(account_id: str, student_id: str, data: Dict) -> None:
+    """Store the bootstrap data of an account (and the pointer used by invalidate_student)"""
+    try:
+        cache.set_many({
+            STUDENT_ACCOUNT_KEY.format(student_id=student_id): account_id,
+            BOOTSTRAP_KEY.format(account_id=account_id): data,
+        }, _timeout())
+    except Exception as e:
+        print(f"Dashboard cache: write failed for {account_id}: {str(e)}")
+
+
+def invalidate_account(account_id: str) -> None:
+    try:
+        cache.delete(BOOTSTRAP_KEY.format(account_id=account_id))
+    except Exception as e:
+        print(f"Dashboard cache: invalidation failed for {account_id}: {str(e)}")
+
+
+def invalidate_student(student_id: str) -> None:
+    """Drop the cached bootstrap of the account this student was last cached for"""
+    pointer_key = STUDENT_ACCOUNT_KEY.format(student_id=student_id)
+    try:
+        account_id = cache.get(pointer_key)
+        if account_id is not None:
+            cache.delete_many([pointer_key, BOOTSTRAP_KEY.format(account_id=account_id)])
+    except Exception as e:
+        print(f"Dashboard cache: invalidation failed for student {student_id}: {str(e)}")
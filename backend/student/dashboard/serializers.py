@@ -79,4 +79,23 @@ class DashboardGridSerializer(serializers.Serializer):
     practice_summary = serializers.DictField(read_only=True, required=False)
 
     # Dùng cho Card "Mục tiêu" (ví dụ)
-    #target_jlpt_degree = serializers.CharField(read_only=True, allow_null=True)
\ No newline at end of file
+    #target_jlpt_degree = serializers.CharField(read_only=True, allow_null=True)
+
+
+class OnboardingStateSerializer(serializers.Serializer):
+    """
+    Mục tiêu học tập hiện tại của học viên (trống -> hiển thị OnboardingModal).
+    """
+    target_exam = serializers.CharField(read_only=True, allow_null=True)
+    target_jlpt_degree = serializers.CharField(read_only=True, allow_null=True)
+    target_date = serializers.DateField(read_only=True, allow_null=True)
+    hour_per_day = serializers.FloatField(read_only=True, allow_null=True)
+
+
+class DashboardBootstrapSerializer(serializers.Serializer):
+    """
+    Dữ liệu khởi tạo Dashboard: TopBar + Dashboard Grid + Onboarding trong 1 response.
+    """
+    profile = AccountProfileSerializer(read_only=True, allow_null=True)
+    grid = DashboardGridSerializer(read_only=True)
+    onboarding = OnboardingStateSerializer(read_only=True)
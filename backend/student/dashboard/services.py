@@ -0,0 +1,401 @@
+# backend/student/dashboard/services.py
+"""
+Business logic (async) cho Dashboard
+
+Mọi truy vấn Supabase được await trên event loop qua AsyncClient của loop
+(config/supabase_client.get_async_supabase_client), dùng bởi các view async
+trong views.py. Kết quả theo quy ước {'success', 'data'|'error'};
+'data' = None nghĩa là không tìm thấy bản ghi.
+
+HOT_READ_BACKEND = 'postgres': điểm luyện đề đọc trực tiếp từ Postgres
+(student/common/read_repository.py) trong worker thread.
+
+PRACTICE_SUMMARY_BACKEND = 'rollup': điểm luyện đề đọc từ bảng tổng hợp
+student_practice_summary (sql/student_practice_summary.sql, cập nhật khi nộp bài)
+thay vì toàn bộ exam_result_sections của học sinh.
+PRACTICE_SUMMARY_BACKEND = 'sql': GROUP BY level / section trong Postgres qua RPC
+practice_summary_by_section (sql/practice_summary_by_section.sql), chỉ nhận về các tổng.
+
+get_bootstrap gom profile + grid + onboarding cho 1 lần tải trang, cache Redis theo
+account (cache.py), được xóa khi nộp bài / cập nhật onboarding / cập nhật hồ sơ.
+"""
+from typing import Dict, List
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from config.concurrency import gather_parallel
+from config.supabase_client import get_async_supabase_client
+from student.common.authentication import get_student_id
+from student.common.read_repository import PostgresReadRepository, use_postgres_reads
+from . import cache as dashboard_cache
+
+# psycopg2 chặn luồng -> chạy trong worker thread
+_practice_rows_postgres = sync_to_async(PostgresReadRepository.practice_rows, thread_sensitive=False)
+_practice_rollup_postgres = sync_to_async(PostgresReadRepository.practice_rollup, thread_sensitive=False)
+_practice_aggregates_postgres = sync_to_async(PostgresReadRepository.practice_aggregates, thread_sensitive=False)
+# Redis / cache account -> student (có thể truy vấn Supabase sync) -> worker thread
+_get_student_id = sync_to_async(get_student_id, thread_sensitive=False)
+_get_cached_bootstrap = sync_to_async(dashboard_cache.get_bootstrap, thread_sensitive=False)
+_set_cached_bootstrap = sync_to_async(dashboard_cache.set_bootstrap, thread_sensitive=False)
+_invalidate_account = sync_to_async(dashboard_cache.invalidate_account, thread_sensitive=False)
+
+STUDENT_GRID_COLUMNS = "target_date, streak_day, id, first_name, last_name, score_latest, total_exam_hour, total_test, total_exam"
+ONBOARDING_COLUMNS = ("target_exam", "target_jlpt_degree", "target_date", "hour_per_day")
+STUDENT_BOOTSTRAP_COLUMNS = STUDENT_GRID_COLUMNS + ", target_exam, target_jlpt_degree, hour_per_day"
+PRACTICE_ROLLUP_COLUMNS = "level_title, section_title, request_score, score_sum, max_sum, result_count"
+
+
+def practice_summary_backend() -> str:
+    """'rows' (Python loop), 'rollup' (student_practice_summary) or 'sql' (practice_summary_by_section)"""
+    return getattr(settings, 'PRACTICE_SUMMARY_BACKEND', 'rows')
+
+
+class DashboardService:
+    """Service (async) cho các API Dashboard"""
+
+    @staticmethod
+    async def update_onboarding(account_id: str, data_to_update: Dict) -> Dict:
+        """UPDATE students SET ... WHERE account_id = ... (trả về bản ghi sau khi cập nhật)"""
+        try:
+            response = await get_async_supabase_client().table("students") \
+                .update(data_to_update) \
+                .eq("account_id", account_id) \
+                .execute()
+            await _invalidate_account(account_id)
+            return {
+                'success': True,
+                'data': response.data[0] if response.data else None
+            }
+        except Exception as e:
+            print(f"Lỗi kết nối hoặc truy vấn Supabase (Onboarding): {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def get_profile(account_id: str) -> Dict:
+        """user_name, image_path của tài khoản (TopBar)"""
+        try:
+            response = await get_async_supabase_client().table("account") \
+                .select("user_name, image_path") \
+                .eq("id", account_id) \
+                .limit(1) \
+                .execute()
+            return {
+                'success': True,
+                'data': response.data[0] if response.data else None
+            }
+        except Exception as e:
+            print(f"Lỗi truy vấn Supabase (TopBar): {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def get_grid_data(account_id: str) -> Dict:
+        """
+        Dữ liệu Dashboard Grid: bản ghi students + điểm trung bình luyện đề.
+        students.id đã có trong bản ghi đầu tiên nên không cần truy vấn lại để lấy id.
+        """
+        try:
+            client = get_async_supabase_client()
+            response = await client.table("students") \
+                .select(STUDENT_GRID_COLUMNS) \
+                .eq("account_id", account_id) \
+                .limit(1) \
+                .execute()
+            if not response.data:
+                return {
+                    'success': True,
+                    'data': None
+                }
+
+            student_data = response.data[0]
+            student_data['practice_summary'] = await DashboardService._get_practice_summary(student_data['id'])
+            return {
+                'success': True,
+                'data': student_data
+            }
+        except Exception as e:
+            print(f"Lỗi truy vấn Supabase (DashboardGrid): {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def get_bootstrap(account_id: str) -> Dict:
+        """
+        Dữ liệu khởi tạo Dashboard trong 1 request: {'profile', 'grid', 'onboarding'}.
+        Cache hit -> không truy vấn. Miss -> account, students và điểm luyện đề được truy vấn
+        song song (students.id lấy từ cache account -> student của StudentJWTAuthentication).
+        """
+        try:
+            cached = await _get_cached_bootstrap(account_id)
+            if cached is not None:
+                return {
+                    'success': True,
+                    'data': cached
+                }
+
+            student_id = await _get_student_id(account_id)
+            if student_id is None:
+                return {
+                    'success': True,
+                    'data': None
+                }
+
+            profile, student_res, practice_summary = await gather_parallel(
+                DashboardService.get_profile(account_id),
+                get_async_supabase_client().table("students")
+                    .select(STUDENT_BOOTSTRAP_COLUMNS)
+                    .eq("account_id", account_id)
+                    .limit(1)
+                    .execute(),
+                DashboardService._get_practice_summary(student_id)
+            )
+            if not profile['success']:
+                return profile
+            if not student_res.data:
+                return {
+                    'success': True,
+                    'data': None
+                }
+
+            student_data = student_res.data[0]
+            onboarding = {column: student_data.get(column) for column in ONBOARDING_COLUMNS}
+            for column in ("target_exam", "target_jlpt_degree", "hour_per_day"):
+                student_data.pop(column, None)
+            student_data['practice_summary'] = practice_summary
+
+            bootstrap = {
+                'profile': profile['data'],
+                'grid': student_data,
+                'onboarding': onboarding
+            }
+            await _set_cached_bootstrap(account_id, student_id, bootstrap)
+            return {
+                'success': True,
+                'data': bootstrap
+            }
+        except Exception as e:
+            print(f"Lỗi truy vấn Supabase (DashboardBootstrap): {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def _get_practice_summary(student_id: str) -> Dict:
+        """
+        [Hàm private] Tính điểm trung bình luyện đề cho học sinh.
+        """
+        try:
+            backend = practice_summary_backend()
+            if backend in ('rollup', 'sql'):
+                if backend == 'rollup':
+                    totals = await DashboardService._get_practice_rollup(student_id)
+                else:
+                    totals = await DashboardService._get_practice_aggregates(student_id)
+                if not totals:
+                    print(f"DashboardGrid: Không có điểm luyện đề ({backend}) cho student_id {student_id}")
+                    return {}
+                return DashboardService.summarize_practice_totals(totals)
+
+            rows = await DashboardService._get_practice_rows(student_id)
+
+            if not rows:
+                print(f"DashboardGrid: Không có exam_result_sections cho student_id {student_id}")
+                return {}
+
+            return DashboardService.summarize_practice(rows)
+
+        except Exception as e:
+            print(f"Lỗi khi tính _get_practice_summary: {str(e)}")
+            return {}
+
+    @staticmethod
+    async def _get_practice_rows(student_id: str) -> List[Dict]:
+        """
+        exam_result_sections của học sinh (join level / section).
+        HOT_READ_BACKEND = 'postgres': 1 truy vấn Postgres trực tiếp (lỗi -> quay về PostgREST).
+        """
+        if use_postgres_reads():
+            try:
+                return await _practice_rows_postgres(student_id)
+            except Exception as e:
+                print(f"DashboardGrid: Postgres trực tiếp lỗi, dùng Supabase: {str(e)}")
+
+        sections_res = await get_async_supabase_client().table("exam_result_sections")\
+            .select("""
+                score,
+                max_score,
+                exam_results!inner (
+                    student_id,
+                    datetime,
+                    jlpt_exams!inner (
+                        request_score,
+                        levels!inner (title)
+                    )
+                ),
+                jlpt_exam_sections!inner (
+                    id,
+                    vietsub
+                )
+            """)\
+            .eq("exam_results.student_id", student_id)\
+            .execute()
+        return sections_res.data
+
+    @staticmethod
+    async def _get_practice_rollup(student_id: str) -> List[Dict]:
+        """
+        Các hàng student_practice_summary của học sinh (1 hàng / level x section).
+        HOT_READ_BACKEND = 'postgres': 1 truy vấn Postgres trực tiếp (lỗi -> quay về PostgREST).
+        """
+        if use_postgres_reads():
+            try:
+                return await _practice_rollup_postgres(student_id)
+            except Exception as e:
+                print(f"DashboardGrid: Postgres trực tiếp lỗi, dùng Supabase: {str(e)}")
+
+        rollup_res = await get_async_supabase_client().table("student_practice_summary")\
+            .select(PRACTICE_ROLLUP_COLUMNS)\
+            .eq("student_id", student_id)\
+            .order("level_title")\
+            .order("section_position")\
+            .execute()
+        return rollup_res.data
+
+    @staticmethod
+    async def _get_practice_aggregates(student_id: str) -> List[Dict]:
+        """
+        Tổng điểm theo level / section tính trong Postgres (RPC practice_summary_by_section).
+        HOT_READ_BACKEND = 'postgres': gọi hàm qua kết nối Postgres trực tiếp (lỗi -> quay về PostgREST).
+        """
+        if use_postgres_reads():
+            try:
+                return await _practice_aggregates_postgres(student_id)
+            except Exception as e:
+                print(f"DashboardGrid: Postgres trực tiếp lỗi, dùng Supabase: {str(e)}")
+
+        aggregates_res = await get_async_supabase_client()\
+            .rpc("practice_summary_by_section", {"p_student_id": student_id})\
+            .execute()
+        return aggregates_res.data
+
+    @staticmethod
+    def summarize_practice(rows: List[Dict]) -> Dict:
+        """
+        Gom các hàng exam_result_sections (đã join level / section) thành điểm
+        trung bình theo level -> section; request_score lấy từ bài thi mới nhất của level.
+        """
+        # 1. Cộng dồn điểm theo level / section
+        summary_by_level = {}
+
+        for row in rows:
+            try:
+                level_title = row['exam_results']['jlpt_exams']['levels']['title']
+                sec_name = row['jlpt_exam_sections']['vietsub']
+                req_score = row['exam_results']['jlpt_exams'].get('request_score', 90)
+                result_time = row['exam_results'].get('datetime') or ''
+
+                if not level_title or not sec_name:
+                    continue
+
+                if level_title not in summary_by_level:
+                    summary_by_level[level_title] = {
+                        'sections': {},
+                        'request_score': req_score,
+                        'latest': result_time
+                    }
+                elif result_time > summary_by_level[level_title]['latest']:
+                    # request_score theo bài thi mới nhất của level (như practice_summary_by_section),
+                    # không phụ thuộc thứ tự các hàng
+                    summary_by_level[level_title]['request_score'] = req_score
+                    summary_by_level[level_title]['latest'] = result_time
+
+                if sec_name not in summary_by_level[level_title]['sections']:
+                    summary_by_level[level_title]['sections'][sec_name] = {'score_sum': 0.0, 'max_sum': 0.0, 'count': 0}
+
+                summary_by_level[level_title]['sections'][sec_name]['score_sum'] += float(row.get('score', 0))
+                summary_by_level[level_title]['sections'][sec_name]['max_sum'] += float(row.get('max_score', 0))
+                summary_by_level[level_title]['sections'][sec_name]['count'] += 1
+
+            except (KeyError, TypeError, AttributeError) as e:
+                print(f"DashboardGrid: Bỏ qua 1 hàng bị lỗi join: {e}")
+                continue
+
+        return DashboardService._format_practice_summary(summary_by_level)
+
+    @staticmethod
+    def summarize_practice_totals(totals: List[Dict]) -> Dict:
+        """
+        Cùng kết quả với summarize_practice, từ các tổng đã tính sẵn theo level / section
+        (hàng student_practice_summary hoặc practice_summary_by_section).
+        """
+        summary_by_level = {}
+
+        for row in totals:
+            level_title = row.get('level_title')
+            sec_name = row.get('section_title')
+            if not level_title or not sec_name:
+                continue
+
+            if level_title not in summary_by_level:
+                summary_by_level[level_title] = {
+                    'sections': {},
+                    'request_score': row.get('request_score', 90)
+                }
+
+            sections = summary_by_level[level_title]['sections']
+            if sec_name not in sections:
+                sections[sec_name] = {'score_sum': 0.0, 'max_sum': 0.0, 'count': 0}
+
+            sections[sec_name]['score_sum'] += float(row.get('score_sum') or 0)
+            sections[sec_name]['max_sum'] += float(row.get('max_sum') or 0)
+            sections[sec_name]['count'] += int(row.get('result_count') or 0)
+
+        return DashboardService._format_practice_summary(summary_by_level)
+
+    @staticmethod
+    def _format_practice_summary(summary_by_level: Dict) -> Dict:
+        """[Hàm private] Điểm trung bình theo level -> section từ các tổng đã cộng dồn"""
+        # 2. Tạo dict trả về
+        final_response = {}
+
+        for level_title, level_data in summary_by_level.items():
+            summary = level_data['sections']
+            request_score_for_level = level_data['request_score']
+
+            final_sections = []
+            overall_score = 0
+            overall_max = 0
+
+            for name, data in summary.items():
+                if data['count'] == 0: continue
+
+                avg_score = round(data['score_sum'] / data['count'])
+                avg_max = round(data['max_sum'] / data['count'])
+
+                overall_score += avg_score
+                overall_max += avg_max
+
+                is_low_score = avg_score <= 29
+
+                final_sections.append({
+                    'title': name,
+                    'score': avg_score,
+                    'max': avg_max,
+                    'isLow': is_low_score
+                })
+
+            final_response[level_title] = {
+                "overall": overall_score,
+                "maxOverall": overall_max,
+                "sections": final_sections,
+                "request_score": request_score_for_level
+            }
+
+        return final_response
@@ -0,0 +1,110 @@
+from django.test import SimpleTestCase
+
+from .services import DashboardService
+
+
+def _row(level, section, score, max_score, request_score=90, datetime='2024-05-01T09:00:00+00:00'):
+    """1 hàng exam_result_sections đã join (định dạng của PostgREST / practice_rows)"""
+    return {
+        'score': score,
+        'max_score': max_score,
+        'exam_results': {'datetime': datetime, 'jlpt_exams': {'request_score': request_score, 'levels': {'title': level}}},
+        'jlpt_exam_sections': {'vietsub': section},
+    }
+
+
+def _total(level, section, score_sum, max_sum, result_count, request_score=90):
+    """1 hàng tổng hợp (student_practice_summary / practice_summary_by_section)"""
+    return {
+        'level_title': level,
+        'section_title': section,
+        'score_sum': score_sum,
+        'max_sum': max_sum,
+        'result_count': result_count,
+        'request_score': request_score,
+    }
+
+
+# Cùng dữ liệu ở 2 dạng: từng hàng exam_result_sections và tổng theo level / section
+ROWS = [
+    # N2 / Từ vựng: (20 + 21) / 2 = 20.5 -> 20 (round nửa về số chẵn)
+    _row('N2', 'Từ vựng', 20, 60, 95),
+    _row('N2', 'Từ vựng', 21, 60, 95),
+    # N2 / Nghe: (31 + 32) / 2 = 31.5 -> 32, max (60 + 61) / 2 = 60.5 -> 60
+    _row('N2', 'Nghe', 31, 60, 95),
+    _row('N2', 'Nghe', 32, 61, 95),
+    # N3 / Đọc: 1 lần, 12.5 -> 12
+    _row('N3', 'Đọc', 12.5, 60),
+    # Hàng không đủ join / thiếu tên bị bỏ qua
+    _row('N3', '', 50, 60),
+    {'score': 10, 'max_score': 60, 'exam_results': None, 'jlpt_exam_sections': {'vietsub': 'Đọc'}},
+]
+
+TOTALS = [
+    _total('N2', 'Từ vựng', 41, 120, 2, 95),
+    _total('N2', 'Nghe', 63, 121, 2, 95),
+    _total('N3', 'Đọc', 12.5, 60, 1),
+    _total('N3', '', 50, 60, 1),
+]
+
+EXPECTED = {
+    'N2': {
+        'overall': 52,
+        'maxOverall': 120,
+        'sections': [
+            {'title': 'Từ vựng', 'score': 20, 'max': 60, 'isLow': True},
+            {'title': 'Nghe', 'score': 32, 'max': 60, 'isLow': False},
+        ],
+        'request_score': 95,
+    },
+    'N3': {
+        'overall': 12,
+        'maxOverall': 60,
+        'sections': [
+            {'title': 'Đọc', 'score': 12, 'max': 60, 'isLow': True},
+        ],
+        'request_score': 90,
+    },
+}
+
+
+class PracticeSummaryTests(SimpleTestCase):
+    """summarize_practice (từng hàng) và summarize_practice_totals (rollup / aggregate) cho cùng kết quả"""
+
+    def test_rows(self):
+        self.assertEqual(DashboardService.summarize_practice(ROWS), EXPECTED)
+
+    def test_totals(self):
+        self.assertEqual(DashboardService.summarize_practice_totals(TOTALS), EXPECTED)
+
+    def test_totals_split_across_rows(self):
+        # practice_summary_by_section có thể trả nhiều hàng cho cùng level / section
+        totals = [
+            _total('N2', 'Từ vựng', 20, 60, 1, 95),
+            _total('N2', 'Từ vựng', 21, 60, 1, 95),
+        ] + TOTALS[1:]
+        self.assertEqual(DashboardService.summarize_practice_totals(totals), EXPECTED)
+
+    def test_rows_request_score_is_latest_exam(self):
+        # request_score của bài thi mới nhất trong level, dù hàng đó đứng đầu hay cuối
+        older = _row('N3', 'Đọc', 12.5, 60, 80, '2024-03-01T09:00:00+00:00')
+        newer = _row('N3', 'Đọc', 12.5, 60, 100, '2024-06-01T09:00:00+00:00')
+        for rows in ([older, newer], [newer, older]):
+            summary = DashboardService.summarize_practice(rows)
+            self.assertEqual(summary['N3']['request_score'], 100)
+
+        # ROWS thêm 1 bài N2 cũ hơn với request_score khác: kết quả không đổi theo thứ tự
+        old_n2 = _row('N2', 'Từ vựng', 20.5, 60, 70, '2023-01-01T09:00:00+00:00')
+        expected = DashboardService.summarize_practice(ROWS + [old_n2])
+        self.assertEqual(expected['N2']['request_score'], 95)
+        self.assertEqual(DashboardService.summarize_practice([old_n2] + ROWS), expected)
+        self.assertEqual(DashboardService.summarize_practice(list(reversed(ROWS + [old_n2]))), expected)
+
+    def test_zero_count_section_is_skipped(self):
+        # Dòng rollup còn lại sau khi trừ hết (result_count = 0) không tạo section
+        totals = TOTALS + [_total('N3', 'Nghe', 0, 0, 0)]
+        self.assertEqual(DashboardService.summarize_practice_totals(totals), EXPECTED)
+
+    def test_empty(self):
+        self.assertEqual(DashboardService.summarize_practice([]), {})
+        self.assertEqual(DashboardService.summarize_practice_totals([]), {})
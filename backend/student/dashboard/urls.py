@@ -1,13 +1,15 @@
 # backend/student/dashboard/urls.py
 
 from django.urls import path
-from .views import OnboardingAPIView, TopBarProfileAPIView, DashboardGridAPIView
+from .views import OnboardingAPIView, TopBarProfileAPIView, DashboardGridAPIView, DashboardBootstrapAPIView
 # (Sau này bạn sẽ import thêm DashboardDataAPIView vào đây)
 
 urlpatterns = [
     # URL: /api/v1/student/dashboard/onboarding/
     path('onboarding/', OnboardingAPIView.as_view(), name='dashboard-onboarding'),
     path('profile/', TopBarProfileAPIView.as_view(), name='dashboard-profile'),
-    path('main/', DashboardGridAPIView.as_view(), name='dashboard-main-data')
+    path('main/', DashboardGridAPIView.as_view(), name='dashboard-main-data'),
+    # Profile + grid + onboarding trong 1 request (có cache)
+    path('bootstrap/', DashboardBootstrapAPIView.as_view(), name='dashboard-bootstrap'),
     
 ]
\ No newline at end of file
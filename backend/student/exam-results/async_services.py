@@ -0,0 +1,131 @@
+# results/async_services.py
+
+from asgiref.sync import sync_to_async
+from config.supabase_client import get_async_supabase_client
+from student.common.read_repository import PostgresReadRepository, use_postgres_reads
+from student.exam import cache as exam_cache
+from typing import Dict, List, Optional, Tuple
+
+from .services import ResultService
+
+# Dùng AsyncExamService để lấy đề thi gốc (cùng cache Redis với ExamService)
+try:
+    from exam.async_services import AsyncExamService
+except ImportError:
+    from ..exam.async_services import AsyncExamService
+
+# psycopg2 chặn luồng -> chạy trong worker thread
+_exam_history_postgres = sync_to_async(PostgresReadRepository.exam_history, thread_sensitive=False)
+_get_content_version = sync_to_async(exam_cache.get_content_version, thread_sensitive=False)
+
+
+class AsyncResultService:
+    """
+    Phiên bản async của ResultService (view async dưới ASGI).
+    Cùng truy vấn và cùng phần gộp dữ liệu với ResultService.
+    """
+
+    @staticmethod
+    async def get_exam_history_by_student(student_id: str, limit: int, after: Optional[Tuple[str, int]] = None) -> Dict:
+        """Một trang lịch sử bài làm của học sinh (mới nhất lên đầu), xem ResultService.get_exam_history_by_student"""
+        try:
+            rows = None
+            if use_postgres_reads():
+                try:
+                    rows = await _exam_history_postgres(student_id, limit, after)
+                except Exception as e:
+                    print(f"Lịch sử bài làm: Postgres trực tiếp lỗi, dùng Supabase: {str(e)}")
+
+            if rows is None:
+                response = await ResultService._history_query(
+                    get_async_supabase_client(), student_id, limit, after
+                ).execute()
+                rows = response.data
+
+            return {
+                'success': True,
+                'data': ResultService._history_page(rows, limit, await AsyncResultService._history_catalog(rows))
+            }
+        except Exception as e:
+            print(f"Lỗi khi lấy lịch sử bài làm: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def _history_catalog(rows: List[Dict]) -> Dict:
+        """Danh mục đề thi cho các dòng lịch sử, xem ResultService._history_catalog"""
+        catalog_result = await AsyncExamService.get_exam_catalog()
+        if not catalog_result['success']:
+            print(f"Lịch sử bài làm: không tải được danh mục đề thi: {catalog_result['error']}")
+            return {}
+        missing = ResultService._uncatalogued_exam_ids(rows, catalog_result['data'])
+        if not missing:
+            return catalog_result['data']
+        entries_result = await AsyncExamService.get_exam_catalog_entries(sorted(missing))
+        return ResultService._with_catalog_entries(catalog_result['data'], entries_result)
+
+    @staticmethod
+    async def get_result_detail(student_id: str, exam_result_id: int) -> Dict:
+        """Chi tiết bài làm (review) gộp với (bản sao của) đề thi gốc"""
+        try:
+            # 1. XÁC MINH QUYỀN SỞ HỮU + LẤY BÀI LÀM (1 truy vấn)
+            review_res = await ResultService._review_query(
+                get_async_supabase_client(), student_id, exam_result_id
+            ).execute()
+            if not review_res.data:
+                return {'success': False, 'error': 'Không tìm thấy kết quả bài làm'}
+
+            result_metadata, student_answer_rows = ResultService._split_review_row(review_res.data)
+
+            # 2. Đề thi gốc (cache Redis dùng chung, không bị sửa)
+            exam_data_result = await AsyncExamService.get_full_exam_data(result_metadata['exam_id'])
+            if not exam_data_result['success']:
+                return {'success': False, 'error': 'Không thể tải được đề thi gốc'}
+
+            exam_content = ResultService._merge_student_answers(
+                exam_data_result['data'],
+                ResultService._review_choices(student_answer_rows)
+            )
+
+            return {
+                'success': True,
+                'data': {
+                    'result_info': result_metadata,
+                    'exam_content': exam_content
+                }
+            }
+
+        except Exception as e:
+            print(f"Lỗi nghiêm trọng trong get_result_detail: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def get_result_choices(student_id: str, exam_result_id: int) -> Dict:
+        """Review gọn (metadata, lựa chọn, content version), xem ResultService.get_result_choices"""
+        try:
+            review_res = await ResultService._review_query(
+                get_async_supabase_client(), student_id, exam_result_id
+            ).execute()
+            if not review_res.data:
+                return {'success': False, 'error': 'Không tìm thấy kết quả bài làm'}
+
+            result_metadata, student_answer_rows = ResultService._split_review_row(review_res.data)
+            return {
+                'success': True,
+                'data': ResultService._review_payload(
+                    result_metadata,
+                    await _get_content_version(result_metadata['exam_id']),
+                    student_answer_rows
+                )
+            }
+        except Exception as e:
+            print(f"Lỗi khi lấy lựa chọn của bài làm: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
@@ -22,4 +22,9 @@ class ExamResultHistorySerializer(serializers.Serializer):
     datetime = serializers.DateTimeField() # Thời gian nộp bài
     
     # Lồng (nested) ExamBasicSerializer để lấy thông tin đề thi
-    jlpt_exams = ExamBasicSerializer(required=False, source='exam')
\ No newline at end of file
+    jlpt_exams = ExamBasicSerializer(required=False, source='exam')
+
+# Một trang lịch sử bài làm (phân trang theo cursor)
+class ExamResultHistoryPageSerializer(serializers.Serializer):
+    results = ExamResultHistorySerializer(many=True)
+    next_cursor = serializers.CharField(allow_null=True)
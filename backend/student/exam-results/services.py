@@ -1,7 +1,18 @@
 # results/services.py (Tệp mới)
 
+import base64
+import binascii
+from datetime import datetime
+from django.conf import settings
 from config.supabase_client import supabase # Giả định import từ đây
-from typing import Dict, List, Optional
+from student.common.read_repository import PostgresReadRepository, use_postgres_reads
+from student.exam import cache as exam_cache # Phiên bản nội dung đề (trang xem lại bài làm)
+from typing import Dict, List, Optional, Tuple
+
+# Lịch sử bài làm: chỉ cột của exam_results, tên đề / level gắn từ danh mục đề (ExamService.get_exam_catalog)
+HISTORY_COLUMNS = 'id, exam_id, sum_score, duration, datetime'
+# Review: metadata của bài làm + lựa chọn của học sinh (embed save_answers)
+REVIEW_COLUMNS = 'id, exam_id, sum_score, duration, datetime, save_answers(exam_question_id, chosen_answer_id, position)'
 
 # === IMPORT TỪ APP 'exam' ===
 # Chúng ta cần tái sử dụng service của 'exam' để lấy đề thi gốc
@@ -13,41 +24,137 @@ except ImportError:
 class ResultService:
     """
     Service xử lý nghiệp vụ cho 'results'
+    (Truy vấn và phần gộp dữ liệu dùng chung với AsyncResultService - async_services.py)
     """
     
+    # --- Truy vấn (nhận client sync hoặc async, chưa execute) ---
+    
+    @staticmethod
+    def _history_query(client, student_id: str, limit: int, after: Optional[Tuple[str, int]] = None):
+        """
+        Một trang lịch sử (mới nhất lên đầu), keyset trên (datetime, id): lấy limit + 1 dòng,
+        dòng thừa cho biết còn trang sau. Tên đề / level lấy từ danh mục đề (cache), không JOIN.
+        """
+        query = client.table('exam_results')\
+            .select(HISTORY_COLUMNS)\
+            .eq('student_id', student_id)
+        if after:
+            after_datetime, after_id = after
+            query = query.or_(
+                f'datetime.lt."{after_datetime}",and(datetime.eq."{after_datetime}",id.lt.{after_id})'
+            )
+        return query\
+            .order('datetime', desc=True)\
+            .order('id', desc=True)\
+            .limit(limit + 1)
+    
+    @staticmethod
+    def _review_query(client, student_id: str, exam_result_id: int):
+        """Kết quả bài làm (chỉ của học sinh này) kèm các lựa chọn (save_answers theo 'position'), 1 truy vấn"""
+        return client.table('exam_results')\
+            .select(REVIEW_COLUMNS)\
+            .eq('id', exam_result_id)\
+            .eq('student_id', student_id)\
+            .order('position', foreign_table='save_answers')\
+            .single()
+    
     @staticmethod
-    def get_exam_history_by_student(student_id: str) -> Dict:
+    def parse_history_page(limit: Optional[str], cursor: Optional[str]) -> Tuple[int, Optional[Tuple[str, int]]]:
         """
-        Lấy lịch sử bài làm (exam_results) của một học sinh.
-        JOIN với jlpt_exams và levels để lấy tên.
+        ?limit=&cursor= -> (limit, after). ValueError nếu tham số không hợp lệ.
+        limit mặc định EXAM_HISTORY_PAGE_SIZE, tối đa EXAM_HISTORY_MAX_PAGE_SIZE.
         """
+        if limit in (None, ''):
+            page_size = getattr(settings, 'EXAM_HISTORY_PAGE_SIZE', 20)
+        else:
+            try:
+                page_size = int(limit)
+            except (TypeError, ValueError):
+                raise ValueError('limit phải là số nguyên dương')
+            if page_size < 1:
+                raise ValueError('limit phải là số nguyên dương')
+        page_size = min(page_size, getattr(settings, 'EXAM_HISTORY_MAX_PAGE_SIZE', 100))
+
+        if not cursor:
+            return page_size, None
         try:
-            # Truy vấn Supabase:
-            # 1. Chọn từ bảng 'exam_results'
-            # 2. Lọc (filter) theo 'student_id'
-            # 3. JOIN với bảng 'jlpt_exams' (lấy id, title)
-            # 4. Từ 'jlpt_exams', JOIN tiếp với 'levels' (lấy id, title)
-            # 5. Sắp xếp theo 'datetime' (bài làm mới nhất lên đầu)
+            decoded = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            after_datetime, after_id = decoded.rsplit('|', 1)
+            datetime.fromisoformat(after_datetime)
+            return page_size, (after_datetime, int(after_id))
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            raise ValueError('cursor không hợp lệ')
+    
+    @staticmethod
+    def _encode_history_cursor(row: Dict) -> str:
+        """Cursor mờ (opaque) trỏ tới dòng cuối của trang: base64(datetime|id)"""
+        raw = f"{row['datetime']}|{row['id']}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def _uncatalogued_exam_ids(rows: List[Dict], catalog: Dict) -> set:
+        return {str(row['exam_id']) for row in rows if row.get('exam_id') is not None} - catalog.keys()
+    
+    @staticmethod
+    def _history_page(rows: List[Dict], limit: int, catalog: Dict) -> Dict:
+        """
+        [Private] {'results', 'next_cursor'}: bỏ dòng thừa, gắn 'exam' (id, title, level)
+        từ danh mục đề như embed jlpt_exams(levels) trước đây
+        """
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        for row in rows:
+            row['exam'] = catalog.get(str(row.get('exam_id')))
+        return {
+            'results': rows,
+            'next_cursor': ResultService._encode_history_cursor(rows[-1]) if has_more else None
+        }
+    
+    @staticmethod
+    def _history_catalog(rows: List[Dict]) -> Dict:
+        """[Private] Danh mục đề thi cho các dòng lịch sử ({} nếu không tải được)"""
+        catalog_result = ExamService.get_exam_catalog()
+        if not catalog_result['success']:
+            print(f"Lịch sử bài làm: không tải được danh mục đề thi: {catalog_result['error']}")
+            return {}
+        missing = ResultService._uncatalogued_exam_ids(rows, catalog_result['data'])
+        if not missing:
+            return catalog_result['data']
+        # Đề mới tạo ngoài trang admin (chưa có trong cache): chỉ tải các đề còn thiếu,
+        # không làm mới cả danh mục (đề đã xóa hẳn được cache là "không có")
+        entries_result = ExamService.get_exam_catalog_entries(sorted(missing))
+        return ResultService._with_catalog_entries(catalog_result['data'], entries_result)
+    
+    @staticmethod
+    def _with_catalog_entries(catalog: Dict, entries_result: Dict) -> Dict:
+        """[Private] Danh mục + các đề tải thêm (bản sao: danh mục có thể đang được chia sẻ)"""
+        if not entries_result['success']:
+            print(f"Lịch sử bài làm: không tải được đề thiếu trong danh mục: {entries_result['error']}")
+            return catalog
+        return {**catalog, **entries_result['data']}
+    
+    @staticmethod
+    def get_exam_history_by_student(student_id: str, limit: int, after: Optional[Tuple[str, int]] = None) -> Dict:
+        """
+        Lấy một trang lịch sử bài làm (exam_results) của một học sinh, mới nhất lên đầu.
+        after: (datetime, id) của dòng cuối trang trước (parse_history_page).
+        data: {'results': [...], 'next_cursor': str | None}
+        """
+        try:
+            rows = None
+            # HOT_READ_BACKEND = 'postgres': cùng dữ liệu qua 1 truy vấn Postgres trực tiếp
+            if use_postgres_reads():
+                try:
+                    rows = PostgresReadRepository.exam_history(student_id, limit, after)
+                except Exception as e:
+                    print(f"Lịch sử bài làm: Postgres trực tiếp lỗi, dùng Supabase: {str(e)}")
             
-            response = supabase.table('exam_results')\
-                .select('''
-                    id, 
-                    sum_score, 
-                    duration, 
-                    datetime,
-                    exam:jlpt_exams (
-                        id, 
-                        title,
-                        level:levels (id, title)
-                    )
-                ''')\
-                .eq('student_id', student_id)\
-                .order('datetime', desc=True)\
-                .execute()
+            if rows is None:
+                rows = ResultService._history_query(supabase, student_id, limit, after).execute().data
             
             return {
                 'success': True,
-                'data': response.data
+                'data': ResultService._history_page(rows, limit, ResultService._history_catalog(rows))
             }
         except Exception as e:
             print(f"Lỗi khi lấy lịch sử bài làm: {str(e)}")
@@ -56,6 +163,64 @@ class ResultService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def _split_review_row(row: Dict):
+        """[Private] Dòng _review_query -> (result_info, các dòng save_answers)"""
+        result_info = dict(row)
+        return result_info, result_info.pop('save_answers', None) or []
+    
+    @staticmethod
+    def _review_choices(student_answer_rows: List[Dict]) -> Dict[str, List]:
+        """
+        [Private] {question_id: [chosen_answer_id, ...]} theo thứ tự 'position'.
+        Luôn là danh sách: câu sắp xếp (is_Sort_Question) dùng cả danh sách, câu thường dùng phần tử cuối.
+        """
+        choices = {}
+        for ans in student_answer_rows:
+            q_id = ans['exam_question_id']
+            if q_id is None:
+                continue
+            choices.setdefault(q_id, []).append(ans['chosen_answer_id'])
+        return choices
+    
+    @staticmethod
+    def _merge_student_answers(exam_content: Dict, choices: Dict[str, List]) -> Dict:
+        """
+        [Private] Bản sao của đề thi có gắn lựa chọn của học sinh:
+        question['student_chosen_answer_id'], answer['is_student_choice'].
+        Câu hỏi sắp xếp (is_Sort_Question) nhận danh sách id theo thứ tự 'position'.
+        Đề thi gốc (đọc từ cache, dùng chung) không bị sửa: chỉ các phần trên đường đi được sao chép.
+        """
+        def merge_question(question: Dict, is_sort: bool) -> Dict:
+            chosen = choices.get(question.get('id'))
+            if is_sort:
+                chosen_data = chosen
+            else:
+                chosen_data = chosen[-1] if chosen else None
+            
+            merged = dict(question, student_chosen_answer_id=chosen_data)
+            if 'answers' in question:
+                merged['answers'] = [
+                    dict(answer, is_student_choice=(
+                        answer.get('id') in chosen_data if isinstance(chosen_data, list)
+                        else answer.get('id') == chosen_data
+                    )) if answer else answer
+                    for answer in question['answers']
+                ]
+            return merged
+        
+        def merge_question_type(qt: Dict) -> Dict:
+            is_sort = qt.get('is_Sort_Question', False)
+            return dict(qt, questions=[
+                merge_question(question, is_sort) if question else question
+                for question in qt.get('questions', [])
+            ])
+        
+        return dict(exam_content, sections=[
+            dict(section, question_types=[merge_question_type(qt) for qt in section.get('question_types', [])])
+            for section in exam_content.get('sections', [])
+        ])
+    
     @staticmethod
     def get_result_detail(student_id: str, exam_result_id: int) -> Dict:
         """
@@ -63,90 +228,27 @@ class ResultService:
         (ĐÃ CẬP NHẬT để xử lý câu hỏi sắp xếp)
         """
         try:
-            # 1. XÁC MINH QUYỀN SỞ HỮU (Giữ nguyên)
-            result_meta_res = supabase.table('exam_results')\
-                .select('id, exam_id, sum_score, duration, datetime')\
-                .eq('id', exam_result_id)\
-                .eq('student_id', student_id)\
-                .single()\
-                .execute()
+            # 1. XÁC MINH QUYỀN SỞ HỮU + LẤY BÀI LÀM (1 truy vấn)
+            review_res = ResultService._review_query(supabase, student_id, exam_result_id).execute()
 
-            if not result_meta_res.data:
+            if not review_res.data:
                 return {'success': False, 'error': 'Không tìm thấy kết quả bài làm'}
             
-            result_metadata = result_meta_res.data
-            exam_id = result_metadata['exam_id']
+            result_metadata, student_answer_rows = ResultService._split_review_row(review_res.data)
 
-            # 2. LẤY ĐỀ THI GỐC (Lấy trước)
-            exam_data_result = ExamService.get_full_exam_data(exam_id)
+            # 2. ĐỀ THI GỐC (cache Redis theo content version)
+            exam_data_result = ExamService.get_full_exam_data(result_metadata['exam_id'])
             
             if not exam_data_result['success']:
                 return {'success': False, 'error': 'Không thể tải được đề thi gốc'}
-            
-            exam_content = exam_data_result['data']
 
-            # 3. TẠO MAP CÂU HỎI SẮP XẾP
-            question_type_map = {}
-            for section in exam_content.get('sections', []):
-                for qt in section.get('question_types', []):
-                    
-                    # === ĐÂY LÀ DÒNG ĐÃ SỬA ===
-                    is_sort = qt.get('is_Sort_Question', False) 
-                    # ==========================
-                    
-                    for question in qt.get('questions', []):
-                        if question: 
-                           question_type_map[question.get('id')] = is_sort
+            # 3. GỘP BÀI LÀM VÀO BẢN SAO CỦA ĐỀ THI
+            exam_content = ResultService._merge_student_answers(
+                exam_data_result['data'],
+                ResultService._review_choices(student_answer_rows)
+            )
 
-            # 4. LẤY BÀI LÀM (Sắp xếp theo 'position')
-            student_answers_res = supabase.table('save_answers')\
-                .select('exam_question_id, chosen_answer_id, position')\
-                .eq('exam_result_id', exam_result_id)\
-                .order('position', desc=False)\
-                .execute()
-            
-            # 5. XỬ LÝ BÀI LÀM (Tạo mảng cho câu 'is_sort')
-            student_answers_map = {}
-            for ans in student_answers_res.data:
-                q_id = ans['exam_question_id']
-                chosen_id = ans['chosen_answer_id']
-                
-                if q_id is None:
-                    continue 
-                    
-                is_sort = question_type_map.get(q_id, False)
-
-                if is_sort:
-                    if q_id not in student_answers_map:
-                        student_answers_map[q_id] = []
-                    student_answers_map[q_id].append(chosen_id)
-                else:
-                    student_answers_map[q_id] = chosen_id
-
-            # 6. GỘP (MERGE) DỮ LIỆU
-            for section in exam_content.get('sections', []):
-                for qt in section.get('question_types', []):
-                    for question in qt.get('questions', []):
-                        if not question:
-                            continue 
-                        
-                        q_id = question.get('id')
-                        chosen_data = student_answers_map.get(q_id)
-                        
-                        question['student_chosen_answer_id'] = chosen_data
-                        
-                        for answer in question.get('answers', []):
-                            if not answer:
-                                continue 
-                                
-                            a_id = answer.get('id')
-                            
-                            if isinstance(chosen_data, list):
-                                answer['is_student_choice'] = (a_id in chosen_data)
-                            else:
-                                answer['is_student_choice'] = (a_id == chosen_data)
-
-            # 7. ĐÓNG GÓI
+            # 4. ĐÓNG GÓI
             final_data = {
                 'result_info': result_metadata, 
                 'exam_content': exam_content
@@ -162,4 +264,41 @@ class ResultService:
             return {
                 'success': False,
                 'error': str(e)
-            }
\ No newline at end of file
+            }
+    
+    @staticmethod
+    def get_result_choices(student_id: str, exam_result_id: int) -> Dict:
+        """
+        Review gọn: metadata của bài làm, lựa chọn của học sinh và content version của đề.
+        Client gộp với đề thi đã có (GET exam/exams/<exam_id>/full_data/, trường 'content_version'),
+        chỉ tải lại đề khi content version khác. Không đọc đề thi: 1 truy vấn + 1 lần đọc Redis.
+        """
+        try:
+            review_res = ResultService._review_query(supabase, student_id, exam_result_id).execute()
+
+            if not review_res.data:
+                return {'success': False, 'error': 'Không tìm thấy kết quả bài làm'}
+
+            result_metadata, student_answer_rows = ResultService._split_review_row(review_res.data)
+            return {
+                'success': True,
+                'data': ResultService._review_payload(
+                    result_metadata,
+                    exam_cache.get_content_version(result_metadata['exam_id']),
+                    student_answer_rows
+                )
+            }
+        except Exception as e:
+            print(f"Lỗi khi lấy lựa chọn của bài làm: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _review_payload(result_metadata: Dict, content_version: int, student_answer_rows: List[Dict]) -> Dict:
+        return {
+            'result_info': result_metadata,
+            'content_version': content_version,
+            'choices': ResultService._review_choices(student_answer_rows)
+        }
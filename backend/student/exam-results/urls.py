@@ -6,4 +6,5 @@ from . import views  # Chúng ta sẽ tạo views ở bước sau
 urlpatterns = [
     path('history/', views.get_exam_history, name='get-exam-history'),
     path('<int:exam_result_id>/', views.get_exam_result_detail, name='get-exam-result-detail'),
+    path('<int:exam_result_id>/choices/', views.get_exam_result_choices, name='get-exam-result-choices'),
 ]
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+Precompiled answer key used by ExamService._calculate_score
+
+The key for one exam version holds everything grading needs: sections, question
+scores and the correct answers of every question. It is compiled once from
+Supabase, then kept in-process and in Redis (next to the compiled exam, under the
+same content version), so grading a submission needs no database call.
+
+Storage is array-backed: answers are grouped per question in a CSR layout
+(offsets into flat arrays) and positions are stored as small ints.
+"""
+import math
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config.single_flight import coalesce
+from config.supabase_client import supabase
+from student.common.read_repository import PostgresReadRepository, use_postgres_reads
+from . import cache as exam_cache
+
+NO_ANSWER = -1
+DEFAULT_PARTIAL_POINTS = 0.5
+LOCAL_CACHE_SIZE = 64
+
+
+class AnswerKey:
+    """Compact, read-only grading index for one exam version"""
+    __slots__ = (
+        'exam_id', 'version',
+        'section_ids', 'section_types', 'section_listening',
+        'question_ids', 'question_index', 'question_section', 'question_score', 'question_partial',
+        'answer_ids', 'answer_index', 'answer_points',
+        'correct_offsets', 'correct_answer', 'correct_position',
+    )
+
+    def __init__(self, exam_id: str, version: int, sections: List[Dict], questions: List[Dict], answers: List[Dict]):
+        self.exam_id = exam_id
+        self.version = version
+
+        # Sections: parallel tuples indexed by section position in the exam
+        self.section_ids = tuple(s['id'] for s in sections)
+        self.section_types = tuple(s.get('type') for s in sections)
+        self.section_listening = bytes(1 if s.get('is_listening') else 0 for s in sections)
+        section_index = {s_id: i for i, s_id in enumerate(self.section_ids)}
+
+        # Questions
+        self.question_ids = tuple(q['id'] for q in questions)
+        self.question_index = {q_id: i for i, q_id in enumerate(self.question_ids)}
+        self.question_section = array('i', (section_index.get(q.get('exam_section_id'), -1) for q in questions))
+        self.question_score = array('d', (float(q['score']) if q.get('score') is not None else 1.0 for q in questions))
+        self.question_partial = array('i', [NO_ANSWER] * len(questions))
+
+        # Answers
+        self.answer_ids = tuple(a['id'] for a in answers)
+        self.answer_index = {a_id: i for i, a_id in enumerate(self.answer_ids)}
+        self.answer_points = array('d', (
+            float(a['points']) if a.get('points') is not None else math.nan for a in answers
+        ))
+
+        # Correct answers per question, CSR layout: entries of question i live in
+        # correct_answer[correct_offsets[i]:correct_offsets[i + 1]]
+        correct_by_question: Dict[int, List[Tuple[int, int]]] = {}
+        for a_idx, a in enumerate(answers):
+            q_idx = self.question_index.get(a['question_id'])
+            if q_idx is None:
+                continue
+            if a.get('position') is not None:
+                correct_by_question.setdefault(q_idx, []).append((a_idx, int(a['position'])))
+                if a.get('is_correct'):
+                    self.question_partial[q_idx] = a_idx
+            elif a.get('is_correct'):
+                correct_by_question.setdefault(q_idx, []).append((a_idx, 1))
+
+        self.correct_offsets = array('I', [0])
+        self.correct_answer = array('I')
+        self.correct_position = array('b')
+        for q_idx in range(len(self.question_ids)):
+            for a_idx, position in correct_by_question.get(q_idx, ()):
+                self.correct_answer.append(a_idx)
+                self.correct_position.append(position)
+            self.correct_offsets.append(len(self.correct_answer))
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def correct_answers(self, question_id: str) -> Dict[str, int]:
+        """{answer_id: position} a fully correct submission must match exactly"""
+        q_idx = self.question_index.get(question_id)
+        if q_idx is None:
+            return {}
+        start, end = self.correct_offsets[q_idx], self.correct_offsets[q_idx + 1]
+        return {
+            self.answer_ids[self.correct_answer[i]]: self.correct_position[i]
+            for i in range(start, end)
+        }
+
+    def partial_credit_answer(self, question_id: str) -> Optional[str]:
+        """Answer whose correct placement earns partial credit on sorting questions"""
+        q_idx = self.question_index.get(question_id)
+        if q_idx is None or self.question_partial[q_idx] == NO_ANSWER:
+            return None
+        return self.answer_ids[self.question_partial[q_idx]]
+
+    def answer_points_for(self, answer_id: str, default: float = DEFAULT_PARTIAL_POINTS) -> float:
+        a_idx = self.answer_index.get(answer_id)
+        if a_idx is None or math.isnan(self.answer_points[a_idx]):
+            return default
+        return self.answer_points[a_idx]
+
+    def question_details(self, listening_only: bool = False) -> Dict[str, Dict]:
+        """Same shape as the all_question_details_map built by the submit services"""
+        details = {}
+        for q_idx, q_id in enumerate(self.question_ids):
+            s_idx = self.question_section[q_idx]
+            if s_idx < 0 or (listening_only and not self.section_listening[s_idx]):
+                continue
+            details[q_id] = {
+                'score': self.question_score[q_idx],
+                'section_id': self.section_ids[s_idx]
+            }
+        return details
+
+    def section_names(self, listening_only: bool = False) -> Dict[str, str]:
+        """{section_id: section type} for the (listening) sections of the exam"""
+        return {
+            s_id: self.section_types[i]
+            for i, s_id in enumerate(self.section_ids)
+            if not listening_only or self.section_listening[i]
+        }
+
+    def section_max_scores(self) -> Dict[str, float]:
+        """{section_id: sum of question scores}"""
+        max_scores = {s_id: 0.0 for s_id in self.section_ids}
+        for q_idx in range(len(self.question_ids)):
+            s_idx = self.question_section[q_idx]
+            if s_idx >= 0:
+                max_scores[self.section_ids[s_idx]] += self.question_score[q_idx]
+        return max_scores
+
+
+def compile_answer_key(exam_id: str, version: int) -> AnswerKey:
+    """
+    Build the answer key of an exam: one direct Postgres read when
+    HOT_READ_BACKEND = 'postgres', otherwise 3 Supabase queries
+    """
+    if use_postgres_reads():
+        try:
+            rows = PostgresReadRepository.answer_key_rows(exam_id)
+        except Exception as e:
+            print(f"Direct Postgres answer key load failed, falling back to Supabase: {str(e)}")
+        else:
+            if not rows['sections']:
+                raise Exception("Không tìm thấy section cho exam")
+            if not rows['questions']:
+                raise Exception("Không tìm thấy câu hỏi cho exam")
+            return AnswerKey(exam_id, version, rows['sections'], rows['questions'], rows['answers'])
+
+    sections_res = supabase.table('jlpt_exam_sections')\
+        .select('id, type, is_listening, position')\
+        .eq('exam_id', exam_id)\
+        .order('position')\
+        .execute()
+    sections = sections_res.data or []
+    if not sections:
+        raise Exception("Không tìm thấy section cho exam")
+
+    questions_res = supabase.table('jlpt_questions')\
+        .select('id, score, question_type_id, exam_section_id, position')\
+        .in_('exam_section_id', [s['id'] for s in sections])\
+        .is_('deleted_at', 'null')\
+        .order('position')\
+        .execute()
+    questions = questions_res.data or []
+    if not questions:
+        raise Exception("Không tìm thấy câu hỏi cho exam")
+
+    answers_res = supabase.table('jlpt_answers')\
+        .select('id, question_id, points, position, is_correct')\
+        .in_('question_id', [q['id'] for q in questions])\
+        .is_('deleted_at', 'null')\
+        .execute()
+
+    return AnswerKey(exam_id, version, sections, questions, answers_res.data or [])
+
+
+def _compile_and_store(exam_id: str, version: int) -> AnswerKey:
+    answer_key = compile_answer_key(exam_id, version)
+    exam_cache.set_compiled_exam(exam_id, version, answer_key, 'answer_key')
+    return answer_key
+
+
+_local_keys: 'OrderedDict[Tuple[str, int], AnswerKey]' = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def get_answer_key(exam_id: str) -> AnswerKey:
+    """
+    Answer key for the current content version of an exam:
+    in-process LRU first, then Redis, then compiled from Supabase (once for
+    all concurrent callers, config/single_flight.py).
+    """
+    version = exam_cache.get_content_version(exam_id)
+    local_key = (exam_id, version)
+    with _local_lock:
+        answer_key = _local_keys.get(local_key)
+        if answer_key is not None:
+            _local_keys.move_to_end(local_key)
+            return answer_key
+
+    answer_key = exam_cache.get_compiled_exam(exam_id, version, 'answer_key')
+    if answer_key is None:
+        # Concurrent misses (all workers) wait for a single compilation
+        answer_key = coalesce(
+            exam_cache.COMPILED_KEY.format(exam_id=exam_id, version=version, part='answer_key'),
+            lambda: _compile_and_store(exam_id, version)
+        )
+
+    with _local_lock:
+        _local_keys[local_key] = answer_key
+        _local_keys.move_to_end(local_key)
+        while len(_local_keys) > LOCAL_CACHE_SIZE:
+            _local_keys.popitem(last=False)
+    return answer_key
@@ -0,0 +1,251 @@
+"""
+Async business logic for exam reads (used by the async views under ASGI)
+
+Same queries (queries.py), same assembly code and same results as the
+matching ExamService methods: the batch exam loader is the same query plan
+(ExamService._full_exam_queries), only its runner differs. Every Supabase call
+is awaited on the event loop through the loop's AsyncClient. A process can
+keep many exam loads in flight without a thread per request. Redis cache
+reads/writes (cache.py) and the direct Postgres loader (HOT_READ_BACKEND =
+'postgres') are blocking calls and run in a worker thread.
+"""
+from typing import Dict, List
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from config.concurrency import gather_parallel
+from config.single_flight import acoalesce
+from config.supabase_client import get_async_supabase_client
+from student.common.read_repository import use_postgres_reads
+from . import cache as exam_cache
+from .queries import ExamQueries
+from .services import ExamService, _succeeded
+
+_get_content_version = sync_to_async(exam_cache.get_content_version, thread_sensitive=False)
+_get_catalog_version = sync_to_async(exam_cache.get_catalog_version, thread_sensitive=False)
+_get_catalog = sync_to_async(exam_cache.get_catalog, thread_sensitive=False)
+_set_catalog = sync_to_async(exam_cache.set_catalog, thread_sensitive=False)
+_get_catalog_entries = sync_to_async(exam_cache.get_catalog_entries, thread_sensitive=False)
+_set_catalog_entries = sync_to_async(exam_cache.set_catalog_entries, thread_sensitive=False)
+_get_compiled_exam = sync_to_async(exam_cache.get_compiled_exam, thread_sensitive=False)
+_set_compiled_exam = sync_to_async(exam_cache.set_compiled_exam, thread_sensitive=False)
+_build_full_exam_data_postgres = sync_to_async(ExamService._build_full_exam_data_postgres, thread_sensitive=False)
+
+
+async def _run_queries(queries):
+    """Async runner of the ExamService query plans: each round is awaited concurrently (see ExamService._run_queries)"""
+    try:
+        builders = next(queries)
+        while True:
+            responses = await gather_parallel(*[builder.execute() for builder in builders])
+            builders = queries.send([response.data for response in responses])
+    except StopIteration as done:
+        return done.value
+
+
+class AsyncExamService:
+    """Async counterpart of ExamService for the read endpoints"""
+
+    @staticmethod
+    async def get_levels() -> Dict:
+        """Get all JLPT levels (single flight, shared with ExamService.get_levels)"""
+        return await acoalesce(exam_cache.FLIGHT_LEVELS, AsyncExamService._fetch_levels, share=_succeeded)
+
+    @staticmethod
+    async def _fetch_levels() -> Dict:
+        try:
+            response = await ExamQueries.levels(get_async_supabase_client()).execute()
+            return {
+                'success': True,
+                'data': response.data
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def _fetch_exam_row(exam_id: str) -> Dict:
+        response = await ExamQueries.exam_row(get_async_supabase_client(), exam_id).execute()
+        return response.data
+
+    @staticmethod
+    async def _fetch_section_durations(exam_id: str) -> List[Dict]:
+        response = await ExamQueries.section_durations(get_async_supabase_client(), exam_id).execute()
+        return response.data if response.data else []
+
+    @staticmethod
+    async def get_exam_by_id(exam_id: str) -> Dict:
+        """Get exam details by ID including sections for duration calculation"""
+        try:
+            exam_data, section_durations = await gather_parallel(
+                AsyncExamService._fetch_exam_row(exam_id),
+                AsyncExamService._fetch_section_durations(exam_id),
+            )
+            exam_data['sections'] = section_durations
+            return {
+                'success': True,
+                'data': exam_data
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def get_exams_by_level(level_id: str) -> Dict:
+        """Get all exams for a specific level (single flight)"""
+        return await acoalesce(
+            exam_cache.FLIGHT_EXAMS_BY_LEVEL.format(level_id=level_id),
+            lambda: AsyncExamService._fetch_exams_by_level(level_id),
+            share=_succeeded
+        )
+
+    @staticmethod
+    async def _fetch_exams_by_level(level_id: str) -> Dict:
+        try:
+            response = await ExamQueries.exams_by_level(get_async_supabase_client(), level_id).execute()
+            return {
+                'success': True,
+                'data': response.data
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def get_exam_catalog() -> Dict:
+        """Title and level of every exam, same Redis entry and single flight as ExamService.get_exam_catalog"""
+        version = await _get_catalog_version()
+        cached = await _get_catalog(version)
+        if cached is not None:
+            return {
+                'success': True,
+                'data': cached
+            }
+
+        return await acoalesce(
+            exam_cache.CATALOG_KEY.format(version=version),
+            lambda: AsyncExamService._build_and_store_exam_catalog(version),
+            share=_succeeded
+        )
+
+    @staticmethod
+    async def _build_and_store_exam_catalog(version: int) -> Dict:
+        try:
+            response = await ExamQueries.exam_catalog(get_async_supabase_client()).execute()
+            catalog = ExamService._index_exam_catalog(response.data)
+            await _set_catalog(version, catalog)
+            return {
+                'success': True,
+                'data': catalog
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def get_exam_catalog_entries(exam_ids) -> Dict:
+        """Catalog entries of exams missing from the cached catalog, see ExamService.get_exam_catalog_entries"""
+        try:
+            version = await _get_catalog_version()
+            entries = await _get_catalog_entries(version, exam_ids)
+            missing = [exam_id for exam_id in exam_ids if exam_id not in entries]
+            if missing:
+                response = await ExamQueries.exam_catalog_entries(get_async_supabase_client(), missing).execute()
+                fetched = ExamService._index_catalog_entries(missing, response.data)
+                await _set_catalog_entries(version, fetched)
+                entries.update(fetched)
+            return {
+                'success': True,
+                'data': {exam_id: entry for exam_id, entry in entries.items() if entry}
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def get_full_exam_data(exam_id: str) -> Dict:
+        """
+        Get complete exam data including sections, questions, and answers
+        CACHED: same Redis entries (and content version) as ExamService.get_full_exam_data,
+        same single flight on a miss
+        """
+        version = await _get_content_version(exam_id)
+        cached = await _get_compiled_exam(exam_id, version)
+        if cached is not None:
+            return {
+                'success': True,
+                'data': cached
+            }
+
+        return await acoalesce(
+            exam_cache.COMPILED_KEY.format(exam_id=exam_id, version=version, part='full'),
+            lambda: AsyncExamService._build_and_store_full_exam_data(exam_id, version),
+            share=_succeeded
+        )
+
+    @staticmethod
+    async def _build_and_store_full_exam_data(exam_id: str, version: int) -> Dict:
+        result = await AsyncExamService._build_full_exam_data(exam_id)
+        if result['success']:
+            result['data']['content_version'] = version
+            await _set_compiled_exam(exam_id, version, result['data'])
+        return result
+
+    @staticmethod
+    async def _build_full_exam_data(exam_id: str) -> Dict:
+        """Cache miss path, loader chosen by HOT_READ_BACKEND / EXAM_DATA_BACKEND (see ExamService._build_full_exam_data)"""
+        if use_postgres_reads():
+            result = await _build_full_exam_data_postgres(exam_id)
+            if result['success']:
+                return result
+            print(f"Direct Postgres exam load failed, falling back to batch queries: {result['error']}")
+        elif getattr(settings, 'EXAM_DATA_BACKEND', 'postgrest') == 'rpc':
+            result = await AsyncExamService._build_full_exam_data_rpc(exam_id)
+            if result['success']:
+                return result
+            print(f"get_full_exam_json RPC failed, falling back to batch queries: {result['error']}")
+        return await AsyncExamService._build_full_exam_data_batch(exam_id)
+
+    @staticmethod
+    async def _build_full_exam_data_rpc(exam_id: str) -> Dict:
+        try:
+            response = await ExamQueries.full_exam_rpc(get_async_supabase_client(), exam_id).execute()
+            if not response.data:
+                return {
+                    'success': False,
+                    'error': 'Exam not found'
+                }
+            return {
+                'success': True,
+                'data': response.data
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    @staticmethod
+    async def _build_full_exam_data_batch(exam_id: str) -> Dict:
+        """Same query plan as ExamService._build_full_exam_data_batch, awaited on the event loop"""
+        try:
+            return {
+                'success': True,
+                'data': await _run_queries(ExamService._full_exam_queries(get_async_supabase_client(), exam_id))
+            }
+        except Exception as e:
+            print(f"Error in AsyncExamService._build_full_exam_data_batch: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
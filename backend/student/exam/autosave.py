@@ -0,0 +1,100 @@
+"""
+Server-side autosave buffer for in-progress exam attempts
+
+Answers of one attempt live in a Redis hash, one field per question:
+    exam_attempt:<student_id>:<exam_id>:<part>   HASH  question_id -> JSON [[answer_id, position], ...]
+
+Saving a question replaces its field (HSET), so each autosave call costs O(1) per
+answered question no matter how large the exam is. The finalize views take the
+whole buffer and grade it, so the client never has to send every answer again.
+`part` separates the two pages of an attempt: 'full' (ExamPage) and 'listening'.
+"""
+import json
+from typing import Dict, Iterable, List
+from django.conf import settings
+from django_redis import get_redis_connection
+
+ATTEMPT_KEY = 'exam_attempt:{student_id}:{exam_id}:{part}'
+PARTS = ('full', 'listening')
+
+
+def _timeout() -> int:
+    return getattr(settings, 'EXAM_AUTOSAVE_TIMEOUT', 60 * 60 * 12)
+
+
+def _key(student_id: str, exam_id: str, part: str) -> str:
+    return ATTEMPT_KEY.format(student_id=student_id, exam_id=exam_id, part=part)
+
+
+def _group_by_question(answers: Iterable[Dict]) -> Dict[str, List]:
+    grouped = {}
+    for answer in answers:
+        grouped.setdefault(answer['exam_question_id'], []).append(
+            [answer['chosen_answer_id'], answer['position']]
+        )
+    return grouped
+
+
+def _flatten(raw: Dict) -> List[Dict]:
+    """Hash content -> answers in the format accepted by SubmittedAnswerSerializer"""
+    answers = []
+    for question_id, entries in raw.items():
+        question_id = question_id.decode() if isinstance(question_id, bytes) else question_id
+        for chosen_answer_id, position in json.loads(entries):
+            answers.append({
+                'exam_question_id': question_id,
+                'chosen_answer_id': chosen_answer_id,
+                'position': position
+            })
+    return answers
+
+
+def save_answers(student_id: str, exam_id: str, part: str, answers: List[Dict],
+                 cleared_questions: List[str] = ()) -> int:
+    """
+    Replace the saved answers of the given questions (sorting questions send all
+    their entries together) and drop cleared questions. One Redis round-trip;
+    returns the number of answered questions in the buffer.
+    """
+    key = _key(student_id, exam_id, part)
+    grouped = _group_by_question(answers)
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    if cleared_questions:
+        pipe.hdel(key, *cleared_questions)
+    if grouped:
+        pipe.hset(key, mapping={
+            q_id: json.dumps(entries, ensure_ascii=False, separators=(',', ':'))
+            for q_id, entries in grouped.items()
+        })
+    pipe.expire(key, _timeout())
+    pipe.hlen(key)
+    return pipe.execute()[-1]
+
+
+def get_answers(student_id: str, exam_id: str, part: str) -> List[Dict]:
+    """Saved answers of an attempt (used to resume after a reload)"""
+    return _flatten(get_redis_connection('default').hgetall(_key(student_id, exam_id, part)))
+
+
+def take_answers(student_id: str, exam_id: str, part: str) -> List[Dict]:
+    """
+    Read and clear the buffer atomically (MULTI/EXEC), so two concurrent finalize
+    calls cannot submit the same attempt twice. Call restore_answers() if the
+    submission then fails.
+    """
+    key = _key(student_id, exam_id, part)
+    pipe = get_redis_connection('default').pipeline(transaction=True)
+    pipe.hgetall(key)
+    pipe.delete(key)
+    raw, _ = pipe.execute()
+    return _flatten(raw)
+
+
+def restore_answers(student_id: str, exam_id: str, part: str, answers: List[Dict]) -> None:
+    """Put taken answers back without overwriting anything saved in the meantime"""
+    key = _key(student_id, exam_id, part)
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    for q_id, entries in _group_by_question(answers).items():
+        pipe.hsetnx(key, q_id, json.dumps(entries, ensure_ascii=False, separators=(',', ':')))
+    pipe.expire(key, _timeout())
+    pipe.execute()
@@ -0,0 +1,142 @@
+"""
+Compiled-exam cache backed by the shared Redis cache (django_redis)
+
+An exam's nested content (sections -> question types -> questions -> answers)
+is compiled once and stored under a key that includes the exam's content
+version. The version is a per-exam counter kept in Redis: invalidating an exam
+bumps the counter, so every older compiled copy becomes unreachable at once,
+including copies written by readers that were still building the old version.
+
+The exam catalog (id -> title and level of every exam, used to label the exam
+history) is versioned the same way by one global counter. Exams missing from a
+cached catalog (created outside the admin pages) are fetched one by one and
+cached next to it under the same version, misses included.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from typing import Dict, Optional
+
+VERSION_KEY = 'exam:{exam_id}:content_version'
+COMPILED_KEY = 'exam:{exam_id}:v{version}:{part}'
+CATALOG_VERSION_KEY = 'exam_catalog:version'
+CATALOG_KEY = 'exam_catalog:v{version}'
+CATALOG_ENTRY_KEY = 'exam_catalog:v{version}:exam:{exam_id}'
+
+# Single-flight keys (config/single_flight.py) of the uncached reads; compiled
+# parts use COMPILED_KEY as their single-flight key
+FLIGHT_LEVELS = 'exam_levels'
+FLIGHT_EXAMS_BY_LEVEL = 'exams_by_level:{level_id}'
+
+
+def _timeout() -> int:
+    return getattr(settings, 'EXAM_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _catalog_timeout() -> int:
+    return getattr(settings, 'EXAM_CATALOG_TIMEOUT', 60 * 60)
+
+
+def get_content_version(exam_id: str) -> int:
+    """Return the current content version of an exam (0 if never invalidated)"""
+    try:
+        return int(cache.get(VERSION_KEY.format(exam_id=exam_id)) or 0)
+    except Exception as e:
+        print(f"Exam cache: cannot read content version for {exam_id}: {str(e)}")
+        return 0
+
+
+def get_compiled_exam(exam_id: str, version: int, part: str = 'full') -> Optional[Dict]:
+    """Return the compiled exam (or one compiled part of it) for this version, or None on a miss"""
+    try:
+        return cache.get(COMPILED_KEY.format(exam_id=exam_id, version=version, part=part))
+    except Exception as e:
+        print(f"Exam cache: read failed for {exam_id}: {str(e)}")
+        return None
+
+
+def set_compiled_exam(exam_id: str, version: int, data: Dict, part: str = 'full') -> None:
+    """Store a compiled exam (or one compiled part of it) under the version it was built from"""
+    try:
+        cache.set(COMPILED_KEY.format(exam_id=exam_id, version=version, part=part), data, _timeout())
+    except Exception as e:
+        print(f"Exam cache: write failed for {exam_id}: {str(e)}")
+
+
+def invalidate_exam(exam_id: str) -> None:
+    """
+    Drop every compiled copy of an exam by bumping its content version.
+    Called by the admin services whenever exam content changes.
+    """
+    version_key = VERSION_KEY.format(exam_id=exam_id)
+    try:
+        old_version = get_content_version(exam_id)
+        # add() initialises the counter so incr() never hits a missing key
+        cache.add(version_key, 0, timeout=None)
+        cache.incr(version_key)
+        # Older parts (per-section copies) are unreachable now and expire on their TTL
+        cache.delete(COMPILED_KEY.format(exam_id=exam_id, version=old_version, part='full'))
+    except Exception as e:
+        print(f"Exam cache: invalidation failed for {exam_id}: {str(e)}")
+
+
+def get_catalog_version() -> int:
+    """Return the current version of the exam catalog (0 if never invalidated)"""
+    try:
+        return int(cache.get(CATALOG_VERSION_KEY) or 0)
+    except Exception as e:
+        print(f"Exam cache: cannot read catalog version: {str(e)}")
+        return 0
+
+
+def get_catalog(version: int) -> Optional[Dict]:
+    """Return the exam catalog built for this version, or None on a miss"""
+    try:
+        return cache.get(CATALOG_KEY.format(version=version))
+    except Exception as e:
+        print(f"Exam cache: catalog read failed: {str(e)}")
+        return None
+
+
+def set_catalog(version: int, catalog: Dict) -> None:
+    try:
+        cache.set(CATALOG_KEY.format(version=version), catalog, _catalog_timeout())
+    except Exception as e:
+        print(f"Exam cache: catalog write failed: {str(e)}")
+
+
+def get_catalog_entries(version: int, exam_ids) -> Dict[str, Dict]:
+    """
+    Cached entries of exams that were missing from this catalog version:
+    {exam_id: entry}, {} as the entry of an exam that does not exist. Unknown ids are left out.
+    """
+    keys = {CATALOG_ENTRY_KEY.format(version=version, exam_id=exam_id): exam_id for exam_id in exam_ids}
+    try:
+        found = cache.get_many(list(keys))
+    except Exception as e:
+        print(f"Exam cache: catalog entries read failed: {str(e)}")
+        return {}
+    return {keys[key]: entry for key, entry in found.items()}
+
+
+def set_catalog_entries(version: int, entries: Dict[str, Dict]) -> None:
+    try:
+        cache.set_many({
+            CATALOG_ENTRY_KEY.format(version=version, exam_id=exam_id): entry
+            for exam_id, entry in entries.items()
+        }, _catalog_timeout())
+    except Exception as e:
+        print(f"Exam cache: catalog entries write failed: {str(e)}")
+
+
+def invalidate_catalog() -> None:
+    """
+    Drop the exam catalog by bumping its version.
+    Called by the admin services whenever an exam or level is created, renamed or deleted.
+    """
+    try:
+        old_version = get_catalog_version()
+        cache.add(CATALOG_VERSION_KEY, 0, timeout=None)
+        cache.incr(CATALOG_VERSION_KEY)
+        cache.delete(CATALOG_KEY.format(version=old_version))
+    except Exception as e:
+        print(f"Exam cache: catalog invalidation failed: {str(e)}")
@@ -0,0 +1,103 @@
+"""
+PostgREST queries for exam content, shared by the sync and async services
+
+Each function takes a Supabase client (sync `Client` or `AsyncClient`) and
+returns the request builder, un-executed:
+    ExamService        ExamQueries.levels(supabase).execute()
+    AsyncExamService   await ExamQueries.levels(get_async_supabase_client()).execute()
+The two services therefore always send the same queries.
+"""
+from typing import List
+
+EXAMS_BY_LEVEL_COLUMNS = 'id, level_id, title, type, total_duration, request_score, created_at, level:levels(id, title, description)'
+# Deleted exams / levels included: the history still shows results of retired exams
+EXAM_CATALOG_COLUMNS = 'id, title, level:levels(id, title)'
+
+
+class ExamQueries:
+    """Request builders for exam content (select only, never executed here)"""
+
+    @staticmethod
+    def levels(client):
+        return client.table('levels')\
+            .select('*')\
+            .is_('deleted_at', 'null')\
+            .order('title', desc=True)
+
+    @staticmethod
+    def exam_row(client, exam_id: str):
+        """Exam row joined with its level (single object)"""
+        return client.table('jlpt_exams')\
+            .select('*, level:levels(id, title, description)')\
+            .eq('id', exam_id)\
+            .single()
+
+    @staticmethod
+    def section_durations(client, exam_id: str):
+        """Lightweight section list used for intro page durations"""
+        return client.table('jlpt_exam_sections')\
+            .select('id, duration, position, is_listening, type')\
+            .eq('exam_id', exam_id)\
+            .order('position')
+
+    @staticmethod
+    def exams_by_level(client, level_id: str):
+        return client.table('jlpt_exams')\
+            .select(EXAMS_BY_LEVEL_COLUMNS)\
+            .eq('level_id', level_id)\
+            .is_('deleted_at', 'null')\
+            .order('created_at', desc=True)
+
+    @staticmethod
+    def exam_catalog(client):
+        """Title and level of every exam (cached as the exam catalog, see cache.py)"""
+        return client.table('jlpt_exams')\
+            .select(EXAM_CATALOG_COLUMNS)
+
+    @staticmethod
+    def exam_catalog_entries(client, exam_ids: List):
+        """Catalog entries of some exams only (exams missing from the cached catalog)"""
+        return client.table('jlpt_exams')\
+            .select(EXAM_CATALOG_COLUMNS)\
+            .in_('id', exam_ids)
+
+    @staticmethod
+    def exam_sections(client, exam_id: str):
+        return client.table('jlpt_exam_sections')\
+            .select('*')\
+            .eq('exam_id', exam_id)\
+            .order('position')
+
+    @staticmethod
+    def question_types_for_sections(client, section_ids: List):
+        return client.table('jlpt_question_types')\
+            .select('*, question_guides:jlpt_question_guides(id, name)')\
+            .in_('exam_section_id', section_ids)\
+            .order('id')
+
+    @staticmethod
+    def questions_for_types(client, question_type_ids: List):
+        return client.table('jlpt_questions')\
+            .select('*')\
+            .in_('question_type_id', question_type_ids)\
+            .is_('deleted_at', 'null')\
+            .order('position')
+
+    @staticmethod
+    def passages_for_types(client, question_type_ids: List):
+        return client.table('jlpt_question_passages')\
+            .select('id, question_type_id, content, underline_text')\
+            .in_('question_type_id', question_type_ids)
+
+    @staticmethod
+    def answers_for_questions(client, question_ids: List):
+        return client.table('jlpt_answers')\
+            .select('*')\
+            .in_('question_id', question_ids)\
+            .is_('deleted_at', 'null')\
+            .order('show_order')
+
+    @staticmethod
+    def full_exam_rpc(client, exam_id: str):
+        """get_full_exam_json Postgres function (sql/get_full_exam_json.sql)"""
+        return client.rpc('get_full_exam_json', {'p_exam_id': exam_id})
@@ -117,6 +117,8 @@ class ExamResultSerializer(serializers.Serializer):
     datetime = serializers.DateTimeField(required=False, allow_null=True)
     
     section_scores = SectionScoreSerializer(many=True, required=False)
+    # Chỉ có khi nộp bài bất đồng bộ (EXAM_SUBMIT_ASYNC)
+    persistence_job_id = serializers.CharField(required=False)
 
 class StudentAnswerSerializer(serializers.Serializer):
     """Serializer for student answers"""
@@ -149,4 +151,24 @@ class ListeningExamSubmissionSerializer(serializers.Serializer):
     """
     duration = serializers.IntegerField(min_value=0)
     # allow_empty=True để cho phép nộp bài không có đáp án nào (mặc định 0 điểm)
-    answers = SubmittedAnswerSerializer(many=True, allow_empty=True)
\ No newline at end of file
+    answers = SubmittedAnswerSerializer(many=True, allow_empty=True)
+
+
+class AutosaveAnswersSerializer(serializers.Serializer):
+    """
+    Serializer cho 1 lần lưu tạm (autosave): chỉ gửi các câu vừa thay đổi.
+    Câu sắp xếp gửi đủ các đáp án của câu đó (thay thế toàn bộ câu).
+    """
+    part = serializers.ChoiceField(choices=['full', 'listening'], default='full')
+    answers = SubmittedAnswerSerializer(many=True, allow_empty=True, required=False, default=list)
+    # Các câu học sinh đã bỏ chọn
+    cleared_questions = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+
+class FinalizeExamSerializer(serializers.Serializer):
+    """
+    Serializer cho lệnh nộp bài từ bộ đệm autosave: câu trả lời lấy từ Redis, không gửi lại.
+    """
+    duration = serializers.IntegerField(min_value=0)
+
+class FinalizeListeningExamSerializer(FinalizeExamSerializer):
+    exam_result_id = serializers.IntegerField()
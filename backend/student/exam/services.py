@@ -2,22 +2,41 @@
 Business logic for exam operations
 Handles all Supabase queries for exam-related functionality
 """
+from django.conf import settings
 from config.supabase_client import supabase
 from typing import Dict, List, Optional
 from datetime import datetime, timezone
+from config.concurrency import run_parallel
+from config.single_flight import coalesce
+from student.common.read_repository import PostgresReadRepository, use_postgres_reads
+from student.dashboard import cache as dashboard_cache
+from . import cache as exam_cache
+from . import submission_queue
+from .answer_key import AnswerKey, get_answer_key
+from .queries import ExamQueries
+
+# Loại job trong hàng đợi lưu bài nộp (xem submission_queue.py)
+SUBMISSION_DETAILS_JOB = 'submission_details'
+
+
+def _succeeded(result: Dict) -> bool:
+    """Only successful results are shared with other workers (single flight)"""
+    return result['success']
+
 
 class ExamService:
     """Service for handling exam-related operations"""
     
     @staticmethod
     def get_levels() -> Dict:
-        """Get all JLPT levels"""
+        """Get all JLPT levels (concurrent callers share one query, config/single_flight.py)"""
+        return coalesce(exam_cache.FLIGHT_LEVELS, ExamService._fetch_levels, share=_succeeded)
+    
+    @staticmethod
+    def _fetch_levels() -> Dict:
+        """[Private] Levels query behind get_levels"""
         try:
-            response = supabase.table('levels')\
-                .select('*')\
-                .is_('deleted_at', 'null')\
-                .order('title', desc=True)\
-                .execute()
+            response = ExamQueries.levels(supabase).execute()
             
             return {
                 'success': True,
@@ -29,28 +48,30 @@ class ExamService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def _fetch_exam_row(exam_id: str) -> Dict:
+        """[Private] Exam row joined with its level"""
+        response = ExamQueries.exam_row(supabase, exam_id).execute()
+        return response.data
+    
+    @staticmethod
+    def _fetch_section_durations(exam_id: str) -> List[Dict]:
+        """[Private] Lightweight section list used for intro page durations"""
+        response = ExamQueries.section_durations(supabase, exam_id).execute()
+        return response.data if response.data else []
+    
     @staticmethod
     def get_exam_by_id(exam_id: str) -> Dict:
         """Get exam details by ID including sections for duration calculation"""
         try:
-            # Get exam details
-            response = supabase.table('jlpt_exams')\
-                .select('*, level:levels(id, title, description)')\
-                .eq('id', exam_id)\
-                .single()\
-                .execute()
-            
-            exam_data = response.data
-            
-            # Get sections to calculate durations for intro pages (include is_listening for filtering)
-            sections_response = supabase.table('jlpt_exam_sections')\
-                .select('id, duration, position, is_listening, type')\
-                .eq('exam_id', exam_id)\
-                .order('position')\
-                .execute()
+            # Exam row and sections (include is_listening for filtering) are independent
+            exam_data, section_durations = run_parallel(
+                lambda: ExamService._fetch_exam_row(exam_id),
+                lambda: ExamService._fetch_section_durations(exam_id),
+            )
             
             # Add sections to exam data
-            exam_data['sections'] = sections_response.data if sections_response.data else []
+            exam_data['sections'] = section_durations
             
             return {
                 'success': True,
@@ -64,16 +85,20 @@ class ExamService:
     
     @staticmethod
     def get_exams_by_level(level_id: str) -> Dict:
-        """Get all exams for a specific level - optimized query"""
+        """Get all exams for a specific level (concurrent callers share one query)"""
+        return coalesce(
+            exam_cache.FLIGHT_EXAMS_BY_LEVEL.format(level_id=level_id),
+            lambda: ExamService._fetch_exams_by_level(level_id),
+            share=_succeeded
+        )
+    
+    @staticmethod
+    def _fetch_exams_by_level(level_id: str) -> Dict:
+        """[Private] Exams of a level - optimized query"""
         try:
             # Chỉ select các field cần thiết để tối ưu performance
-            # Bao gồm level_id vì serializer yêu cầu field này
-            response = supabase.table('jlpt_exams')\
-                .select('id, level_id, title, type, total_duration, request_score, created_at, level:levels(id, title, description)')\
-                .eq('level_id', level_id)\
-                .is_('deleted_at', 'null')\
-                .order('created_at', desc=True)\
-                .execute()
+            # Bao gồm level_id vì serializer yêu cầu field này (xem queries.py)
+            response = ExamQueries.exams_by_level(supabase, level_id).execute()
             
             return {
                 'success': True,
@@ -85,15 +110,84 @@ class ExamService:
                 'error': str(e)
             }
     
+    @staticmethod
+    def get_exam_catalog() -> Dict:
+        """
+        {exam_id: {'id', 'title', 'level': {'id', 'title'}}} of every exam (deleted ones included)
+        CACHED: Redis, versioned like the compiled exams (cache.invalidate_catalog), single flight on a miss
+        """
+        version = exam_cache.get_catalog_version()
+        cached = exam_cache.get_catalog(version)
+        if cached is not None:
+            return {
+                'success': True,
+                'data': cached
+            }
+
+        return coalesce(
+            exam_cache.CATALOG_KEY.format(version=version),
+            lambda: ExamService._build_and_store_exam_catalog(version),
+            share=_succeeded
+        )
+    
+    @staticmethod
+    def _build_and_store_exam_catalog(version: int) -> Dict:
+        try:
+            response = ExamQueries.exam_catalog(supabase).execute()
+            catalog = ExamService._index_exam_catalog(response.data)
+            exam_cache.set_catalog(version, catalog)
+            return {
+                'success': True,
+                'data': catalog
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _index_exam_catalog(exams: List[Dict]) -> Dict:
+        """exam rows -> {str(exam_id): exam} (string keys: the catalog round-trips through Redis)"""
+        return {str(exam['id']): exam for exam in exams or []}
+    
+    @staticmethod
+    def get_exam_catalog_entries(exam_ids) -> Dict:
+        """
+        Catalog entries of exams missing from the cached catalog (created outside the admin pages):
+        only these ids are queried, and the result is cached per exam for the current catalog version,
+        exams that do not exist included. The catalog itself is left alone.
+        """
+        try:
+            version = exam_cache.get_catalog_version()
+            entries = exam_cache.get_catalog_entries(version, exam_ids)
+            missing = [exam_id for exam_id in exam_ids if exam_id not in entries]
+            if missing:
+                response = ExamQueries.exam_catalog_entries(supabase, missing).execute()
+                fetched = ExamService._index_catalog_entries(missing, response.data)
+                exam_cache.set_catalog_entries(version, fetched)
+                entries.update(fetched)
+            return {
+                'success': True,
+                'data': {exam_id: entry for exam_id, entry in entries.items() if entry}
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _index_catalog_entries(exam_ids: List[str], exams: List[Dict]) -> Dict:
+        """[Private] {exam_id: entry} for every requested id, {} for the ones not found (negative cache)"""
+        found = ExamService._index_exam_catalog(exams)
+        return {exam_id: found.get(exam_id, {}) for exam_id in exam_ids}
+    
     @staticmethod
     def get_exam_sections(exam_id: str) -> Dict:
         """Get all sections of an exam"""
         try:
-            response = supabase.table('jlpt_exam_sections')\
-                .select('*')\
-                .eq('exam_id', exam_id)\
-                .order('position')\
-                .execute()
+            response = ExamQueries.exam_sections(supabase, exam_id).execute()
             
             return {
                 'success': True,
@@ -200,185 +294,431 @@ class ExamService:
     def get_full_exam_data(exam_id: str) -> Dict:
         """
         Get complete exam data including sections, questions, and answers
+        CACHED: the compiled exam is read from Redis, keyed by exam id and content version.
+        On a miss it is built from Supabase and stored for the next readers; concurrent
+        misses on the same version (all workers) wait for a single build.
+        """
+        version = exam_cache.get_content_version(exam_id)
+        cached = exam_cache.get_compiled_exam(exam_id, version)
+        if cached is not None:
+            return {
+                'success': True,
+                'data': cached
+            }
+        
+        return coalesce(
+            exam_cache.COMPILED_KEY.format(exam_id=exam_id, version=version, part='full'),
+            lambda: ExamService._build_and_store_full_exam_data(exam_id, version),
+            share=_succeeded
+        )
+    
+    @staticmethod
+    def _build_and_store_full_exam_data(exam_id: str, version: int) -> Dict:
+        """[Private] Cache miss: build the exam and store it under `version`"""
+        result = ExamService._build_full_exam_data(exam_id)
+        if result['success']:
+            result['data']['content_version'] = version
+            exam_cache.set_compiled_exam(exam_id, version, result['data'])
+        return result
+    
+    @staticmethod
+    def _build_full_exam_data(exam_id: str) -> Dict:
+        """
+        Build complete exam data from Supabase (cache miss path)
+        EXAM_DATA_BACKEND selects the loader:
+        - 'postgrest' (default): batch queries assembled in Python
+        - 'rpc': one call to the get_full_exam_json Postgres function (sql/get_full_exam_json.sql),
+          falling back to the batch queries if the RPC call fails
+        HOT_READ_BACKEND = 'postgres' takes precedence: the same rows in one statement on a
+        pooled Postgres connection (student/common/read_repository.py), same fallback.
+        """
+        if use_postgres_reads():
+            result = ExamService._build_full_exam_data_postgres(exam_id)
+            if result['success']:
+                return result
+            print(f"Direct Postgres exam load failed, falling back to batch queries: {result['error']}")
+        elif getattr(settings, 'EXAM_DATA_BACKEND', 'postgrest') == 'rpc':
+            result = ExamService._build_full_exam_data_rpc(exam_id)
+            if result['success']:
+                return result
+            print(f"get_full_exam_json RPC failed, falling back to batch queries: {result['error']}")
+        return ExamService._build_full_exam_data_batch(exam_id)
+    
+    @staticmethod
+    def _build_full_exam_data_rpc(exam_id: str) -> Dict:
+        """Build complete exam data in ONE round-trip: nesting is done by json_agg in Postgres"""
+        try:
+            response = ExamQueries.full_exam_rpc(supabase, exam_id).execute()
+            if not response.data:
+                return {
+                    'success': False,
+                    'error': 'Exam not found'
+                }
+            return {
+                'success': True,
+                'data': response.data
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _build_full_exam_data_postgres(exam_id: str) -> Dict:
+        """Build complete exam data from one direct Postgres read, assembled like the batch loader"""
+        try:
+            parts = PostgresReadRepository.full_exam_parts(exam_id)
+            if parts is None:
+                return {
+                    'success': False,
+                    'error': 'Exam not found'
+                }
+            exam_result = parts['exam']
+            exam_result['sections'] = parts['section_durations']
+            question_types = parts['question_types']
+            ExamService._attach_question_type_content(
+                question_types, parts['questions'], parts['passages'], parts['answers']
+            )
+            return {
+                'success': True,
+                'data': ExamService._assemble_full_exam(exam_result, parts['sections'], question_types)
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _build_full_exam_data_batch(exam_id: str) -> Dict:
+        """
+        Build complete exam data with batch PostgREST queries
         OPTIMIZED: Uses batch queries instead of N+1 queries for better performance
         """
         try:
-            # 1. Get exam info
-            exam_result = ExamService.get_exam_by_id(exam_id)
-            if not exam_result['success']:
-                return exam_result
+            return {
+                'success': True,
+                'data': ExamService._run_queries(ExamService._full_exam_queries(supabase, exam_id))
+            }
+        except Exception as e:
+            print(f"Error in _build_full_exam_data_batch: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def _run_queries(queries):
+        """
+        [Private] Run a query plan (_full_exam_queries, _question_type_content_queries):
+        the builders of each round are executed concurrently, their .data sent back.
+        AsyncExamService runs the same plans on the event loop.
+        """
+        try:
+            builders = next(queries)
+            while True:
+                responses = run_parallel(*[builder.execute for builder in builders])
+                builders = queries.send([response.data for response in responses])
+        except StopIteration as done:
+            return done.value
+    
+    @staticmethod
+    def _full_exam_queries(client, exam_id: str):
+        """
+        [Private] Query plan of the batch loader (no I/O here): yields a tuple of independent
+        PostgREST builders per round, receives their data, returns the assembled exam.
+        Query errors are raised by the runner, never turned into empty lists: the caller must not
+        cache (or share) an exam that silently lost its questions or answers.
+        """
+        # 1 + 2. Exam info, its section durations and the full sections are
+        # independent of each other, so they are fetched concurrently
+        exam_result, section_durations, sections_data = yield (
+            ExamQueries.exam_row(client, exam_id),
+            ExamQueries.section_durations(client, exam_id),
+            ExamQueries.exam_sections(client, exam_id),
+        )
+        exam_result['sections'] = section_durations or []
+        if not sections_data:
+            return ExamService._assemble_full_exam(exam_result, [], [])
+        
+        # 3. Get ALL question types for ALL sections in ONE query (batch)
+        section_ids = [s['id'] for s in sections_data]
+        all_question_types, = yield (ExamQueries.question_types_for_sections(client, section_ids),)
+        all_question_types = all_question_types or []
+        
+        # 4 + 5. Questions, passages and answers, attached to their question types
+        yield from ExamService._question_type_content_queries(client, all_question_types)
+        
+        # 6. Build the nested structure
+        return ExamService._assemble_full_exam(exam_result, sections_data, all_question_types)
+    
+    @staticmethod
+    def _assemble_full_exam(exam_result: Dict, sections_data: List[Dict], all_question_types: List[Dict]) -> Dict:
+        """[Private] Nest loaded question types under their sections (shared with AsyncExamService)"""
+        # Group question types by section_id
+        question_types_by_section = {}
+        for qt in all_question_types:
+            section_id = qt.get('exam_section_id')
+            if section_id not in question_types_by_section:
+                question_types_by_section[section_id] = []
+            question_types_by_section[section_id].append(qt)
+        
+        sections_with_data = []
+        for section in sections_data:
+            section['question_types'] = question_types_by_section.get(section['id'], [])
+            sections_with_data.append(section)
+        
+        return {
+            'exam': exam_result,
+            'sections': sections_with_data
+        }
+    
+    @staticmethod
+    def _load_question_type_content(question_types: List[Dict]) -> None:
+        """
+        [Private] Batch-load questions, passages and answers for a list of question types
+        and attach them in place ('passages', 'questions' -> 'answers').
+        Used by the per-section loaders. Query errors are raised.
+        """
+        ExamService._run_queries(ExamService._question_type_content_queries(supabase, question_types))
+    
+    @staticmethod
+    def _question_type_content_queries(client, question_types: List[Dict]):
+        """[Private] Query plan of _load_question_type_content (see _full_exam_queries)"""
+        question_type_ids = [qt['id'] for qt in question_types]
+        all_questions = []
+        all_passages = []
+        
+        if question_type_ids:
+            # Questions and passages only depend on the question type ids,
+            # so both queries are sent at the same time.
+            # Get ALL passages for ALL question types (không chỉ perforated)
+            # Vì có thể có passages cho các question types khác
+            all_questions, all_passages = yield (
+                ExamQueries.questions_for_types(client, question_type_ids),
+                ExamQueries.passages_for_types(client, question_type_ids),
+            )
+            all_questions = all_questions or []
+            all_passages = all_passages or []
+        
+        # Get ALL answers for ALL questions in ONE query (batch)
+        question_ids = [q['id'] for q in all_questions]
+        all_answers = []
+        
+        if question_ids:
+            all_answers, = yield (ExamQueries.answers_for_questions(client, question_ids),)
+            all_answers = all_answers or []
+        
+        ExamService._attach_question_type_content(question_types, all_questions, all_passages, all_answers)
+    
+    @staticmethod
+    def _attach_question_type_content(question_types: List[Dict], all_questions: List[Dict],
+                                      all_passages: List[Dict], all_answers: List[Dict]) -> None:
+        """[Private] Attach loaded passages / questions / answers to their question types (no I/O)"""
+        all_passages_map = {}
+        
+        # Group passages by question_type_id
+        for passage in all_passages:
+            qt_id = passage.get('question_type_id')
+            if qt_id not in all_passages_map:
+                all_passages_map[qt_id] = []
+            all_passages_map[qt_id].append(passage)
+        
+        # Tạo map passages theo ID để tra cứu nhanh
+        passages_by_id = {}
+        for qt_id, passages in all_passages_map.items():
+            for passage in passages:
+                passages_by_id[passage['id']] = passage
+        
+        # Group questions by question_type_id
+        questions_by_question_type = {}
+        for question in all_questions:
+            qt_id = question.get('question_type_id')
+            if qt_id not in questions_by_question_type:
+                questions_by_question_type[qt_id] = []
             
-            # 2. Get all sections for this exam
-            sections_result = ExamService.get_exam_sections(exam_id)
-            if not sections_result['success']:
-                return sections_result
+            # Attach passage to question if exists
+            passage_id = question.get('question_passages_id')
+            if passage_id and passage_id in passages_by_id:
+                question['jlpt_question_passages'] = [passages_by_id[passage_id]]
+            else:
+                question['jlpt_question_passages'] = None
             
-            sections_data = sections_result['data']
-            if not sections_data:
-                return {
-                    'success': True,
-                    'data': {
-                        'exam': exam_result['data'],
-                        'sections': []
-                    }
+            questions_by_question_type[qt_id].append(question)
+        
+        # Group answers by question_id and remove duplicates
+        answers_by_question = {}
+        seen_answer_ids = set()
+        for answer in all_answers:
+            answer_id = answer['id']
+            if answer_id in seen_answer_ids:
+                continue
+            seen_answer_ids.add(answer_id)
+            
+            question_id = answer.get('question_id')
+            if question_id not in answers_by_question:
+                answers_by_question[question_id] = []
+            answers_by_question[question_id].append(answer)
+        
+        for qt in question_types:
+            qt_id = qt['id']
+            
+            # Attach passages for question type (có thể có passages cho cả non-perforated)
+            qt['passages'] = all_passages_map.get(qt_id, [])
+            
+            # Attach questions with their answers
+            questions_for_qt = questions_by_question_type.get(qt_id, [])
+            for question in questions_for_qt:
+                question['answers'] = answers_by_question.get(question['id'], [])
+            qt['questions'] = questions_for_qt
+    
+    @staticmethod
+    def get_exam_manifest(exam_id: str) -> Dict:
+        """
+        Lightweight exam manifest: exam info, section list (durations, listening flag)
+        and the content version, so the client can load sections one at a time.
+        """
+        version = exam_cache.get_content_version(exam_id)
+        cached = exam_cache.get_compiled_exam(exam_id, version)
+        if cached is not None:
+            return {
+                'success': True,
+                'data': {
+                    'exam': cached['exam'],
+                    'content_version': version
                 }
+            }
+        
+        exam_result = ExamService.get_exam_by_id(exam_id)
+        if not exam_result['success']:
+            return exam_result
+        return {
+            'success': True,
+            'data': {
+                'exam': exam_result['data'],
+                'content_version': version
+            }
+        }
+    
+    @staticmethod
+    def get_section_data(exam_id: str, section_id: str) -> Dict:
+        """
+        Get one section with its question types, passages, questions and answers.
+        Served from the compiled exam when it is cached, otherwise batch-loaded
+        for this section only and cached per section.
+        """
+        version = exam_cache.get_content_version(exam_id)
+        compiled_exam = exam_cache.get_compiled_exam(exam_id, version)
+        if compiled_exam is not None:
+            section = next((s for s in compiled_exam['sections'] if str(s['id']) == str(section_id)), None)
+            if section is None:
+                return {'success': False, 'error': 'Section not found'}
+            return {'success': True, 'data': section}
+        
+        part = f'section:{section_id}'
+        cached_section = exam_cache.get_compiled_exam(exam_id, version, part)
+        if cached_section is not None:
+            return {'success': True, 'data': cached_section}
+        
+        try:
+            # Section row and its question types are independent
+            sections_result, question_types_result = run_parallel(
+                lambda: ExamService.get_exam_sections(exam_id),
+                lambda: ExamService.get_question_types(section_id),
+            )
+            if not sections_result['success']:
+                return sections_result
+            section = next((s for s in sections_result['data'] if str(s['id']) == str(section_id)), None)
+            if section is None:
+                return {'success': False, 'error': 'Section not found'}
+            if not question_types_result['success']:
+                return question_types_result
             
-            # 3. Get ALL question types for ALL sections in ONE query (batch)
-            section_ids = [s['id'] for s in sections_data]
-            try:
-                all_question_types_response = supabase.table('jlpt_question_types')\
-                    .select('*, question_guides:jlpt_question_guides(id, name)')\
-                    .in_('exam_section_id', section_ids)\
-                    .order('id')\
-                    .execute()
-                all_question_types = all_question_types_response.data if all_question_types_response.data else []
-            except Exception as e:
-                print(f"Error fetching question types: {str(e)}")
-                all_question_types = []
-            
-            # Group question types by section_id
-            question_types_by_section = {}
-            for qt in all_question_types:
-                section_id = qt.get('exam_section_id')
-                if section_id not in question_types_by_section:
-                    question_types_by_section[section_id] = []
-                question_types_by_section[section_id].append(qt)
-            
-            # 4. Get ALL questions for ALL question types in ONE query (batch)
-            question_type_ids = [qt['id'] for qt in all_question_types]
-            all_questions = []
-            all_passages_map = {}
-            
-            if question_type_ids:
-                try:
-                    # Get all questions
-                    all_questions_response = supabase.table('jlpt_questions')\
-                        .select('*')\
-                        .in_('question_type_id', question_type_ids)\
-                        .is_('deleted_at', 'null')\
-                        .order('position')\
-                        .execute()
-                    all_questions = all_questions_response.data if all_questions_response.data else []
-                    
-                    # Get ALL passages for ALL question types (không chỉ perforated)
-                    # Vì có thể có passages cho các question types khác
-                    if question_type_ids:
-                        try:
-                            passages_response = supabase.table('jlpt_question_passages')\
-                                .select('id, question_type_id, content, underline_text')\
-                                .in_('question_type_id', question_type_ids)\
-                                .execute()
-                            if passages_response.data:
-                                # Group passages by question_type_id
-                                for passage in passages_response.data:
-                                    qt_id = passage.get('question_type_id')
-                                    if qt_id not in all_passages_map:
-                                        all_passages_map[qt_id] = []
-                                    all_passages_map[qt_id].append(passage)
-                        except Exception as e:
-                            print(f"Error fetching passages: {str(e)}")
-                except Exception as e:
-                    print(f"Error fetching questions: {str(e)}")
-            
-            # Tạo map passages theo ID để tra cứu nhanh
-            passages_by_id = {}
-            for qt_id, passages in all_passages_map.items():
-                for passage in passages:
-                    passages_by_id[passage['id']] = passage
-            
-            # Group questions by question_type_id
-            questions_by_question_type = {}
-            for question in all_questions:
-                qt_id = question.get('question_type_id')
-                if qt_id not in questions_by_question_type:
-                    questions_by_question_type[qt_id] = []
-                
-                # Attach passage to question if exists
-                passage_id = question.get('question_passages_id')
-                if passage_id and passage_id in passages_by_id:
-                    question['jlpt_question_passages'] = [passages_by_id[passage_id]]
-                else:
-                    question['jlpt_question_passages'] = None
-                
-                questions_by_question_type[qt_id].append(question)
-            
-            # 5. Get ALL answers for ALL questions in ONE query (batch)
-            question_ids = [q['id'] for q in all_questions]
-            all_answers = []
-            
-            if question_ids:
-                try:
-                    all_answers_response = supabase.table('jlpt_answers')\
-                        .select('*')\
-                        .in_('question_id', question_ids)\
-                        .is_('deleted_at', 'null')\
-                        .order('show_order')\
-                        .execute()
-                    all_answers = all_answers_response.data if all_answers_response.data else []
-                except Exception as e:
-                    print(f"Error fetching answers: {str(e)}")
-            
-            # Group answers by question_id and remove duplicates
-            answers_by_question = {}
-            seen_answer_ids = set()
-            for answer in all_answers:
-                answer_id = answer['id']
-                if answer_id in seen_answer_ids:
-                    continue
-                seen_answer_ids.add(answer_id)
-                
-                question_id = answer.get('question_id')
-                if question_id not in answers_by_question:
-                    answers_by_question[question_id] = []
-                answers_by_question[question_id].append(answer)
-            
-            # 6. Build the nested structure
-            sections_with_data = []
-            for section in sections_data:
-                section_id = section['id']
-                question_types_for_section = question_types_by_section.get(section_id, [])
-                
-                question_types_with_data = []
-                for qt in question_types_for_section:
-                    qt_id = qt['id']
-                    
-                    # Attach passages for question type (có thể có passages cho cả non-perforated)
-                    qt['passages'] = all_passages_map.get(qt_id, [])
-                    
-                    # Attach questions
-                    questions_for_qt = questions_by_question_type.get(qt_id, [])
-                    questions_with_answers = []
-                    
-                    for question in questions_for_qt:
-                        question_id = question['id']
-                        # Attach answers
-                        question['answers'] = answers_by_question.get(question_id, [])
-                        questions_with_answers.append(question)
-                    
-                    qt['questions'] = questions_with_answers
-                    question_types_with_data.append(qt)
-                
-                section['question_types'] = question_types_with_data
-                sections_with_data.append(section)
+            question_types = question_types_result['data'] or []
+            ExamService._load_question_type_content(question_types)
+            section['question_types'] = question_types
             
+            exam_cache.set_compiled_exam(exam_id, version, section, part)
+            return {
+                'success': True,
+                'data': section
+            }
+        except Exception as e:
+            print(f"Error in get_section_data: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    @staticmethod
+    def stream_full_exam_data(exam_id: str) -> Dict:
+        """
+        Same content as get_full_exam_data, but 'sections' is an iterator that
+        assembles one section at a time, so the caller can send each section as
+        soon as it is ready instead of holding the whole exam in memory.
+        A cached compiled exam is streamed directly.
+        """
+        version = exam_cache.get_content_version(exam_id)
+        compiled_exam = exam_cache.get_compiled_exam(exam_id, version)
+        if compiled_exam is not None:
             return {
                 'success': True,
                 'data': {
-                    'exam': exam_result['data'],
-                    'sections': sections_with_data
+                    'exam': compiled_exam['exam'],
+                    'content_version': version,
+                    'sections': iter(compiled_exam['sections'])
                 }
             }
+        
+        try:
+            exam_data, section_durations, sections_result = run_parallel(
+                lambda: ExamService._fetch_exam_row(exam_id),
+                lambda: ExamService._fetch_section_durations(exam_id),
+                lambda: ExamService.get_exam_sections(exam_id),
+            )
+            exam_data['sections'] = section_durations
+            if not sections_result['success']:
+                return sections_result
         except Exception as e:
-            print(f"Error in get_full_exam_data: {str(e)}")
+            print(f"Error in stream_full_exam_data: {str(e)}")
             return {
                 'success': False,
                 'error': str(e)
             }
+        
+        def iter_sections():
+            for section in sections_result['data']:
+                part = f"section:{section['id']}"
+                cached_section = exam_cache.get_compiled_exam(exam_id, version, part)
+                if cached_section is not None:
+                    yield cached_section
+                    continue
+                
+                question_types_result = ExamService.get_question_types(section['id'])
+                if not question_types_result['success']:
+                    # Không cache / gửi section rỗng: lỗi dừng stream (view hủy kết nối)
+                    raise RuntimeError(f"Question types of section {section['id']}: {question_types_result['error']}")
+                question_types = question_types_result['data'] or []
+                ExamService._load_question_type_content(question_types)
+                section['question_types'] = question_types
+                exam_cache.set_compiled_exam(exam_id, version, section, part)
+                yield section
+        
+        return {
+            'success': True,
+            'data': {
+                'exam': exam_data,
+                'content_version': version,
+                'sections': iter_sections()
+            }
+        }
 
 
     # Xu ly luu bai thi   
     @staticmethod
-    def _calculate_score(submitted_answers: List[Dict], all_question_details_map: Dict, section_name_map: Dict) -> Dict:
+    def _calculate_score(submitted_answers: List[Dict], all_question_details_map: Dict, section_name_map: Dict,
+                         answer_key: Optional[AnswerKey] = None) -> Dict:
         """
         [Hàm private] Tính tổng điểm - ĐÃ CẬP NHẬT
         TRẢ VỀ: Một dictionary chứa tổng điểm VÀ điểm từng phần (theo section_id).
@@ -390,37 +730,29 @@ class ExamService:
                 {'id': 'S02', 'score': 3.5, 'max': 10}
             ]
         }
+        answer_key: đáp án đã biên dịch sẵn (get_answer_key) -> chấm điểm không cần truy vấn DB.
+        Nếu không có, đáp án của các câu đã trả lời được tải từ 'jlpt_answers'.
         """
         try:
-            question_ids_answered = [a['exam_question_id'] for a in submitted_answers]
-            if not question_ids_answered:
-                 question_ids_answered = list(all_question_details_map.keys())
+            if answer_key is None:
+                question_ids_answered = [a['exam_question_id'] for a in submitted_answers]
+                if not question_ids_answered:
+                     question_ids_answered = list(all_question_details_map.keys())
 
-            a_data_res = supabase.table('jlpt_answers')\
-                .select('id, question_id, points, position, is_correct')\
-                .in_('question_id', question_ids_answered)\
-                .is_('deleted_at', 'null')\
-                .execute()
+                a_data_res = supabase.table('jlpt_answers')\
+                    .select('id, question_id, points, position, is_correct')\
+                    .in_('question_id', question_ids_answered)\
+                    .is_('deleted_at', 'null')\
+                    .execute()
 
-            if not a_data_res.data:
-                 print("Lỗi: Không tìm thấy dữ liệu đáp án cho các câu đã trả lời.")
+                if not a_data_res.data:
+                     print("Lỗi: Không tìm thấy dữ liệu đáp án cho các câu đã trả lời.")
 
-            answer_points_map = {
-                a['id']: float(a.get('points', 0)) 
-                for a in a_data_res.data 
-                if a.get('points') is not None
-            }
-            
-            correct_answer_map = {}
-            partial_credit_answer_map = {}
-            for a in a_data_res.data:
-                q_id = a['question_id']
-                if q_id not in correct_answer_map: correct_answer_map[q_id] = {}
-                if a['position'] is not None:
-                    correct_answer_map[q_id][a['id']] = a['position']
-                    if a['is_correct']: partial_credit_answer_map[q_id] = a['id']
-                elif a['is_correct']:
-                    correct_answer_map[q_id][a['id']] = 1
+                answer_key = AnswerKey(
+                    None, 0, [],
+                    [{'id': q_id} for q_id in dict.fromkeys(question_ids_answered)],
+                    a_data_res.data or []
+                )
             
             submitted_map = {}
             for sa in submitted_answers:
@@ -453,7 +785,7 @@ class ExamService:
             # 5B: TÍNH ĐIỂM ĐẠT ĐƯỢC
             for q_id, student_answers_dict in submitted_map.items():
                 q_info = all_question_details_map.get(q_id)
-                correct_answers_dict = correct_answer_map.get(q_id)
+                correct_answers_dict = answer_key.correct_answers(q_id)
                 
                 if not q_info or not correct_answers_dict: continue
 
@@ -468,12 +800,12 @@ class ExamService:
                     if student_answers_dict == correct_answers_dict:
                         earned_score = question_max_score
                     else:
-                        partial_credit_ans_id = partial_credit_answer_map.get(q_id)
+                        partial_credit_ans_id = answer_key.partial_credit_answer(q_id)
                         if partial_credit_ans_id:
                             student_pos = student_answers_dict.get(partial_credit_ans_id)
                             correct_pos = correct_answers_dict.get(partial_credit_ans_id)
                             if student_pos is not None and student_pos == correct_pos:
-                                earned_score = answer_points_map.get(partial_credit_ans_id, 0.5)
+                                earned_score = answer_key.answer_points_for(partial_credit_ans_id, 0.5)
                 else: # Câu trắc nghiệm
                     if student_answers_dict == correct_answers_dict:
                         earned_score = question_max_score
@@ -509,37 +841,18 @@ class ExamService:
         Hàm service chính để nộp bài (ĐÃ CẬP NHẬT):
         """
         try:
-            # 1. Lấy TẤT CẢ sections cho exam_id
-            all_section_res = supabase.table('jlpt_exam_sections')\
-                .select('id, type')\
-                .eq('exam_id', exam_id)\
-                .execute()
-            if not all_section_res.data: raise Exception("Không tìm thấy section cho exam")
+            # 1 + 2. Đáp án đã biên dịch (sections, questions, answers) theo version của đề
+            #        -> lấy từ cache, không truy vấn DB
+            answer_key = get_answer_key(exam_id)
             
             # Tạo map: {'S01': '文字・語彙', 'S02': '文法・読解', ...}
-            section_name_map = {s['id']: s['type'] for s in all_section_res.data}
-            all_section_ids = list(section_name_map.keys())
-
-            # 2. Lấy TẤT CẢ questions cho TẤT CẢ sections
-            all_q_data_res = supabase.table('jlpt_questions')\
-                .select('id, score, question_type_id, exam_section_id')\
-                .in_('exam_section_id', all_section_ids)\
-                .is_('deleted_at', 'null')\
-                .execute()
-            if not all_q_data_res.data: raise Exception("Không tìm thấy câu hỏi cho exam")
+            section_name_map = answer_key.section_names()
             
             # map ĐẦY ĐỦ
-            all_question_details_map = {
-                q['id']: {
-                    'score': q.get('score', 1),
-                    'type': q.get('question_type_id'), 
-                    'section_id': q.get('exam_section_id')
-                } for q in all_q_data_res.data
-            }
-            # === KẾT THÚC SỬA LỖI ===
+            all_question_details_map = answer_key.question_details()
 
             # 3. Tính điểm (dùng map ĐẦY ĐỦ)
-            score_result = ExamService._calculate_score(answers_list, all_question_details_map, section_name_map)
+            score_result = ExamService._calculate_score(answers_list, all_question_details_map, section_name_map, answer_key)
             
             sum_score = score_result['total_score']
             section_scores = score_result['section_scores'] # List này giờ chứa ID và Tên
@@ -556,19 +869,12 @@ class ExamService:
                 'created_at': datetime.now(timezone.utc).isoformat()
             }
             
-            # 5. Tạo 'exam_results'
-            result_res = supabase.table('exam_results').insert(result_data).execute()
-            if not result_res.data: raise Exception("Không thể tạo exam_result")
-            new_exam_result = result_res.data[0]
-            new_exam_result_id = new_exam_result['id'] # Lấy ID (số nguyên) vừa tạo
-            
-            # 6. Chuẩn bị dữ liệu cho 'save_answers'
+            # 5. Chuẩn bị dữ liệu cho 'save_answers'
             answers_to_save = []
             for answer in answers_list:
                 q_id = answer['exam_question_id']
                 section_id = all_question_details_map.get(q_id, {}).get('section_id') # Dùng map đầy đủ
                 answers_to_save.append({
-                    'exam_result_id': new_exam_result_id,
                     'exam_section_id': section_id,
                     'exam_question_id': q_id,
                     'chosen_answer_id': answer['chosen_answer_id'],
@@ -576,39 +882,34 @@ class ExamService:
                     'created_at': datetime.now(timezone.utc).isoformat()
                 })
 
-            # 7a. Lưu 'save_answers'
-            if answers_to_save:
-                supabase.table('save_answers').insert(answers_to_save).execute()
-
-            # 7b. Lưu 'exam_result_sections'
-            if section_scores:
-                sections_to_save = []
-                for sec in section_scores:
-                    sections_to_save.append({
-                        'exam_result_id': new_exam_result_id,
-                        'exam_section_id': sec['id'], # <-- Lưu ID ('S01', 'S02')
-                        'score': sec['score'],
-                        'max_score': sec['max_score']
-                    })
-                
-                if sections_to_save:
-                    # Sửa lại lệnh insert để khớp với DB
-                    supabase.table('exam_result_sections').insert(sections_to_save).execute()
+            # 6. Chuẩn bị dữ liệu cho 'exam_result_sections'
+            sections_to_save = []
+            for sec in section_scores:
+                sections_to_save.append({
+                    'exam_section_id': sec['id'], # <-- Lưu ID ('S01', 'S02')
+                    'score': sec['score'],
+                    'max_score': sec['max_score']
+                })
 
-            # 7c. Tạo chứng chỉ
-            try:
-                cert_data = {
-                    'student_id': student_id,
-                    'exam_result_id': new_exam_result_id,
-                    'created_at': datetime.now(timezone.utc).isoformat()
-                }
-                supabase.table('certificates').insert(cert_data).execute()
-            except Exception as cert_error:
-                print(f"Lỗi khi tạo chứng chỉ: {str(cert_error)}")
+            # 7. Ghi 'exam_results', 'save_answers', 'exam_result_sections', 'certificates'
+            persistence_job_id = None
+            if getattr(settings, 'EXAM_SUBMIT_ASYNC', False):
+                new_exam_result, persistence_job_id = ExamService._write_submission_async(
+                    result_data, answers_to_save, sections_to_save
+                )
+            elif getattr(settings, 'EXAM_SUBMIT_BACKEND', 'postgrest') == 'rpc':
+                new_exam_result = ExamService._write_submission_rpc(result_data, answers_to_save, sections_to_save)
+            else:
+                new_exam_result = ExamService._write_submission_batch(result_data, answers_to_save, sections_to_save)
+            # Dashboard (điểm, thống kê) đã thay đổi
+            dashboard_cache.invalidate_student(student_id)
 
             # Gộp dữ liệu trả về
             response_data = new_exam_result
             response_data['section_scores'] = section_scores # Gắn điểm từng phần vào
+            if persistence_job_id:
+                # Client theo dõi việc lưu chi tiết qua GET exam/submissions/<job_id>/
+                response_data['persistence_job_id'] = persistence_job_id
 
             return {
                 'success': True,
@@ -621,15 +922,158 @@ class ExamService:
                 'error': str(e)
             }
 
+    @staticmethod
+    def _write_submission_batch(result_data: Dict, answers_to_save: List[Dict], sections_to_save: List[Dict]) -> Dict:
+        """
+        [Hàm private] Ghi bài nộp bằng nhiều lệnh insert PostgREST (mỗi bảng 1 round-trip).
+        Trả về dòng 'exam_results' vừa tạo.
+        """
+        # 7a. Tạo 'exam_results'
+        result_res = supabase.table('exam_results').insert(result_data).execute()
+        if not result_res.data: raise Exception("Không thể tạo exam_result")
+        new_exam_result = result_res.data[0]
+        new_exam_result_id = new_exam_result['id'] # Lấy ID (số nguyên) vừa tạo
+
+        # 7b - 7d. 'save_answers', 'exam_result_sections', 'certificates'
+        ExamService._write_submission_details(
+            new_exam_result_id, result_data['student_id'], answers_to_save, sections_to_save
+        )
+
+        return new_exam_result
+
+    @staticmethod
+    def _write_submission_details(exam_result_id: int, student_id: str, answers_to_save: List[Dict],
+                                  sections_to_save: List[Dict], retry: bool = False) -> None:
+        """
+        [Hàm private] Ghi 'save_answers', 'exam_result_sections' và 'certificates' cho 1 exam_result.
+        Mỗi bảng là 1 lệnh insert (all-or-nothing). Khi retry, bảng nào đã có dữ liệu
+        của exam_result này thì bỏ qua -> chạy lại nhiều lần không tạo dòng trùng.
+        """
+        def already_saved(table: str) -> bool:
+            if not retry:
+                return False
+            existing = supabase.table(table)\
+                .select('id')\
+                .eq('exam_result_id', exam_result_id)\
+                .limit(1)\
+                .execute()
+            return bool(existing.data)
+
+        # 7b. Lưu 'save_answers'
+        if answers_to_save and not already_saved('save_answers'):
+            supabase.table('save_answers').insert(
+                [dict(answer, exam_result_id=exam_result_id) for answer in answers_to_save]
+            ).execute()
+
+        # 7c. Lưu 'exam_result_sections' (+ cộng vào bảng tổng hợp điểm luyện đề trong cùng transaction:
+        #     retry sau khi worker chết giữa chừng không bỏ sót hay cộng trùng)
+        if sections_to_save:
+            if ExamService._maintains_practice_summary():
+                ExamService._save_result_sections(exam_result_id, sections_to_save)
+            elif not already_saved('exam_result_sections'):
+                supabase.table('exam_result_sections').insert(
+                    [dict(sec, exam_result_id=exam_result_id) for sec in sections_to_save]
+                ).execute()
+
+        # 7d. Tạo chứng chỉ
+        try:
+            if not already_saved('certificates'):
+                cert_data = {
+                    'student_id': student_id,
+                    'exam_result_id': exam_result_id,
+                    'created_at': datetime.now(timezone.utc).isoformat()
+                }
+                supabase.table('certificates').insert(cert_data).execute()
+        except Exception as cert_error:
+            print(f"Lỗi khi tạo chứng chỉ: {str(cert_error)}")
+
+    @staticmethod
+    def _write_submission_async(result_data: Dict, answers_to_save: List[Dict], sections_to_save: List[Dict]):
+        """
+        [Hàm private] Chỉ tạo 'exam_results' trong request (cần ID để trả về cho client),
+        phần còn lại đưa vào hàng đợi Redis cho worker (python manage.py run_submission_worker).
+        Trả về (dòng 'exam_results' vừa tạo, job_id).
+        """
+        result_res = supabase.table('exam_results').insert(result_data).execute()
+        if not result_res.data: raise Exception("Không thể tạo exam_result")
+        new_exam_result = result_res.data[0]
+
+        job_id = submission_queue.enqueue(
+            SUBMISSION_DETAILS_JOB,
+            {
+                'exam_result_id': new_exam_result['id'],
+                'student_id': result_data['student_id'],
+                'answers': answers_to_save,
+                'sections': sections_to_save
+            },
+            exam_result_id=new_exam_result['id'],
+            student_id=result_data['student_id']
+        )
+        return new_exam_result, job_id
+
+    @staticmethod
+    def persist_submission_details(payload: Dict, attempt: int) -> None:
+        """Handler của worker cho job SUBMISSION_DETAILS_JOB (lỗi -> worker tự retry)"""
+        ExamService._write_submission_details(
+            payload['exam_result_id'],
+            payload['student_id'],
+            payload['answers'],
+            payload['sections'],
+            retry=attempt > 1
+        )
+        # Điểm các section vừa được ghi -> bootstrap đã cache trong lúc chờ worker không còn đúng
+        dashboard_cache.invalidate_student(payload['student_id'])
+
+    @staticmethod
+    def _write_submission_rpc(result_data: Dict, answers_to_save: List[Dict], sections_to_save: List[Dict]) -> Dict:
+        """
+        [Hàm private] Ghi bài nộp trong MỘT lần gọi RPC (hàm submit_exam_result, sql/submit_exam_result.sql).
+        4 bảng được ghi trong cùng 1 transaction: lỗi giữa chừng không để lại dữ liệu dở dang.
+        Không tự động quay về cách ghi nhiều lệnh: lỗi mạng sau khi commit có thể gây ghi trùng.
+        """
+        payload = {
+            'result': result_data,
+            'answers': answers_to_save,
+            'sections': sections_to_save
+        }
+        if ExamService._maintains_practice_summary():
+            # Cộng điểm vào student_practice_summary trong cùng transaction
+            payload['practice_summary'] = True
+        response = supabase.rpc('submit_exam_result', {'p_payload': payload}).execute()
+        if not response.data: raise Exception("Không thể tạo exam_result")
+        return response.data
+
+    @staticmethod
+    def _maintains_practice_summary() -> bool:
+        """Bảng tổng hợp student_practice_summary được cập nhật khi nộp bài (PRACTICE_SUMMARY_BACKEND)"""
+        return getattr(settings, 'PRACTICE_SUMMARY_BACKEND', 'rows') == 'rollup'
+
+    @staticmethod
+    def _save_result_sections(exam_result_id, sections: List[Dict], replace: bool = False) -> Dict:
+        """
+        [Hàm private] Ghi 'exam_result_sections' của 1 exam_result và cộng phần chênh lệch vào
+        student_practice_summary trong MỘT transaction (hàm save_result_sections, sql/student_practice_summary.sql).
+        Chênh lệch được tính trong SQL từ dòng đang lưu (khóa dòng exam_results) -> các lần nộp đồng thời
+        không cộng trùng. replace=True: upsert và cập nhật exam_results.sum_score (nộp lại phần nghe).
+        Trả về dòng 'exam_results' sau khi ghi.
+        """
+        response = supabase.rpc('save_result_sections', {
+            'p_payload': {'exam_result_id': exam_result_id, 'sections': sections, 'replace': replace}
+        }).execute()
+        if not response.data: raise Exception("Không thể lưu exam_result_sections")
+        return response.data
+
     @staticmethod
     def submit_listening_exam(exam_result_id: str, student_id: str, exam_id: str, duration: int, answers_list: List[Dict]) -> Dict:
         """
         Submit listening exam - update existing exam_result_sections and exam_results
+        Max score và tên section lấy từ answer key đã cache; 1 lần đọc + 1 đợt ghi song song,
+        kết quả trả về được ghép từ dữ liệu đã có trong bộ nhớ (không đọc lại).
         """
         try:
-            # 1. Get exam_result to verify it exists and belongs to this student
+            # 1. Get exam_result (+ điểm các section đã lưu) to verify it exists and belongs to this student
             exam_result_res = supabase.table('exam_results')\
-                .select('id, sum_score')\
+                .select('*, exam_result_sections(exam_section_id, score, max_score)')\
                 .eq('id', exam_result_id)\
                 .eq('student_id', student_id)\
                 .eq('exam_id', exam_id)\
@@ -639,65 +1083,39 @@ class ExamService:
             if not exam_result_res.data:
                 return {'success': False, 'error': 'Exam result not found'}
             
-            current_sum_score = float(exam_result_res.data.get('sum_score', 0))
-            
-            # 2. Get listening section IDs first
-            sections_res = supabase.table('jlpt_exam_sections')\
-                .select('id, type, exam_id')\
-                .eq('exam_id', exam_id)\
-                .eq('is_listening', True)\
-                .execute()
+            result_data = exam_result_res.data
+            saved_sections = {
+                item['exam_section_id']: item
+                for item in (result_data.pop('exam_result_sections', None) or [])
+            }
+            saved_section_scores = {sec_id: item['score'] for sec_id, item in saved_sections.items()}
             
-            if not sections_res.data:
+            # 2 + 3. Listening sections and their questions from the compiled answer key
+            answer_key = get_answer_key(exam_id)
+            section_name_map = answer_key.section_names(listening_only=True)
+            if not section_name_map:
                 return {'success': False, 'error': 'No listening sections found'}
             
-            listening_section_ids = [s['id'] for s in sections_res.data]
-            section_name_map = {s['id']: s['type'] for s in sections_res.data}
-            
-            # 3. Get questions for listening sections only
-            questions_res = supabase.table('jlpt_questions')\
-                .select('id, exam_section_id, score')\
-                .in_('exam_section_id', listening_section_ids)\
-                .is_('deleted_at', 'null')\
-                .execute()
-            
-            if not questions_res.data:
-                return {'success': False, 'error': 'No questions found'}
-            
             # 4. Create question details map
-            all_question_details_map = {
-                q['id']: {
-                    'section_id': q['exam_section_id'],
-                    'score': q.get('score', 1)
-                }
-                for q in questions_res.data
-            }
+            all_question_details_map = answer_key.question_details(listening_only=True)
+            if not all_question_details_map:
+                return {'success': False, 'error': 'No questions found'}
             
             # 5. Calculate listening score
-            score_result = ExamService._calculate_score(answers_list, all_question_details_map, section_name_map)
+            score_result = ExamService._calculate_score(answers_list, all_question_details_map, section_name_map, answer_key)
             listening_score = score_result['total_score']
             section_scores = score_result['section_scores']
+            listening_section_scores = {sec['id']: sec['score'] for sec in section_scores}
+            section_max_scores = answer_key.section_max_scores()
             
-            # 6. Update exam_result_sections for listening sections
-            for section_score_data in section_scores:
-                section_id = section_score_data['id']
-                section_score = section_score_data['score']
-                
-                # Update the existing record
-                supabase.table('exam_result_sections')\
-                    .update({'score': section_score})\
-                    .eq('exam_result_id', exam_result_id)\
-                    .eq('exam_section_id', section_id)\
-                    .execute()
-            
-            # 7. Update exam_results.sum_score
-            new_sum_score = current_sum_score + listening_score
-            supabase.table('exam_results')\
-                .update({'sum_score': new_sum_score})\
-                .eq('id', exam_result_id)\
-                .execute()
+            # 6. sum_score mới: bỏ điểm nghe đã lưu trước đó (nếu có) rồi cộng điểm nghe mới
+            #    -> nộp lại phần nghe không bị cộng dồn
+            previous_listening_score = sum(
+                float(saved_section_scores.get(sec_id) or 0) for sec_id in listening_section_scores
+            )
+            new_sum_score = float(result_data.get('sum_score') or 0) - previous_listening_score + listening_score
             
-            # 8. Save listening answers
+            # 7. Listening answers to save
             formatted_answers = []
             for ans in answers_list:
                 q_id = ans['exam_question_id']
@@ -711,76 +1129,75 @@ class ExamService:
                     'created_at': datetime.now(timezone.utc).isoformat()
                 })
             
-            if formatted_answers:
-                supabase.table('save_answers').insert(formatted_answers).execute()
-            
-            # 9. Get full exam_result data to return
-            final_result_res = supabase.table('exam_results')\
-                .select('*')\
-                .eq('id', exam_result_id)\
-                .single()\
-                .execute()
-            
-            # 10. Get all section scores from exam_result_sections (including reading sections)
-            all_section_scores_res = supabase.table('exam_result_sections')\
-                .select('exam_section_id, score, jlpt_exam_sections(type)')\
-                .eq('exam_result_id', exam_result_id)\
-                .execute()
-            
-            # 11. Get max scores for each section by summing question scores
-            all_sections_in_exam = supabase.table('jlpt_exam_sections')\
-                .select('id, type')\
-                .eq('exam_id', exam_id)\
-                .is_('deleted_at', 'null')\
-                .execute()
-            
-            section_max_scores = {}
-            if all_sections_in_exam.data:
-                section_ids = [s['id'] for s in all_sections_in_exam.data]
-                questions_in_sections = supabase.table('jlpt_questions')\
-                    .select('exam_section_id, score')\
-                    .in_('exam_section_id', section_ids)\
-                    .is_('deleted_at', 'null')\
+            # 8. Ghi song song: upsert điểm các section nghe (1 lệnh, sql/exam_result_sections_unique.sql),
+            #    cập nhật exam_results.sum_score, lưu câu trả lời
+            def upsert_section_scores():
+                supabase.table('exam_result_sections').upsert(
+                    [
+                        {
+                            'exam_result_id': exam_result_id,
+                            'exam_section_id': sec_id,
+                            'score': score,
+                            # Cùng kiểu với submit_full_exam (cột số nguyên)
+                            'max_score': int(round(section_max_scores.get(sec_id, 0)))
+                        }
+                        for sec_id, score in listening_section_scores.items()
+                    ],
+                    on_conflict='exam_result_id,exam_section_id'
+                ).execute()
+
+            def update_sum_score():
+                supabase.table('exam_results')\
+                    .update({'sum_score': new_sum_score})\
+                    .eq('id', exam_result_id)\
                     .execute()
-                
-                for q in questions_in_sections.data:
-                    sec_id = q['exam_section_id']
-                    q_score = float(q.get('score', 1))
-                    section_max_scores[sec_id] = section_max_scores.get(sec_id, 0.0) + q_score
-            
-            # Format section scores for response
-            all_section_scores = []
-            if all_section_scores_res.data:
-                for item in all_section_scores_res.data:
-                    section_info = item.get('jlpt_exam_sections', {})
-                    sec_id = item['exam_section_id']
-                    all_section_scores.append({
-                        'id': sec_id,
-                        'type': section_info.get('type', 'N/A'),
-                        'score': item['score'],
-                        'max_score': int(round(section_max_scores.get(sec_id, 0)))
-                    })
-            
-            if final_result_res.data:
-                result_data = final_result_res.data
-                result_data['section_scores'] = all_section_scores
-                result_data['listening_score'] = listening_score
-                
-                return {
-                    'success': True,
-                    'data': result_data
-                }
+
+            def save_listening_answers():
+                if formatted_answers:
+                    supabase.table('save_answers').insert(formatted_answers).execute()
+
+            if ExamService._maintains_practice_summary():
+                # 8b. Có bảng tổng hợp điểm luyện đề: upsert section + sum_score + phần chênh lệch
+                #     trong 1 transaction, tính từ dòng đang lưu (không từ saved_sections đọc ở bước 1)
+                def save_section_scores():
+                    nonlocal new_sum_score
+                    saved_result = ExamService._save_result_sections(exam_result_id, [
+                        {
+                            'exam_section_id': sec_id,
+                            'score': score,
+                            'max_score': int(round(section_max_scores.get(sec_id, 0)))
+                        }
+                        for sec_id, score in listening_section_scores.items()
+                    ], replace=True)
+                    new_sum_score = saved_result.get('sum_score', new_sum_score)
+
+                run_parallel(save_section_scores, save_listening_answers)
             else:
-                return {
-                    'success': True,
-                    'data': {
-                        'id': exam_result_id,
-                        'sum_score': new_sum_score,
-                        'listening_score': listening_score,
-                        'section_scores': all_section_scores
-                    }
+                run_parallel(upsert_section_scores, update_sum_score, save_listening_answers)
+            dashboard_cache.invalidate_student(student_id)
+            
+            # 9. Response from in-memory data: saved scores overlaid with the new listening ones
+            saved_section_scores.update(listening_section_scores)
+            all_section_names = answer_key.section_names()
+            all_section_scores = [
+                {
+                    'id': sec_id,
+                    'type': all_section_names.get(sec_id) or 'N/A',
+                    'score': saved_section_scores[sec_id],
+                    'max_score': int(round(section_max_scores.get(sec_id, 0)))
                 }
+                for sec_id in answer_key.section_ids
+                if sec_id in saved_section_scores
+            ]
             
+            result_data['sum_score'] = new_sum_score
+            result_data['section_scores'] = all_section_scores
+            result_data['listening_score'] = listening_score
+            
+            return {
+                'success': True,
+                'data': result_data
+            }
             
         except Exception as e:
             print(f"Error in submit_listening_exam: {str(e)}")
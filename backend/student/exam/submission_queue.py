@@ -0,0 +1,253 @@
+"""
+Durable Redis work queue for exam submission persistence
+
+When EXAM_SUBMIT_ASYNC is on, submit_full_exam grades in-request, creates the
+exam_results row and hands the remaining writes (save_answers,
+exam_result_sections, certificates) to this queue. The score is returned right
+away; a worker process (`python manage.py run_submission_worker`) drains the
+queue with retries and exponential backoff.
+
+Redis layout (raw keys on the django_redis "default" connection):
+    submission_queue:pending                  LIST  job JSON, pushed left, popped right
+    submission_queue:processing:<worker>      LIST  jobs a worker is handling (requeued when it is gone)
+    submission_queue:heartbeat:<worker>       STRING set while the worker runs (expires HEARTBEAT_TTL after it stops)
+    submission_queue:delayed                  ZSET  jobs waiting for a retry, scored by due time
+    submission_queue:dead                     LIST  jobs that exhausted their retries
+    submission_job:<job_id>                   HASH  status shown by the status endpoint (to its student only)
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import WatchError
+
+PENDING_KEY = 'submission_queue:pending'
+PROCESSING_KEY = 'submission_queue:processing:{worker}'
+DELAYED_KEY = 'submission_queue:delayed'
+DEAD_KEY = 'submission_queue:dead'
+STATUS_KEY = 'submission_job:{job_id}'
+HEARTBEAT_KEY = 'submission_queue:heartbeat:{worker}'
+
+STATUS_TTL = 60 * 60 * 24
+
+# Move every due job from the delayed set back to the pending list atomically
+PROMOTE_DUE_JOBS = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, job in ipairs(due) do
+    redis.call('ZREM', KEYS[1], job)
+    redis.call('LPUSH', KEYS[2], job)
+end
+return #due
+"""
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _max_attempts() -> int:
+    return getattr(settings, 'SUBMISSION_QUEUE_MAX_ATTEMPTS', 5)
+
+
+def _heartbeat_ttl() -> int:
+    return getattr(settings, 'SUBMISSION_WORKER_HEARTBEAT_TTL', 60)
+
+
+def _recover_interval() -> int:
+    return getattr(settings, 'SUBMISSION_WORKER_RECOVER_INTERVAL', 30)
+
+
+def default_worker_name() -> str:
+    """Unique per process (host + pid): scaled workers never share a processing list"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _set_status(pipe, job_id: str, **fields) -> None:
+    key = STATUS_KEY.format(job_id=job_id)
+    pipe.hset(key, mapping={k: '' if v is None else str(v) for k, v in fields.items()})
+    pipe.expire(key, STATUS_TTL)
+
+
+def enqueue(job_type: str, payload: Dict, exam_result_id: Optional[int] = None,
+            student_id: Optional[str] = None) -> str:
+    """Queue a job and return its id (used by the status endpoint, readable by student_id only)"""
+    job_id = uuid.uuid4().hex
+    job = json.dumps({
+        'id': job_id,
+        'type': job_type,
+        'payload': payload,
+        'attempts': 0,
+    })
+    pipe = _redis().pipeline()
+    _set_status(pipe, job_id, status='queued', attempts=0, exam_result_id=exam_result_id,
+                student_id=student_id, enqueued_at=int(time.time()))
+    pipe.lpush(PENDING_KEY, job)
+    pipe.execute()
+    return job_id
+
+
+def get_status(job_id: str, student_id: str) -> Optional[Dict]:
+    """Current status of a job of this student, or None if unknown/expired or queued for someone else"""
+    raw = _redis().hgetall(STATUS_KEY.format(job_id=job_id))
+    if not raw:
+        return None
+    # Empty strings stand for "not set" (see _set_status)
+    status_data = {k.decode(): (v.decode() or None) for k, v in raw.items()}
+    if status_data.pop('student_id', None) != str(student_id):
+        return None
+    status_data['job_id'] = job_id
+    status_data['attempts'] = int(status_data.get('attempts') or 0)
+    if status_data.get('exam_result_id'):
+        status_data['exam_result_id'] = int(status_data['exam_result_id'])
+    return status_data
+
+
+class SubmissionWorker:
+    """
+    Pops jobs and runs the handler registered for their type.
+
+    Each worker owns a processing list and keeps a heartbeat key alive while it
+    runs, also while a job is being handled (background thread). On start, and
+    then every SUBMISSION_WORKER_RECOVER_INTERVAL seconds, the processing lists
+    of workers whose heartbeat expired (crash, redeploy) are requeued, with the
+    interrupted attempt counted, so the handler runs them in retry mode.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[[Dict, int], None]], name: Optional[str] = None,
+                 poll_timeout: int = 5):
+        self.handlers = handlers
+        self.name = name or default_worker_name()
+        self.processing_key = PROCESSING_KEY.format(worker=self.name)
+        self.heartbeat_key = HEARTBEAT_KEY.format(worker=self.name)
+        self.poll_timeout = poll_timeout
+        self.redis = _redis()
+        self.promote_due_jobs = self.redis.register_script(PROMOTE_DUE_JOBS)
+        self.running = True
+
+    def _heartbeat_timeout(self) -> int:
+        return max(_heartbeat_ttl(), self.poll_timeout * 2)
+
+    def heartbeat(self) -> None:
+        self.redis.set(self.heartbeat_key, int(time.time()), ex=self._heartbeat_timeout())
+
+    @contextmanager
+    def _keeping_alive(self):
+        """Refresh the heartbeat from a background thread while the block runs (a long job must not look dead)"""
+        stop = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(max(1, self._heartbeat_timeout() / 3)):
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    print(f"Submission worker {self.name}: heartbeat failed: {str(e)}")
+
+        thread = threading.Thread(target=keep_alive, name=f'{self.name}-heartbeat', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def recover(self) -> int:
+        """Requeue the jobs of this worker's previous run and of every worker that stopped heartbeating"""
+        self.heartbeat()
+        return self._requeue(self.processing_key) + self.recover_orphans()
+
+    def recover_orphans(self) -> int:
+        """
+        Requeue the processing lists of other workers whose heartbeat expired.
+        Run periodically: a worker that died less than a heartbeat TTL before this one
+        started still looked alive at start-up.
+        """
+        recovered = 0
+        prefix = PROCESSING_KEY.format(worker='')
+        for key in self.redis.scan_iter(match=PROCESSING_KEY.format(worker='*')):
+            key = key.decode()
+            worker = key[len(prefix):]
+            if key != self.processing_key and not self.redis.exists(HEARTBEAT_KEY.format(worker=worker)):
+                recovered += self._requeue(key)
+        return recovered
+
+    def _requeue(self, processing_key: str) -> int:
+        """
+        Move a processing list back to pending in one transaction, counting the interrupted
+        attempt: the job may have written part of its rows, so it must run as a retry.
+        WATCH: if another starting worker requeues the same list first, this one skips it.
+        """
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(processing_key)
+                raw_jobs = pipe.lrange(processing_key, 0, -1)
+                if not raw_jobs:
+                    return 0
+                pipe.multi()
+                # Interrupted jobs are the oldest: push them on the popping (right) end,
+                # oldest (right end of the processing list) last so it runs first
+                for raw_job in raw_jobs:
+                    job = json.loads(raw_job)
+                    job['attempts'] += 1
+                    pipe.rpush(PENDING_KEY, json.dumps(job))
+                pipe.delete(processing_key)
+                pipe.execute()
+                return len(raw_jobs)
+            except WatchError:
+                return 0
+
+    def run(self, max_jobs: Optional[int] = None) -> None:
+        handled = 0
+        next_recovery = time.monotonic() + _recover_interval()
+        while self.running and (max_jobs is None or handled < max_jobs):
+            self.heartbeat()
+            if time.monotonic() >= next_recovery:
+                recovered = self.recover_orphans()
+                if recovered:
+                    print(f"Submission worker {self.name}: requeued {recovered} job(s) of stopped workers")
+                next_recovery = time.monotonic() + _recover_interval()
+            self.promote_due_jobs(keys=[DELAYED_KEY, PENDING_KEY], args=[time.time()])
+            raw_job = self.redis.brpoplpush(PENDING_KEY, self.processing_key, self.poll_timeout)
+            if raw_job is None:
+                continue
+            self.process(raw_job)
+            handled += 1
+
+    def process(self, raw_job: bytes) -> None:
+        job = json.loads(raw_job)
+        job_id = job['id']
+        attempts = job['attempts'] + 1
+        pipe = self.redis.pipeline()
+        _set_status(pipe, job_id, status='processing', attempts=attempts)
+        pipe.execute()
+
+        try:
+            handler = self.handlers.get(job['type'])
+            if handler is None:
+                raise Exception(f"No handler for job type '{job['type']}'")
+            with self._keeping_alive():
+                handler(job['payload'], attempts)
+        except Exception as e:
+            print(f"Submission job {job_id} failed (attempt {attempts}): {str(e)}")
+            job['attempts'] = attempts
+            pipe = self.redis.pipeline()
+            if attempts >= _max_attempts():
+                _set_status(pipe, job_id, status='failed', attempts=attempts, error=str(e))
+                pipe.lpush(DEAD_KEY, json.dumps(job))
+            else:
+                backoff = getattr(settings, 'SUBMISSION_QUEUE_BACKOFF', 2) ** attempts
+                _set_status(pipe, job_id, status='retrying', attempts=attempts, error=str(e))
+                pipe.zadd(DELAYED_KEY, {json.dumps(job): time.time() + backoff})
+            pipe.lrem(self.processing_key, 1, raw_job)
+            pipe.execute()
+            return
+
+        pipe = self.redis.pipeline()
+        _set_status(pipe, job_id, status='done', attempts=attempts, error=None, finished_at=int(time.time()))
+        pipe.lrem(self.processing_key, 1, raw_job)
+        pipe.execute()
@@ -9,9 +9,15 @@ urlpatterns = [
     path('exams/<str:exam_id>/', views.get_exam_by_id, name='exam-detail'),
     path('exams/<str:level_id>/list/', views.get_exams_by_level, name='exam-list-by-level'),
     path('exams/<str:exam_id>/full_data/', views.get_full_exam_data, name='exam-full-data'),
+    path('exams/<str:exam_id>/manifest/', views.get_exam_manifest, name='exam-manifest'),
+    path('exams/<str:exam_id>/sections/<str:section_id>/', views.get_exam_section_data, name='exam-section-data'),
 
     path('answers/', views.save_student_answers, name='save-student-answers'),
     path('exams/<str:exam_id>/submit/', views.submit_exam, name='submit-exam'),
     path('exams/<str:exam_id>/submit-listening/', views.submit_listening_exam, name='submit-listening-exam'),
+    path('exams/<str:exam_id>/autosave/', views.autosave_answers, name='exam-autosave'),
+    path('exams/<str:exam_id>/finalize/', views.finalize_exam, name='finalize-exam'),
+    path('exams/<str:exam_id>/finalize-listening/', views.finalize_listening_exam, name='finalize-listening-exam'),
+    path('submissions/<str:job_id>/', views.get_submission_status, name='submission-status'),
     path('results/', views.save_exam_result, name='save-exam-result')
 ]
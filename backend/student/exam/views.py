@@ -1,15 +1,20 @@
 """
 API Views for Exam functionality
 """
-import jwt
-import os
-from config.supabase_client import supabase
-SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "b)-hy#9mu$@)@ahd5z+mp-t-4jsmkdq&gd#-@1+3g&4ss4e%_v")
+import json
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
 
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, authentication_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework import status
+from config.async_views import async_api_view
 from .services import ExamService
+from .async_services import AsyncExamService
+from student.common.authentication import StudentJWTAuthentication
+from config.rate_limit import scoped_throttle
+from . import submission_queue
+from . import autosave
 from .serializers import (
     LevelSerializer, 
     ExamSerializer, 
@@ -17,15 +22,20 @@ from .serializers import (
     ExamResultSerializer,
     StudentAnswerSerializer,
     ExamSubmissionSerializer,
-    ListeningExamSubmissionSerializer
+    ListeningExamSubmissionSerializer,
+    AutosaveAnswersSerializer,
+    FinalizeExamSerializer,
+    FinalizeListeningExamSerializer
 )
 
 
 
-@api_view(['GET'])
-def get_levels(request):
+# Các endpoint đọc đề thi là async (AsyncExamService): dưới ASGI không giữ thread khi chờ Supabase
+
+@async_api_view(['GET'])
+async def get_levels(request):
     """Get all JLPT levels"""
-    result = ExamService.get_levels()
+    result = await AsyncExamService.get_levels()
     
     if result['success']:
         serializer = LevelSerializer(result['data'], many=True)
@@ -33,10 +43,10 @@ def get_levels(request):
     return Response({'error': result['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['GET'])
-def get_exam_by_id(request, exam_id):
+@async_api_view(['GET'])
+async def get_exam_by_id(request, exam_id):
     """Get exam details by ID"""
-    result = ExamService.get_exam_by_id(exam_id)
+    result = await AsyncExamService.get_exam_by_id(exam_id)
     
     if result['success']:
         serializer = ExamSerializer(result['data'])
@@ -44,10 +54,10 @@ def get_exam_by_id(request, exam_id):
     return Response({'error': result['error']}, status=status.HTTP_404_NOT_FOUND)
 
 
-@api_view(['GET'])
-def get_exams_by_level(request, level_id):
+@async_api_view(['GET'])
+async def get_exams_by_level(request, level_id):
     """Get all exams for a specific level"""
-    result = ExamService.get_exams_by_level(level_id)
+    result = await AsyncExamService.get_exams_by_level(level_id)
     
     if result['success']:
         try:
@@ -61,15 +71,69 @@ def get_exams_by_level(request, level_id):
     return Response({'error': result.get('error', 'Unknown error')}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['GET'])
-def get_full_exam_data(request, exam_id):
-    """Get complete exam data including all questions and answers"""
+def _to_json_bytes(data) -> bytes:
+    # Same output format as DRF's JSONRenderer (compact, unicode kept)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+_END = object()
+
+
+def _next_section_json(sections):
+    """Assemble (sync: Supabase / Redis) and encode the next section; _END when there is none"""
+    section = next(sections, _END)
+    return _END if section is _END else _to_json_bytes(section)
+
+
+async def _stream_exam_json(exam_data: dict):
+    """
+    Yield the exam header first, then each section as soon as it is assembled.
+    Async generator: under ASGI Django sends each chunk as it is yielded (a sync
+    iterator would be consumed into one body first). Each section is built and
+    encoded in a worker thread, off the event loop.
+    """
+    yield b'{"exam":' + _to_json_bytes(exam_data['exam'])
+    yield b',"content_version":' + _to_json_bytes(exam_data['content_version'])
+    yield b',"sections":['
+    sections = iter(exam_data['sections'])
+    next_section_json = sync_to_async(_next_section_json, thread_sensitive=False)
+    try:
+        index = 0
+        while (chunk := await next_section_json(sections)) is not _END:
+            yield (b',' if index else b'') + chunk
+            index += 1
+    except Exception as e:
+        # Headers are already sent: log and re-raise so the connection is aborted.
+        # Closing the document here would hand the client a valid exam that is missing sections.
+        print(f"Error while streaming exam sections: {e}")
+        raise
+    yield b']}'
+
+
+@async_api_view(['GET'])
+@throttle_classes([scoped_throttle('exam_full_data')])
+async def get_full_exam_data(request, exam_id):
+    """
+    Get complete exam data including all questions and answers
+    ?stream=1 streams the response section by section (StreamingHttpResponse)
+    """
     try:
         # Check if client is still connected
         if hasattr(request, '_closed') and request._closed:
             return Response({'error': 'Client disconnected'}, status=499)
         
-        result = ExamService.get_full_exam_data(exam_id)
+        if request.query_params.get('stream') in ('1', 'true', 'True'):
+            # Sections are assembled lazily by a sync generator: build it off the event loop
+            result = await sync_to_async(ExamService.stream_full_exam_data, thread_sensitive=False)(exam_id)
+            if not result['success']:
+                return Response({'error': result['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return StreamingHttpResponse(
+                _stream_exam_json(result['data']),
+                content_type='application/json',
+                status=status.HTTP_200_OK
+            )
+        
+        result = await AsyncExamService.get_full_exam_data(exam_id)
         
         # Check again before sending response
         if hasattr(request, '_closed') and request._closed:
@@ -93,53 +157,42 @@ def get_full_exam_data(request, exam_id):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Manifest / section / nộp bài / autosave: service đồng bộ (Supabase, Redis) chạy trong worker thread
+# với thread_sensitive=False -> dưới ASGI các request không xếp hàng trên 1 thread dùng chung
+
+@async_api_view(['GET'])
+async def get_exam_manifest(request, exam_id):
+    """Get exam info, section list and content version (no questions)"""
+    result = await sync_to_async(ExamService.get_exam_manifest, thread_sensitive=False)(exam_id)
+    
+    if result['success']:
+        return Response(result['data'], status=status.HTTP_200_OK)
+    return Response({'error': result['error']}, status=status.HTTP_404_NOT_FOUND)
+
+
+@async_api_view(['GET'])
+async def get_exam_section_data(request, exam_id, section_id):
+    """Get one section with its question types, questions and answers"""
+    result = await sync_to_async(ExamService.get_section_data, thread_sensitive=False)(exam_id, section_id)
+    
+    if result['success']:
+        # Return raw data without serialization to preserve nested structure
+        return Response(result['data'], status=status.HTTP_200_OK)
+    if result['error'] == 'Section not found':
+        return Response({'error': result['error']}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'error': result['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 # Xu ly luu bai thi
 
-@api_view(['POST'])
-# Bỏ @permission_classes([IsAuthenticated])
-def submit_exam(request, exam_id):
+@async_api_view(['POST'])
+@authentication_classes([StudentJWTAuthentication])
+async def submit_exam(request, exam_id):
     """
     Nhận bài nộp của học sinh, tính điểm, và lưu kết quả.
     """
-    # 1. Lấy student_id từ token (đã được decode)
-    # Sử dụng logic giải mã token bằng tay (custom auth).
-    
-    # === BƯỚC A: XÁC THỰC TOKEN BẰNG TAY (Copy TestSessionAPIView) ===
-    auth_header = request.headers.get('Authorization', None)
-    
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return Response({"error": "Thiếu token xác thực."}, status=status.HTTP_401_UNAUTHORIZED)
-    
-    jwt_token = auth_header.split(' ')[1]
-    
-    try:
-        # Giải mã JWT
-        payload = jwt.decode(jwt_token, SECRET_KEY, algorithms=["HS256"])
-        account_id = payload.get('id')
-
-        if not account_id:
-            return Response({"error": "Token không hợp lệ (thiếu ID)."}, status=status.HTTP_401_UNAUTHORIZED)
-
-        # === Dùng account_id để lấy student.id ===
-        student_res = supabase.table('students')\
-            .select('id')\
-            .eq('account_id', account_id)\
-            .single()\
-            .execute()
-
-        if not student_res.data:
-            return Response({"error": "Không tìm thấy hồ sơ học sinh cho tài khoản này."}, status=status.HTTP_404_NOT_FOUND)
-
-        student_id = student_res.data['id']
-    # =================================================
-
-    except jwt.ExpiredSignatureError:
-        return Response({"error": "Token đã hết hạn."}, status=status.HTTP_401_UNAUTHORIZED)
-    except jwt.InvalidTokenError:
-        return Response({"error": "Token không hợp lệ."}, status=status.HTTP_401_UNAUTHORIZED)
-    except Exception as e:
-        return Response({"error": f"Lỗi không xác định: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    # === KẾT THÚC BƯỚC XÁC THỰC ===
+    # 1. student_id đã được StudentJWTAuthentication giải mã từ token (có cache)
+    student_id = request.user.student_id
     
     # 2. Validate dữ liệu gửi lên (duration, answers)
     serializer = ExamSubmissionSerializer(data=request.data)
@@ -149,7 +202,7 @@ def submit_exam(request, exam_id):
     validated_data = serializer.validated_data
     
     # 3. Gọi service để xử lý
-    result = ExamService.submit_full_exam(
+    result = await sync_to_async(ExamService.submit_full_exam, thread_sensitive=False)(
         student_id=student_id,
         exam_id=exam_id,
         duration=validated_data['duration'],
@@ -164,6 +217,26 @@ def submit_exam(request, exam_id):
     return Response({'error': result['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@async_api_view(['GET'])
+@authentication_classes([StudentJWTAuthentication])
+async def get_submission_status(request, job_id):
+    """
+    Trạng thái lưu bài nộp bất đồng bộ: queued / processing / retrying / done / failed.
+    Chỉ học sinh đã nộp bài xem được (job của người khác -> 404).
+    """
+    try:
+        job_status = await sync_to_async(submission_queue.get_status, thread_sensitive=False)(
+            job_id, request.user.student_id
+        )
+    except Exception as e:
+        print(f"Error reading submission status: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    if job_status is None:
+        return Response({'error': 'Submission job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job_status, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 def save_exam_result(request):
     """Save exam result"""
@@ -189,41 +262,11 @@ def save_student_answers(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['POST'])
-def submit_listening_exam(request, exam_id):
+@async_api_view(['POST'])
+@authentication_classes([StudentJWTAuthentication])
+async def submit_listening_exam(request, exam_id):
     """Submit listening exam - updates existing exam_result with listening scores"""
-    # Authentication
-    auth_header = request.headers.get('Authorization', None)
-    
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return Response({"error": "Thiếu token xác thực."}, status=status.HTTP_401_UNAUTHORIZED)
-    
-    jwt_token = auth_header.split(' ')[1]
-    
-    try:
-        payload = jwt.decode(jwt_token, SECRET_KEY, algorithms=["HS256"])
-        account_id = payload.get('id')
-
-        if not account_id:
-            return Response({"error": "Token không hợp lệ (thiếu ID)."}, status=status.HTTP_401_UNAUTHORIZED)
-
-        student_res = supabase.table('students')\
-            .select('id')\
-            .eq('account_id', account_id)\
-            .single()\
-            .execute()
-
-        if not student_res.data:
-            return Response({"error": "Không tìm thấy hồ sơ học sinh cho tài khoản này."}, status=status.HTTP_404_NOT_FOUND)
-
-        student_id = student_res.data['id']
-
-    except jwt.ExpiredSignatureError:
-        return Response({"error": "Token đã hết hạn."}, status=status.HTTP_401_UNAUTHORIZED)
-    except jwt.InvalidTokenError:
-        return Response({"error": "Token không hợp lệ."}, status=status.HTTP_401_UNAUTHORIZED)
-    except Exception as e:
-        return Response({"error": f"Lỗi không xác định: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    student_id = request.user.student_id
     
     # Validate data - sử dụng ListeningExamSubmissionSerializer cho phép answers rỗng
     serializer = ListeningExamSubmissionSerializer(data=request.data)
@@ -238,7 +281,7 @@ def submit_listening_exam(request, exam_id):
         return Response({"error": "exam_result_id is required"}, status=status.HTTP_400_BAD_REQUEST)
     
     # Call service
-    result = ExamService.submit_listening_exam(
+    result = await sync_to_async(ExamService.submit_listening_exam, thread_sensitive=False)(
         exam_result_id=exam_result_id,
         student_id=student_id,
         exam_id=exam_id,
@@ -250,3 +293,107 @@ def submit_listening_exam(request, exam_id):
         return Response(result['data'], status=status.HTTP_200_OK)
     else:
         return Response({"error": result['error']}, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Lưu tạm câu trả lời (autosave) và nộp bài từ bộ đệm
+
+@async_api_view(['GET', 'PUT'])
+@authentication_classes([StudentJWTAuthentication])
+async def autosave_answers(request, exam_id):
+    """
+    GET: câu trả lời đã lưu tạm (?part=full|listening) để khôi phục khi tải lại trang.
+    PUT: lưu tạm các câu vừa thay đổi vào Redis (không ghi Supabase).
+    """
+    student_id = request.user.student_id
+    
+    if request.method == 'GET':
+        part = request.query_params.get('part', 'full')
+        if part not in autosave.PARTS:
+            return Response({"error": "part không hợp lệ."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            answers = await sync_to_async(autosave.get_answers, thread_sensitive=False)(student_id, exam_id, part)
+        except Exception as e:
+            print(f"Error reading autosave buffer: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'part': part, 'answers': answers}, status=status.HTTP_200_OK)
+    
+    serializer = AutosaveAnswersSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    validated_data = serializer.validated_data
+    
+    try:
+        answered_count = await sync_to_async(autosave.save_answers, thread_sensitive=False)(
+            student_id, exam_id, validated_data['part'],
+            validated_data['answers'], validated_data['cleared_questions']
+        )
+    except Exception as e:
+        print(f"Error writing autosave buffer: {str(e)}")
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({'part': validated_data['part'], 'answered_count': answered_count}, status=status.HTTP_200_OK)
+
+
+@async_api_view(['POST'])
+@authentication_classes([StudentJWTAuthentication])
+async def finalize_exam(request, exam_id):
+    """
+    Nộp bài thi từ bộ đệm autosave: client chỉ gửi duration.
+    Kết quả giống submit_exam.
+    """
+    student_id = request.user.student_id
+    
+    serializer = FinalizeExamSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Lấy và xóa bộ đệm trong 1 transaction -> gọi 2 lần không nộp trùng
+    answers = await sync_to_async(autosave.take_answers, thread_sensitive=False)(student_id, exam_id, 'full')
+    if not answers:
+        return Response({"error": "Không có câu trả lời nào được lưu cho bài thi này."}, status=status.HTTP_400_BAD_REQUEST)
+    
+    result = await sync_to_async(ExamService.submit_full_exam, thread_sensitive=False)(
+        student_id=student_id,
+        exam_id=exam_id,
+        duration=serializer.validated_data['duration'],
+        answers_list=answers
+    )
+    
+    if result['success']:
+        serializer = ExamResultSerializer(result['data'])
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    # Nộp lỗi -> trả câu trả lời về bộ đệm để học sinh nộp lại
+    await sync_to_async(autosave.restore_answers, thread_sensitive=False)(student_id, exam_id, 'full', answers)
+    return Response({'error': result['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@async_api_view(['POST'])
+@authentication_classes([StudentJWTAuthentication])
+async def finalize_listening_exam(request, exam_id):
+    """
+    Nộp phần nghe từ bộ đệm autosave (part=listening): client gửi duration và exam_result_id.
+    Kết quả giống submit_listening_exam.
+    """
+    student_id = request.user.student_id
+    
+    serializer = FinalizeListeningExamSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    validated_data = serializer.validated_data
+    
+    # Phần nghe cho phép nộp không có đáp án nào (0 điểm)
+    answers = await sync_to_async(autosave.take_answers, thread_sensitive=False)(student_id, exam_id, 'listening')
+    
+    result = await sync_to_async(ExamService.submit_listening_exam, thread_sensitive=False)(
+        exam_result_id=validated_data['exam_result_id'],
+        student_id=student_id,
+        exam_id=exam_id,
+        duration=validated_data['duration'],
+        answers_list=answers
+    )
+    
+    if result['success']:
+        return Response(result['data'], status=status.HTTP_200_OK)
+    
+    await sync_to_async(autosave.restore_answers, thread_sensitive=False)(student_id, exam_id, 'listening', answers)
+    return Response({"error": result['error']}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,142 @@
+"""
+Account lookup for student login
+
+Both login modes need exactly one PostgREST call on the shared Supabase client:
+    email        account?email=eq.<email>
+    student_id   students?id=eq.<id>&select=account_id,account(id,email,password,user_name)
+
+Identifiers that match no account are remembered for a short time. The entry is
+kept in-process (TTL LRU) and in Redis, so repeated guesses of unknown
+emails / student ids (credential stuffing) are answered without touching the
+database. Registration and admin student creation drop the entry as soon as
+the identifier becomes valid.
+
+find_login_account() is the sync version; afind_login_account() sends the same
+query through the event loop's AsyncClient (async login view under ASGI).
+"""
+from typing import Dict, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from config.local_cache import LocalTTLCache
+from config.supabase_client import get_async_supabase_client, supabase
+
+ACCOUNT_COLUMNS = 'id, email, password, user_name'
+UNKNOWN_LOGIN_KEY = 'login_unknown:{kind}:{ident}'
+
+# Lý do đăng nhập thất bại (view chọn thông báo lỗi tương ứng)
+NOT_FOUND = 'not_found'            # không có học viên / email
+NOT_LINKED = 'not_linked'          # học viên chưa liên kết tài khoản
+ACCOUNT_MISSING = 'account_missing'
+
+_unknown = LocalTTLCache(
+    maxsize=getattr(settings, 'LOGIN_NEGATIVE_LOCAL_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'LOGIN_NEGATIVE_LOCAL_CACHE_TIMEOUT', 10),
+)
+
+
+def _key(kind: str, ident: str) -> str:
+    return UNKNOWN_LOGIN_KEY.format(kind=kind, ident=ident)
+
+
+def _cached_miss(kind: str, ident: str) -> Optional[str]:
+    key = _key(kind, ident)
+    reason = _unknown.get(key)
+    if reason is not None:
+        return reason
+    try:
+        reason = cache.get(key)
+    except Exception as e:
+        print(f"Login negative cache: read failed for {key}: {str(e)}")
+        return None
+    if reason is not None:
+        _unknown.set(key, reason)
+    return reason
+
+
+def _remember_miss(kind: str, ident: str, reason: str) -> None:
+    key = _key(kind, ident)
+    _unknown.set(key, reason)
+    try:
+        cache.set(key, reason, getattr(settings, 'LOGIN_NEGATIVE_CACHE_TIMEOUT', 60))
+    except Exception as e:
+        print(f"Login negative cache: write failed for {key}: {str(e)}")
+
+
+def forget_unknown_login(email: str = None, student_id: str = None) -> None:
+    """Drop the negative entry of an identifier that now exists (new account / student)"""
+    for kind, ident in (('email', email), ('student_id', student_id)):
+        if not ident:
+            continue
+        key = _key(kind, ident)
+        _unknown.delete(key)
+        try:
+            cache.delete(key)
+        except Exception as e:
+            print(f"Login negative cache: delete failed for {key}: {str(e)}")
+
+
+def _identifier(email: str = None, student_id: str = None) -> Tuple[str, str]:
+    return ('student_id', student_id) if student_id else ('email', email)
+
+
+def _lookup_query(client, email: str = None, student_id: str = None):
+    """The single PostgREST request of a login (sync or async client, not executed)"""
+    if student_id:
+        return client.table('students') \
+            .select(f'account_id, account({ACCOUNT_COLUMNS})') \
+            .eq('id', student_id) \
+            .limit(1)
+    return client.table('account') \
+        .select(ACCOUNT_COLUMNS) \
+        .eq('email', email) \
+        .limit(1)
+
+
+def _lookup_result(kind: str, rows) -> Dict:
+    """Rows of _lookup_query -> {'account': ...} or {'error': reason}"""
+    if not rows:
+        return {'error': NOT_FOUND}
+    if kind == 'email':
+        return {'account': rows[0]}
+    if not rows[0].get('account_id'):
+        return {'error': NOT_LINKED}
+    account = rows[0].get('account')
+    # Quan hệ many-to-one trả về object; phòng trường hợp trả về list
+    if isinstance(account, list):
+        account = account[0] if account else None
+    if account:
+        return {'account': account}
+    return {'error': ACCOUNT_MISSING}
+
+
+def find_login_account(email: str = None, student_id: str = None) -> Dict:
+    """
+    Returns {'account': {id, email, password, user_name}} or {'error': <reason>}
+    (NOT_FOUND, NOT_LINKED, ACCOUNT_MISSING). Supabase errors are raised.
+    """
+    kind, ident = _identifier(email, student_id)
+    reason = _cached_miss(kind, ident)
+    if reason is not None:
+        return {'error': reason}
+
+    response = _lookup_query(supabase, email=email, student_id=student_id).execute()
+    result = _lookup_result(kind, response.data)
+    if 'error' in result:
+        _remember_miss(kind, ident, result['error'])
+    return result
+
+
+async def afind_login_account(email: str = None, student_id: str = None) -> Dict:
+    """Async find_login_account (same query, same negative cache)"""
+    kind, ident = _identifier(email, student_id)
+    reason = await sync_to_async(_cached_miss, thread_sensitive=False)(kind, ident)
+    if reason is not None:
+        return {'error': reason}
+
+    response = await _lookup_query(get_async_supabase_client(), email=email, student_id=student_id).execute()
+    result = _lookup_result(kind, response.data)
+    if 'error' in result:
+        await sync_to_async(_remember_miss, thread_sensitive=False)(kind, ident, result['error'])
+    return result
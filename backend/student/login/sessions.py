@@ -0,0 +1,109 @@
+"""
+Redis-backed registry of active login sessions (device limit)
+
+Each account has, on the django_redis "default" connection:
+    student_sessions:<account_id>        ZSET  member = JWT jti, score = login time (unix time)
+    student_sessions:<account_id>:exp    HASH  jti -> token expiry (unix time)
+
+The ZSET keeps the logins in order, so the device limit evicts the oldest login
+(FIFO) whatever the lifetime of each token (remember_me). Every worker sees the
+same sessions, expired ones are pruned on each login and both keys expire with
+the longest-lived token, so nothing grows without bound. Registering a login
+(prune + evict + add + expire) is one Lua call; checking a token is one ZSCORE
+(the token's own expiry is verified when the JWT is decoded).
+"""
+import time
+from typing import List
+from django.conf import settings
+from django_redis import get_redis_connection
+
+SESSIONS_KEY = 'student_sessions:{account_id}'
+EXPIRIES_KEY = 'student_sessions:{account_id}:exp'
+
+# KEYS[1] = sessions ZSET, KEYS[2] = expiries HASH; ARGV = jti, expires_at, now, max_sessions
+# Drops expired sessions, evicts the oldest logins until the new one fits, then
+# adds it. Returns the evicted jtis.
+ADD_SESSION = """
+local now = tonumber(ARGV[3])
+local expiries = redis.call('HGETALL', KEYS[2])
+for i = 1, #expiries, 2 do
+    if tonumber(expiries[i + 1]) <= now then
+        redis.call('ZREM', KEYS[1], expiries[i])
+        redis.call('HDEL', KEYS[2], expiries[i])
+    end
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+local overflow = redis.call('ZCARD', KEYS[1]) + 1 - tonumber(ARGV[4])
+local evicted = {}
+if overflow > 0 then
+    evicted = redis.call('ZRANGE', KEYS[1], 0, overflow - 1)
+    for _, jti in ipairs(evicted) do
+        redis.call('ZREM', KEYS[1], jti)
+        redis.call('HDEL', KEYS[2], jti)
+    end
+end
+redis.call('ZADD', KEYS[1], now, ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+local last_expiry = tonumber(ARGV[2])
+for _, expiry in ipairs(redis.call('HVALS', KEYS[2])) do
+    last_expiry = math.max(last_expiry, tonumber(expiry))
+end
+redis.call('EXPIREAT', KEYS[1], math.ceil(last_expiry))
+redis.call('EXPIREAT', KEYS[2], math.ceil(last_expiry))
+return evicted
+"""
+
+
+class RedisSessionRegistry:
+    """
+    Quản lý phiên đăng nhập trên Redis, giới hạn MAX_CONCURRENT_SESSIONS thiết bị.
+    Phiên đăng nhập sớm nhất bị loại khi đăng nhập trên thiết bị mới (FIFO).
+    """
+
+    def __init__(self, max_devices: int = None):
+        self.max_devices = max_devices or getattr(settings, 'MAX_CONCURRENT_SESSIONS', 2)
+        self._add_script = None
+
+    @staticmethod
+    def _redis():
+        return get_redis_connection('default')
+
+    def add_session(self, account_id, jti: str, expires_at: float) -> List[str]:
+        """Đăng ký phiên mới (1 round-trip); trả về các JTI bị loại do vượt giới hạn."""
+        redis = self._redis()
+        if self._add_script is None:
+            self._add_script = redis.register_script(ADD_SESSION)
+        evicted = self._add_script(
+            keys=[SESSIONS_KEY.format(account_id=account_id), EXPIRIES_KEY.format(account_id=account_id)],
+            args=[jti, int(expires_at), '%.6f' % time.time(), self.max_devices],
+            client=redis,
+        )
+        return [e.decode() if isinstance(e, bytes) else e for e in evicted]
+
+    def is_session_active(self, account_id, jti: str) -> bool:
+        """JTI còn trong danh sách (1 lệnh ZSCORE; hạn của token đã được kiểm tra khi giải mã JWT)."""
+        if not jti:
+            return False
+        return self._redis().zscore(SESSIONS_KEY.format(account_id=account_id), jti) is not None
+
+    def get_user_sessions(self, account_id) -> List[str]:
+        """Danh sách JTI còn hiệu lực của tài khoản (theo thứ tự đăng nhập)."""
+        redis = self._redis()
+        jtis = redis.zrange(SESSIONS_KEY.format(account_id=account_id), 0, -1)
+        expiries = redis.hgetall(EXPIRIES_KEY.format(account_id=account_id))
+        now = time.time()
+        return [
+            j.decode() if isinstance(j, bytes) else j
+            for j in jtis
+            if float(expiries.get(j) or 0) > now
+        ]
+
+    def remove_session(self, account_id, jti: str) -> None:
+        """Thu hồi 1 phiên (đăng xuất)."""
+        pipe = self._redis().pipeline()
+        pipe.zrem(SESSIONS_KEY.format(account_id=account_id), jti)
+        pipe.hdel(EXPIRIES_KEY.format(account_id=account_id), jti)
+        pipe.execute()
+
+
+session_registry = RedisSessionRegistry()
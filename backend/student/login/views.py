@@ -3,60 +3,36 @@ import os
 import jwt
 import uuid
 from datetime import datetime, timedelta, timezone
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .serializers import LoginSerializer # Giả định LoginSerializer đã được định nghĩa
-from config.supabase_client import get_supabase_client
-from django.contrib.auth.hashers import check_password
+from config.password_pool import check_password, PasswordPoolBusy
+from config.rate_limit import scoped_throttle
+from config.async_views import AsyncAPIView
+from .accounts import afind_login_account, NOT_LINKED, ACCOUNT_MISSING
 
 # Thư viện này dùng để kiểm tra mật khẩu đã hash an toàn
 # from django.contrib.auth.hashers import check_password # Đã loại bỏ vì Supabase API xử lý
-from supabase import create_client, Client # Thêm Supabase Client
 
 # Định nghĩa SECRET_KEY ở đây (hoặc lấy từ biến môi trường)
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "b)-hy#9mu$@)@ahd5z+mp-t-4jsmkdq&gd#-@1+3g&4ss4e%_v")
 
-# --- GIẢ LẬP QUẢN LÝ PHIÊN BẰNG REDIS (STATEFUL) ---
-class RedisSessionManager:
-    """
-    Giả lập Redis/Cache để quản lý phiên và giới hạn thiết bị (MAX_DEVICES=2).
-    Trong môi trường thực tế, hãy thay thế bằng thư viện Redis thật.
-    """
-    def __init__(self):
-        # Giả lập Redis bằng một dictionary: {id: [jti_1, jti_2]}
-        self.sessions = {}
-        self.MAX_DEVICES = 2
-    
-    def get_user_sessions(self, id):
-        """Lấy danh sách JTI (Session ID) của người dùng."""
-        return self.sessions.get(id, [])
-
-    def add_session(self, id, jti):
-        """Thêm session mới và kiểm soát giới hạn 2 thiết bị."""
-        session_list = self.sessions.get(id, [])
-        
-        # 1. Nếu vượt quá giới hạn, loại bỏ session cũ nhất (FIFO)
-        if len(session_list) >= self.MAX_DEVICES:
-            # Bỏ print
-            session_list.pop(0) 
+# --- QUẢN LÝ PHIÊN BẰNG REDIS (giới hạn MAX_CONCURRENT_SESSIONS thiết bị) ---
+# Dùng chung giữa các worker, xem student/login/sessions.py
+from .sessions import session_registry as redis_manager
 
-        # 2. Thêm session mới
-        session_list.append(jti)
-        self.sessions[id] = session_list
-
-    def is_session_active(self, id, jti):
-        """Kiểm tra JTI có còn hoạt động (nằm trong danh sách) hay không."""
-        return jti in self.sessions.get(id, [])
-
-redis_manager = RedisSessionManager()
-# --- KẾT THÚC GIẢ LẬP REDIS ---
-
-class StudentLoginAPIView(APIView):
+class StudentLoginAPIView(AsyncAPIView):
     """
     API xác thực người dùng bằng email/mật khẩu sử dụng Supabase API và phát hành JWT.
+    Async: truy vấn Supabase được await trên event loop; kiểm tra mật khẩu (process pool)
+    và ghi phiên Redis chạy trong worker thread.
     """
-    def post(self, request):
+    # Giới hạn số lần thử theo IP và theo email/mã học viên (settings.RATE_LIMITS)
+    throttle_classes = [scoped_throttle('login')]
+
+    async def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -74,64 +50,24 @@ class StudentLoginAPIView(APIView):
         
         user_data = None
         
-        try:
-            supabase = get_supabase_client()
-        except Exception as e:
-            print(f"Lỗi khởi tạo Supabase Client: {e}")
-            return Response({"error": "Lỗi hệ thống: Không thể khởi tạo dịch vụ xác thực."}, 
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
         # --- 2. XÁC THỰC VỚI SUPABASE API ---
+        # 1 truy vấn duy nhất trên client dùng chung (xem student/login/accounts.py);
+        # định danh không tồn tại được cache ngắn hạn, không chạm tới DB
         try:
-            # Xác định cách đăng nhập: mã học viên hoặc email
-            if student_id:
-                # Đăng nhập bằng mã học viên
-                # 1. Tìm student trong bảng students
-                student_response = supabase.table('students') \
-                    .select('id, account_id') \
-                    .eq('id', student_id) \
-                    .limit(1) \
-                    .execute()
-                
-                student_records = student_response.data
-                
-                if not student_records:
-                    return Response({"error": "Mã học viên hoặc mật khẩu không chính xác."}, 
-                                    status=status.HTTP_401_UNAUTHORIZED)
-                
-                student = student_records[0]
-                account_id = student.get('account_id')
-                
-                if not account_id:
-                    return Response({"error": "Tài khoản chưa được liên kết với học viên này."}, 
-                                    status=status.HTTP_401_UNAUTHORIZED)
-                
-                # 2. Lấy thông tin account từ account_id
-                account_response = supabase.table('account') \
-                    .select('id, email, password, user_name') \
-                    .eq('id', account_id) \
-                    .limit(1) \
-                    .execute()
-                
-                user_records = account_response.data
-                
-                if not user_records:
-                    return Response({"error": "Không tìm thấy tài khoản."}, 
-                                    status=status.HTTP_401_UNAUTHORIZED)
-            else:
-                # Đăng nhập bằng email (logic cũ)
-                response = supabase.table('account') \
-                    .select('id, email, password, user_name') \
-                    .eq('email', email) \
-                    .limit(1) \
-                    .execute()
-                user_records = response.data
-
-                if not user_records:
-                    return Response({"error": "Email hoặc mật khẩu không chính xác."}, 
-                                    status=status.HTTP_401_UNAUTHORIZED)
+            lookup = await afind_login_account(email=email, student_id=student_id)
+            reason = lookup.get('error')
+            if reason == NOT_LINKED:
+                return Response({"error": "Tài khoản chưa được liên kết với học viên này."}, 
+                                status=status.HTTP_401_UNAUTHORIZED)
+            if reason == ACCOUNT_MISSING:
+                return Response({"error": "Không tìm thấy tài khoản."}, 
+                                status=status.HTTP_401_UNAUTHORIZED)
+            if reason:
+                error_msg = "Mã học viên hoặc mật khẩu không chính xác." if student_id else "Email hoặc mật khẩu không chính xác."
+                return Response({"error": error_msg}, 
+                                status=status.HTTP_401_UNAUTHORIZED)
             
-            user = user_records[0]  
+            user = lookup['account']
             stored_password_hash = user.get('password') # Lấy hash từ DB
                 
             # --- 2.1. KIỂM TRA MẬT KHẨU (Sử dụng Django check_password) ---
@@ -142,8 +78,9 @@ class StudentLoginAPIView(APIView):
                                  status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
             # Sử dụng hàm check_password: so sánh mật khẩu thô và hash đã lưu
+            # (chạy trong process pool giới hạn, xem config/password_pool.py)
             # Trả về True nếu khớp, False nếu không khớp
-            if check_password(password, stored_password_hash):
+            if await sync_to_async(check_password, thread_sensitive=False)(password, stored_password_hash):
                 # Xác thực thành công
                 id = user.get('id')
                 user_data = {'id': id, 'email': user.get('email'),'user_name':user.get('user_name')}
@@ -154,6 +91,9 @@ class StudentLoginAPIView(APIView):
                 return Response({"error": error_msg}, 
                                 status=status.HTTP_401_UNAUTHORIZED)
 
+        # Quá nhiều yêu cầu kiểm tra mật khẩu đang chờ -> 503 để client thử lại
+        except PasswordPoolBusy as e:
+            return Response({"error": str(e.detail)}, status=e.status_code, headers={'Retry-After': str(e.wait)})
         # Bắt các lỗi API (mạng, cấu hình...)
         except Exception as e:
             # Supabase thường ném lỗi nếu email/mật khẩu sai hoặc người dùng không tồn tại
@@ -199,7 +139,14 @@ class StudentLoginAPIView(APIView):
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         # Thêm Session ID (JTI) vào Redis để kiểm soát giới hạn 2 thiết bị
-        redis_manager.add_session(user_data['id'], jti)
+        try:
+            await sync_to_async(redis_manager.add_session, thread_sensitive=False)(
+                user_data['id'], jti, access_token_expires.timestamp()
+            )
+        except Exception as e:
+            print(f"Lỗi lưu phiên vào Redis: {e}")
+            return Response({"error": "Lỗi hệ thống: Không thể tạo phiên đăng nhập."}, 
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         return Response({
             "message": "Đăng nhập thành công!",
@@ -0,0 +1,49 @@
+"""
+Build the student_practice_summary rollup from existing exam results
+
+Usage:
+    python manage.py backfill_practice_summary                     # every student
+    python manage.py backfill_practice_summary --student-id ST1 --student-id ST2 --check
+
+Calls rebuild_practice_summary (sql/student_practice_summary.sql), which
+recomputes the rollup rows from exam_result_sections in one transaction.
+Run it once after applying the SQL, before switching PRACTICE_SUMMARY_BACKEND
+to 'rollup', and again whenever the rollup may have drifted (a failed update
+is only logged by the submission paths). --check compares the dashboard
+summary computed both ways for the given students.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from config.supabase_client import get_supabase_client
+from student.management.commands.compare_practice_summary import practice_summary_with
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-student practice summary rollup from exam_result_sections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student-id', action='append', dest='student_ids',
+                            help='Only rebuild this student (repeatable); default: every student')
+        parser.add_argument('--check', action='store_true',
+                            help='Compare the rollup summary with the one computed from every row')
+
+    def handle(self, *args, **options):
+        student_ids = options['student_ids'] or [None]
+        client = get_supabase_client()
+
+        for student_id in student_ids:
+            response = client.rpc('rebuild_practice_summary', {'p_student_id': student_id}).execute()
+            self.stdout.write(f"{student_id or 'all students'}: {response.data} rollup row(s) written")
+
+        if not options['check']:
+            return
+        if student_ids == [None]:
+            raise CommandError('--check needs --student-id')
+
+        mismatches = [
+            student_id for student_id in student_ids
+            if practice_summary_with(student_id, 'rows') != practice_summary_with(student_id, 'rollup')
+        ]
+        if mismatches:
+            raise CommandError(f"Rollup differs from exam_result_sections for: {', '.join(mismatches)}")
+        self.stdout.write(self.style.SUCCESS('Rollup matches the summary computed from exam_result_sections'))
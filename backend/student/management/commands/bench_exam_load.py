@@ -0,0 +1,93 @@
+"""
+Benchmark the cold (uncached) exam load against a local PostgREST stand-in
+
+Usage:
+    python manage.py bench_exam_load --latency-ms 30 --iterations 20
+
+Modes compared:
+    sequential  batch PostgREST queries, one after another
+    parallel    batch PostgREST queries, independent ones fanned out
+    rpc         one get_full_exam_json RPC call (sql/get_full_exam_json.sql)
+"""
+import os
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from student.management.postgrest_stub import PostgrestStub, build_exam_fixture, compile_exam_json
+
+BENCH_EXAM_ID = 'EXAM_BENCH'
+
+MODES = (
+    ('sequential', {'EXAM_DATA_BACKEND': 'postgrest', 'SUPABASE_PARALLEL_QUERIES': False}),
+    ('parallel', {'EXAM_DATA_BACKEND': 'postgrest', 'SUPABASE_PARALLEL_QUERIES': True}),
+    ('rpc', {'EXAM_DATA_BACKEND': 'rpc', 'SUPABASE_PARALLEL_QUERIES': True}),
+)
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    p95_index = max(int(round(len(samples) * 0.95)) - 1, 0)
+    return {
+        'mean': statistics.mean(samples),
+        'p50': statistics.median(samples),
+        'p95': samples[p95_index],
+    }
+
+
+def point_services_at(stub: PostgrestStub):
+    """Build a Supabase client for the stub and hand it to the services under test"""
+    os.environ['SUPABASE_URL'] = stub.url
+    os.environ['SUPABASE_SECRET_KEY'] = 'bench.bench.bench'
+    from config.supabase_client import get_supabase_client
+    from student.exam import services as exam_services
+    exam_services.supabase = get_supabase_client()
+    return exam_services
+
+
+class Command(BaseCommand):
+    help = 'Measure get_full_exam_data cold-path latency: sequential, parallel and RPC loaders'
+    # The URL conf imports the services, which must not build a real Supabase client
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency-ms', type=float, default=30.0, help='Injected latency per PostgREST call')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--sections', type=int, default=3)
+        parser.add_argument('--question-types', type=int, default=5)
+        parser.add_argument('--questions', type=int, default=6)
+
+    def handle(self, *args, **options):
+        tables = build_exam_fixture(
+            BENCH_EXAM_ID,
+            sections=options['sections'],
+            question_types=options['question_types'],
+            questions=options['questions'],
+        )
+        rpc = {'get_full_exam_json': lambda body: compile_exam_json(tables, body['p_exam_id'])}
+        with PostgrestStub(tables, latency_ms=options['latency_ms'], rpc=rpc) as stub:
+            exam_services = point_services_at(stub)
+            self.stdout.write(
+                f"PostgREST stand-in at {stub.url}, {options['latency_ms']:.0f} ms per call, "
+                f"{len(tables['jlpt_questions'])} questions"
+            )
+            for label, overrides in MODES:
+                with override_settings(**overrides):
+                    # Warm-up call opens the connection and fills the thread pool
+                    exam_services.ExamService._build_full_exam_data(BENCH_EXAM_ID)
+                    requests_before = stub.request_count
+                    samples = []
+                    for _ in range(options['iterations']):
+                        started = time.perf_counter()
+                        result = exam_services.ExamService._build_full_exam_data(BENCH_EXAM_ID)
+                        samples.append((time.perf_counter() - started) * 1000)
+                        if not result['success']:
+                            self.stderr.write(f"{label}: load failed: {result['error']}")
+                            return
+                    calls = (stub.request_count - requests_before) / options['iterations']
+                stats = summarize(samples)
+                self.stdout.write(
+                    f"{label:<11} mean {stats['mean']:7.1f} ms   p50 {stats['p50']:7.1f} ms   "
+                    f"p95 {stats['p95']:7.1f} ms   {calls:.0f} PostgREST calls/load"
+                )
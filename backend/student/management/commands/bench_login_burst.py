@@ -0,0 +1,150 @@
+"""
+Measure how a login burst affects unrelated endpoints
+
+Usage:
+    python manage.py bench_login_burst --logins 40 --concurrency 20
+
+Serves the Django app on a local threaded WSGI server (one thread per request,
+like gunicorn gthread). Supabase is replaced by the PostgREST stand-in. The
+command probes a cheap endpoint (exam levels) at a fixed interval, first while
+the server is idle and then during a burst of student logins whose accounts hold
+real Argon2 hashes. It reports probe p50/p99 plus the login outcome for each mode:
+    inline   password verified on the request thread (PASSWORD_HASH_POOL = False)
+    pool     bounded, niced process pool (config/password_pool.py)
+"""
+import contextlib
+import io
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from student.management.postgrest_stub import PostgrestStub, build_exam_fixture
+from student.management.commands.bench_exam_load import point_services_at
+
+PROBE_PATH = '/api/v1/student/exam/levels/'
+LOGIN_PATH = '/api/v1/student/login/userlogin/'
+PASSWORD = 'bench-password'
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    index = max(int(round(len(samples) * pct / 100.0)) - 1, 0)
+    return samples[index]
+
+
+def _request(url, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            response.read()
+            code = response.status
+    except urllib.error.HTTPError as e:
+        code = e.code
+    return (time.perf_counter() - started) * 1000, code
+
+
+class Command(BaseCommand):
+    help = 'p50/p99 of a cheap endpoint during a login burst: inline vs pooled password verification'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=40, help='Logins in the burst')
+        parser.add_argument('--concurrency', type=int, default=20, help='Concurrent login clients')
+        parser.add_argument('--probe-interval-ms', type=float, default=20.0)
+        parser.add_argument('--baseline-probes', type=int, default=50)
+        parser.add_argument('--latency-ms', type=float, default=2.0, help='Injected PostgREST latency')
+
+    def handle(self, *args, **options):
+        tables = build_exam_fixture('EXAM_BENCH', sections=1, question_types=1, questions=1)
+        # Real Argon2 hashes: verification cost is what is being measured
+        password_hash = make_password(PASSWORD)
+        tables['account'] = [
+            {'id': f'bench{i}', 'email': f'bench{i}@example.com', 'password': password_hash, 'user_name': f'bench{i}'}
+            for i in range(options['logins'])
+        ]
+
+        with PostgrestStub(tables, latency_ms=options['latency_ms']) as stub, \
+                override_settings(ALLOWED_HOSTS=['*'], STUDENT_SESSION_CHECK=False):
+            exam_services = point_services_at(stub)
+            from student.login import accounts
+            accounts.supabase = exam_services.supabase
+            from django.core.wsgi import get_wsgi_application
+            server = make_server('127.0.0.1', 0, get_wsgi_application(),
+                                 server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            self.stdout.write(f"App at {base_url}, {options['logins']} logins, {options['concurrency']} concurrent clients")
+
+            try:
+                for label, pool_enabled in (('inline', False), ('pool', True)):
+                    with override_settings(PASSWORD_HASH_POOL=pool_enabled):
+                        self._run_mode(label, base_url, options)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def _run_mode(self, label, base_url, options):
+        interval = options['probe_interval_ms'] / 1000.0
+        # Warm-up: opens connections and starts the pool processes
+        _request(base_url + PROBE_PATH)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _request(base_url + LOGIN_PATH, {'email': 'bench0@example.com', 'password': PASSWORD})
+
+        baseline = []
+        for _ in range(options['baseline_probes']):
+            baseline.append(_request(base_url + PROBE_PATH)[0])
+            time.sleep(interval)
+
+        burst_done = threading.Event()
+        during = []
+
+        def probe():
+            while not burst_done.is_set():
+                during.append(_request(base_url + PROBE_PATH)[0])
+                time.sleep(interval)
+
+        def login(i):
+            return _request(base_url + LOGIN_PATH, {'email': f'bench{i}@example.com', 'password': PASSWORD})
+
+        prober = threading.Thread(target=probe, daemon=True)
+        # The login view prints debug lines for every attempt
+        with contextlib.redirect_stdout(io.StringIO()):
+            prober.start()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as clients:
+                logins = list(clients.map(login, range(options['logins'])))
+            burst_seconds = time.perf_counter() - started
+            burst_done.set()
+            prober.join()
+
+        codes = {}
+        for _, code in logins:
+            codes[code] = codes.get(code, 0) + 1
+        login_ms = [ms for ms, code in logins if code == 200] or [0.0]
+        self.stdout.write(
+            f"{label:<7} probe idle p50 {statistics.median(baseline):6.1f} ms  p99 {percentile(baseline, 99):6.1f} ms | "
+            f"during burst p50 {statistics.median(during):6.1f} ms  p99 {percentile(during, 99):7.1f} ms "
+            f"({len(during)} probes) | burst {burst_seconds:5.1f} s, login p50 {statistics.median(login_ms):7.1f} ms, "
+            f"status {dict(sorted(codes.items()))}"
+        )
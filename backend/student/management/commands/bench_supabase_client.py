@@ -0,0 +1,81 @@
+"""
+Benchmark Supabase client reuse against a local PostgREST stand-in
+
+Usage:
+    python manage.py bench_supabase_client --threads 8 --requests 50 --connect-latency-ms 20
+
+Each "request" is what a view does: get a client, run one small query. Worker
+threads play the role of gunicorn gthread threads. Modes compared:
+    per-request  create_client() for every request (new httpx client + connection)
+    pooled       get_supabase_client(): the thread's keep-alive client (config/supabase_client.py)
+
+--connect-latency-ms delays every new connection on the stub to stand in for the
+TCP + TLS handshake to Supabase, which the local plain-HTTP stub does not have.
+"""
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from supabase import create_client
+
+from config.supabase_client import client_manager, get_supabase_client
+from student.management.postgrest_stub import PostgrestStub, build_exam_fixture
+from student.management.commands.bench_exam_load import BENCH_EXAM_ID, summarize
+
+
+class Command(BaseCommand):
+    help = 'Per-request latency of a Supabase query: new client per request vs pooled keep-alive client'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent request threads')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per thread')
+        parser.add_argument('--latency-ms', type=float, default=5.0, help='Injected latency per PostgREST call')
+        parser.add_argument('--connect-latency-ms', type=float, default=20.0,
+                            help='Injected latency per new connection (handshake stand-in)')
+
+    def handle(self, *args, **options):
+        tables = build_exam_fixture(BENCH_EXAM_ID, sections=1, question_types=1, questions=1)
+        with PostgrestStub(tables, latency_ms=options['latency_ms'],
+                           connect_latency_ms=options['connect_latency_ms']) as stub:
+            os.environ['SUPABASE_URL'] = stub.url
+            os.environ['SUPABASE_SECRET_KEY'] = 'bench.bench.bench'
+            self.stdout.write(
+                f"PostgREST stub at {stub.url}: {options['latency_ms']} ms per call, "
+                f"{options['connect_latency_ms']} ms per new connection, "
+                f"{options['threads']} threads x {options['requests']} requests"
+            )
+
+            def per_request():
+                return create_client(stub.url, 'bench.bench.bench')
+
+            results = {}
+            for label, get_client in (('per-request', per_request), ('pooled', get_supabase_client)):
+                client_manager.close_all()
+                connections_before = stub.connection_count
+                samples, wall = self._run(get_client, options)
+                results[label] = summarize(samples)
+                self.stdout.write(
+                    f"{label:<12} mean {results[label]['mean']:7.2f} ms  p50 {results[label]['p50']:7.2f} ms  "
+                    f"p95 {results[label]['p95']:7.2f} ms | {len(samples) / wall:7.1f} req/s | "
+                    f"{stub.connection_count - connections_before} connections"
+                )
+            client_manager.close_all()
+
+        saved = results['per-request']['mean'] - results['pooled']['mean']
+        self.stdout.write(self.style.SUCCESS(f"Pooled client saves {saved:.2f} ms per request on average"))
+
+    def _run(self, get_client, options):
+        def worker(_):
+            timings = []
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                get_client().table('exams').select('id, title').eq('id', BENCH_EXAM_ID).limit(1).execute()
+                timings.append((time.perf_counter() - started) * 1000)
+            return timings
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            samples = [ms for timings in pool.map(worker, range(options['threads'])) for ms in timings]
+        return samples, time.perf_counter() - started
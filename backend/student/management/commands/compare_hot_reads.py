@@ -0,0 +1,128 @@
+"""
+Compare the direct Postgres read path with the Supabase (PostgREST) one
+
+Usage:
+    python manage.py compare_hot_reads --exam-id <exam id> --student-id <student id> --iterations 10
+
+Runs every hot read of student/common/read_repository.py both ways against the
+configured Supabase project (SUPABASE_URL) and database (DATABASES['default']),
+checks that both return the same data and prints the mean latency of each.
+Caches are not involved: the loaders below are the cache-miss paths.
+"""
+import asyncio
+import importlib
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from config.postgres import pg_pool
+from config.supabase_client import get_supabase_client
+from student.common.read_repository import PostgresReadRepository
+from student.dashboard.services import DashboardService
+from student.exam.answer_key import AnswerKey, compile_answer_key
+from student.exam.services import ExamService
+from student.management.commands.bench_exam_load import summarize
+
+# Thư mục 'exam-results' có dấu '-' nên không import trực tiếp được
+ResultService = importlib.import_module('student.exam-results.services').ResultService
+
+
+def _normalized(value):
+    return json.loads(json.dumps(value, sort_keys=True, default=str))
+
+
+def _answer_key_summary(answer_key: AnswerKey):
+    """Order-independent content of an answer key (rows with equal 'position' may come back in any order)"""
+    return _normalized({
+        'sections': answer_key.section_names(),
+        'questions': answer_key.question_details(),
+        'correct': {q_id: answer_key.correct_answers(q_id) for q_id in answer_key.question_ids},
+        'partial': {q_id: answer_key.partial_credit_answer(q_id) for q_id in answer_key.question_ids},
+        'points': {a_id: answer_key.answer_points_for(a_id) for a_id in answer_key.answer_ids},
+    })
+
+
+def _practice_rows_supabase(student_id: str):
+    with override_settings(HOT_READ_BACKEND='supabase'):
+        return asyncio.run(DashboardService._get_practice_rows(student_id)) or []
+
+
+def _sorted_rows(rows):
+    return sorted(_normalized(rows), key=lambda row: json.dumps(row, sort_keys=True))
+
+
+class Command(BaseCommand):
+    help = 'Check result parity and latency of the direct Postgres hot reads against PostgREST'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam-id', required=True)
+        parser.add_argument('--student-id', help='Student with some exam results (history / dashboard reads)')
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        exam_id = options['exam_id']
+        student_id = options['student_id']
+
+        # (name, supabase loader, postgres loader, normalizer)
+        reads = [
+            ('full exam',
+             lambda: ExamService._build_full_exam_data_batch(exam_id),
+             lambda: ExamService._build_full_exam_data_postgres(exam_id),
+             _normalized),
+            ('answer key',
+             lambda: self._compile_answer_key(exam_id, 'supabase'),
+             lambda: self._compile_answer_key(exam_id, 'postgres'),
+             _answer_key_summary),
+        ]
+        if student_id:
+            # Trang đầu của lịch sử và trang sau dòng cuối của nó (keyset (datetime, id))
+            limit, _ = ResultService.parse_history_page(None, None)
+            first_page = PostgresReadRepository.exam_history(student_id, limit)[:limit]
+            after = (first_page[-1]['datetime'], first_page[-1]['id']) if first_page else None
+            reads += [
+                ('exam history',
+                 lambda: ResultService._history_query(get_supabase_client(), student_id, limit).execute().data,
+                 lambda: PostgresReadRepository.exam_history(student_id, limit),
+                 _normalized),
+                ('history p2',
+                 lambda: ResultService._history_query(get_supabase_client(), student_id, limit, after).execute().data,
+                 lambda: PostgresReadRepository.exam_history(student_id, limit, after),
+                 _normalized),
+                ('practice rows',
+                 lambda: _practice_rows_supabase(student_id),
+                 lambda: PostgresReadRepository.practice_rows(student_id),
+                 _sorted_rows),
+            ]
+
+        mismatches = 0
+        try:
+            for name, supabase_read, postgres_read, normalize in reads:
+                same = normalize(supabase_read()) == normalize(postgres_read())
+                mismatches += not same
+                supabase_stats = summarize(self._time(supabase_read, options['iterations']))
+                postgres_stats = summarize(self._time(postgres_read, options['iterations']))
+                self.stdout.write(
+                    f"{name:<14} {'same' if same else 'DIFFERENT':<9} "
+                    f"supabase mean {supabase_stats['mean']:8.2f} ms | postgres mean {postgres_stats['mean']:8.2f} ms"
+                )
+        finally:
+            pg_pool.close_all()
+
+        if mismatches:
+            raise CommandError(f"{mismatches} read(s) returned different data")
+        self.stdout.write(self.style.SUCCESS('Direct Postgres reads match the Supabase results'))
+
+    @staticmethod
+    def _compile_answer_key(exam_id: str, backend: str) -> AnswerKey:
+        with override_settings(HOT_READ_BACKEND=backend):
+            return compile_answer_key(exam_id, 0)
+
+    @staticmethod
+    def _time(read, iterations: int):
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            read()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
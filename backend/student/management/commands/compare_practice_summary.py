@@ -0,0 +1,65 @@
+"""
+Parity check of the dashboard practice averages across PRACTICE_SUMMARY_BACKEND values
+
+Usage:
+    python manage.py compare_practice_summary --student-id ST1 --student-id ST2 --backends sql rollup
+
+For each student, computes DashboardService._get_practice_summary with the
+Python loop over every exam_result_sections row ('rows', the reference) and
+with each backend given, checks they return the same summary and prints the
+mean latency of each. Needs sql/practice_summary_by_section.sql ('sql') and
+sql/student_practice_summary.sql + backfill_practice_summary ('rollup').
+"""
+import asyncio
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from student.dashboard.services import DashboardService
+from student.management.commands.bench_exam_load import summarize
+
+
+def practice_summary_with(student_id: str, backend: str):
+    """Dashboard summary of a student with `backend`, sections sorted (row order differs between backends)"""
+    with override_settings(PRACTICE_SUMMARY_BACKEND=backend):
+        summary = asyncio.run(DashboardService._get_practice_summary(student_id))
+    for level in summary.values():
+        level['sections'] = sorted(level['sections'], key=lambda section: section['title'])
+    return summary
+
+
+class Command(BaseCommand):
+    help = 'Check that the SQL / rollup practice averages match the Python computation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student-id', action='append', dest='student_ids', required=True,
+                            help='Student to compare (repeatable)')
+        parser.add_argument('--backends', nargs='+', choices=['sql', 'rollup'], default=['sql'])
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        mismatches = 0
+        for student_id in options['student_ids']:
+            expected = practice_summary_with(student_id, 'rows')
+            timings = {'rows': self._time(student_id, 'rows', options['iterations'])}
+            for backend in options['backends']:
+                same = practice_summary_with(student_id, backend) == expected
+                mismatches += not same
+                timings[backend] = self._time(student_id, backend, options['iterations'])
+                self.stdout.write(f"{student_id:<12} {backend:<7} {'same' if same else 'DIFFERENT'}")
+            self.stdout.write(f"{student_id:<12} mean " + ' | '.join(
+                f"{backend} {summarize(samples)['mean']:8.2f} ms" for backend, samples in timings.items()
+            ))
+
+        if mismatches:
+            raise CommandError(f"{mismatches} summary(ies) differ from the Python computation")
+        self.stdout.write(self.style.SUCCESS('Practice averages match the Python computation'))
+
+    @staticmethod
+    def _time(student_id: str, backend: str, iterations: int):
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            practice_summary_with(student_id, backend)
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
@@ -0,0 +1,47 @@
+"""
+Worker that persists queued exam submissions (EXAM_SUBMIT_ASYNC = True)
+
+Usage:
+    python manage.py run_submission_worker [--name worker-1]
+
+The name defaults to <hostname>-<pid>, unique per process, so workers can be
+scaled freely. On start a worker requeues the jobs of workers that stopped
+heartbeating (SUBMISSION_WORKER_HEARTBEAT_TTL), so a crash or redeploy never
+loses a submission; requeued jobs run as retries.
+"""
+import signal
+from django.core.management.base import BaseCommand
+
+from student.exam.services import ExamService, SUBMISSION_DETAILS_JOB
+from student.exam.submission_queue import SubmissionWorker
+
+
+class Command(BaseCommand):
+    help = 'Drain the Redis submission queue (save_answers, exam_result_sections, certificates)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--name', default=None,
+                            help='Worker name, must be unique per running process (default: <hostname>-<pid>)')
+        parser.add_argument('--poll-timeout', type=int, default=5, help='Seconds to block waiting for a job')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after this many jobs')
+
+    def handle(self, *args, **options):
+        worker = SubmissionWorker(
+            handlers={SUBMISSION_DETAILS_JOB: ExamService.persist_submission_details},
+            name=options['name'],
+            poll_timeout=options['poll_timeout'],
+        )
+
+        def stop(signum, frame):
+            # Finish the current job, then leave the loop
+            worker.running = False
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        recovered = worker.recover()
+        if recovered:
+            self.stdout.write(f"Requeued {recovered} unfinished job(s)")
+        self.stdout.write(f"Submission worker '{worker.name}' started")
+        worker.run(max_jobs=options['max_jobs'])
+        self.stdout.write('Submission worker stopped')
@@ -0,0 +1,314 @@
+"""
+Local PostgREST stand-in used by the benchmark management commands
+
+Serves an in-memory dataset over the subset of the PostgREST HTTP API that the
+services use (eq / in / is filters, order, limit, single-object responses,
+upserts and RPC calls), and sleeps for a fixed latency before every response to simulate
+the network round-trip to Supabase.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+SINGLE_OBJECT_MEDIA_TYPE = 'application/vnd.pgrst.object+json'
+
+
+def _parse_in_list(raw: str) -> List[str]:
+    values = []
+    for item in raw.strip('()').split(','):
+        values.append(item.strip().strip('"'))
+    return values
+
+
+def _split_select(select: str) -> List[str]:
+    """Split a select list on top-level commas (embedded resources keep their parentheses)"""
+    parts, depth, current = [], 0, ''
+    for char in select:
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _project(row: Dict, select: str) -> Dict:
+    """Keep the selected columns; embedded resources are served from pre-joined keys"""
+    columns = [' '.join(part.split()) for part in _split_select(select)]
+    if '*' in columns:
+        return row
+    projected = {}
+    for column in columns:
+        name = column.split('(')[0].split(':')[0].split('!')[0].strip()
+        if name in row:
+            projected[name] = row[name]
+    return projected
+
+
+def _matches(row: Dict, column: str, expression: str) -> bool:
+    operator, _, value = expression.partition('.')
+    cell = row.get(column)
+    if operator == 'eq':
+        return str(cell).lower() == value.lower() if isinstance(cell, bool) else str(cell) == value
+    if operator == 'neq':
+        return str(cell) != value
+    if operator == 'in':
+        return str(cell) in _parse_in_list(value)
+    if operator == 'is':
+        return cell is None if value == 'null' else str(cell).lower() == value
+    if operator in ('lt', 'lte', 'gt', 'gte'):
+        if cell is None:
+            return False
+        left, right = str(cell), value
+        return {
+            'lt': left < right, 'lte': left <= right,
+            'gt': left > right, 'gte': left >= right,
+        }[operator]
+    # Unsupported operators behave as "no filter"
+    return True
+
+
+class PostgrestStub:
+    """
+    In-memory PostgREST server.
+
+    `tables` maps a table name to its rows; `rpc` maps a function name to a
+    callable receiving the JSON body. `connection_count` counts accepted
+    connections, each delayed by `connect_latency_ms`. Use as a context manager
+    to serve on a free local port for the duration of a benchmark.
+    """
+
+    def __init__(self, tables: Dict[str, List[Dict]], latency_ms: float = 20.0,
+                 rpc: Optional[Dict[str, Callable[[Dict], object]]] = None,
+                 connect_latency_ms: float = 0.0):
+        self.tables = tables
+        self.latency = latency_ms / 1000.0
+        # Extra delay on every new connection (stands in for the TCP + TLS handshake)
+        self.connect_latency = connect_latency_ms / 1000.0
+        self.rpc = rpc or {}
+        self.request_count = 0
+        self.connection_count = 0
+        self._count_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> 'PostgrestStub':
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with stub._count_lock:
+                    stub.connection_count += 1
+                time.sleep(stub.connect_latency)
+
+            def do_GET(self):
+                stub._handle(self, 'GET')
+
+            def do_HEAD(self):
+                stub._handle(self, 'HEAD')
+
+            def do_POST(self):
+                stub._handle(self, 'POST')
+
+            def do_PATCH(self):
+                stub._handle(self, 'PATCH')
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        with self._count_lock:
+            self.request_count += 1
+        time.sleep(self.latency)
+
+        parts = urlsplit(handler.path)
+        path = parts.path.rstrip('/')
+        body = b''
+        length = int(handler.headers.get('Content-Length') or 0)
+        if length:
+            body = handler.rfile.read(length)
+
+        if '/rpc/' in path:
+            name = path.rsplit('/', 1)[-1]
+            func = self.rpc.get(name)
+            if func is None:
+                return self._send(handler, 404, {'message': f'function {name} not found'})
+            return self._send(handler, 200, func(json.loads(body or b'{}')))
+
+        table = path.rsplit('/', 1)[-1]
+        rows = list(self.tables.get(table, []))
+        if method in ('POST', 'PATCH'):
+            payload = json.loads(body or b'[]')
+            payload = payload if isinstance(payload, list) else [payload]
+            if method == 'POST':
+                # Upsert: ?on_conflict=col1,col2 merges into the row with the same key
+                conflict = dict(parse_qsl(parts.query)).get('on_conflict')
+                conflict_columns = conflict.split(',') if conflict else []
+                with self._count_lock:
+                    rows = self.tables.setdefault(table, [])
+                    for row in payload:
+                        existing = next((r for r in rows if conflict_columns and all(
+                            r.get(c) == row.get(c) for c in conflict_columns)), None)
+                        if existing is not None:
+                            existing.update(row)
+                            continue
+                        row.setdefault('id', len(rows) + 1)
+                        rows.append(row)
+            return self._send(handler, 201 if method == 'POST' else 200, payload)
+
+        order, limit, select = None, None, '*'
+        for key, value in parse_qsl(parts.query, keep_blank_values=True):
+            if key == 'select':
+                select = value
+            elif key == 'order':
+                order = value
+            elif key == 'limit':
+                limit = int(value)
+            elif key == 'offset':
+                rows = rows[int(value):]
+            elif '.' not in key:
+                rows = [row for row in rows if _matches(row, key, value)]
+
+        if order:
+            column, _, direction = order.split(',')[0].partition('.')
+            rows.sort(key=lambda row: (row.get(column) is None, str(row.get(column))),
+                      reverse=direction.startswith('desc'))
+        if limit is not None:
+            rows = rows[:limit]
+        rows = [_project(row, select) for row in rows]
+
+        if SINGLE_OBJECT_MEDIA_TYPE in (handler.headers.get('Accept') or ''):
+            if len(rows) != 1:
+                return self._send(handler, 406, {
+                    'code': 'PGRST116',
+                    'message': 'JSON object requested, multiple (or no) rows returned',
+                })
+            return self._send(handler, 200, rows[0])
+        self._send(handler, 200, rows, head=(method == 'HEAD'))
+
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status_code: int, payload, head: bool = False) -> None:
+        data = json.dumps(payload).encode('utf-8')
+        handler.send_response(status_code)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(0 if head else len(data)))
+        if isinstance(payload, list):
+            handler.send_header('Content-Range', f"0-{max(len(payload) - 1, 0)}/{len(payload)}")
+        handler.end_headers()
+        if not head:
+            handler.wfile.write(data)
+
+
+def build_exam_fixture(exam_id: str = 'EXAM_BENCH', sections: int = 3, question_types: int = 5,
+                       questions: int = 6, answers: int = 4) -> Dict[str, List[Dict]]:
+    """Synthetic JLPT exam shaped like the Supabase tables the services read"""
+    level = {'id': 'N1', 'title': 'N1', 'description': 'Benchmark level', 'deleted_at': None}
+    tables = {
+        'levels': [level],
+        'jlpt_exams': [{
+            'id': exam_id, 'level_id': level['id'], 'title': 'Benchmark exam', 'type': 'JLPT',
+            'total_duration': 170, 'request_score': 100, 'version': '1', 'deleted_at': None,
+            'created_at': '2025-01-01T00:00:00+00:00',
+            'level': {'id': level['id'], 'title': level['title'], 'description': level['description']},
+        }],
+        'jlpt_exam_sections': [],
+        'jlpt_question_types': [],
+        'jlpt_question_passages': [],
+        'jlpt_questions': [],
+        'jlpt_answers': [],
+    }
+    for s in range(sections):
+        section_id = f"{exam_id}_S{s}"
+        tables['jlpt_exam_sections'].append({
+            'id': section_id, 'exam_id': exam_id, 'type': f'Section {s}', 'vietsub': f'Phần {s}',
+            'duration': 30, 'position': s, 'is_listening': s == sections - 1, 'deleted_at': None,
+        })
+        for t in range(question_types):
+            qt_id = f"{section_id}_QT{t}"
+            tables['jlpt_question_types'].append({
+                'id': qt_id, 'exam_section_id': section_id, 'question_guides_id': 'G1',
+                'task_instructions': 'Choose the best answer.', 'image_path': None,
+                'is_Sort_Question': t == 0, 'question_guides': {'id': 'G1', 'name': 'Guide'},
+            })
+            passage_id = f"{qt_id}_P0"
+            tables['jlpt_question_passages'].append({
+                'id': passage_id, 'question_type_id': qt_id,
+                'content': '日本語の文章です。' * 40, 'underline_text': None,
+            })
+            for q in range(questions):
+                question_id = f"{qt_id}_Q{q}"
+                tables['jlpt_questions'].append({
+                    'id': question_id, 'exam_section_id': section_id, 'question_type_id': qt_id,
+                    'question_passages_id': passage_id, 'score': 1, 'position': q,
+                    'question_text': '問題文' * 10, 'explaination': None, 'underline_text': None,
+                    'deleted_at': None,
+                })
+                for a in range(answers):
+                    tables['jlpt_answers'].append({
+                        'id': f"{question_id}_A{a}", 'question_id': question_id,
+                        'answer_text': f'選択肢 {a}', 'show_order': a, 'points': 1,
+                        'position': None, 'is_correct': a == 0, 'deleted_at': None,
+                    })
+    return tables
+
+
+def compile_exam_json(tables: Dict[str, List[Dict]], exam_id: str) -> Optional[Dict]:
+    """
+    In-memory equivalent of sql/get_full_exam_json.sql, served by the stub as
+    the get_full_exam_json RPC so the benchmark can compare both backends.
+    """
+    exam = next((e for e in tables['jlpt_exams'] if e['id'] == exam_id), None)
+    if exam is None:
+        return None
+    sections = sorted((s for s in tables['jlpt_exam_sections'] if s['exam_id'] == exam_id),
+                      key=lambda s: s['position'])
+    passage_fields = ('id', 'question_type_id', 'content', 'underline_text')
+    passages_by_id = {p['id']: {k: p[k] for k in passage_fields} for p in tables['jlpt_question_passages']}
+
+    compiled_sections = []
+    for section in sections:
+        question_types = []
+        for qt in sorted((q for q in tables['jlpt_question_types'] if q['exam_section_id'] == section['id']),
+                         key=lambda q: q['id']):
+            questions = []
+            for question in sorted((q for q in tables['jlpt_questions']
+                                    if q['question_type_id'] == qt['id'] and q['deleted_at'] is None),
+                                   key=lambda q: q['position']):
+                passage = passages_by_id.get(question['question_passages_id'])
+                answers = sorted((a for a in tables['jlpt_answers']
+                                  if a['question_id'] == question['id'] and a['deleted_at'] is None),
+                                 key=lambda a: a['show_order'])
+                questions.append(dict(question, jlpt_question_passages=[passage] if passage else None,
+                                      answers=answers))
+            passages = [p for p in passages_by_id.values() if p['question_type_id'] == qt['id']]
+            question_types.append(dict(qt, passages=passages, questions=questions))
+        compiled_sections.append(dict(section, question_types=question_types))
+
+    durations = [{k: s[k] for k in ('id', 'duration', 'position', 'is_listening', 'type')} for s in sections]
+    return {'exam': dict(exam, sections=durations), 'sections': compiled_sections}
@@ -4,15 +4,13 @@ from datetime import datetime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from config.supabase_client import get_supabase_client
+from config.supabase_client import supabase # Client keep-alive của từng thread
+from student.login.accounts import forget_unknown_login
 from .utils import generate_random_code, generate_four_codes, send_verification_email, hash_password
 import json
 import time
 import pytz
 
-# Khởi tạo Supabase client
-supabase = get_supabase_client()
-
 # Tên bảng và cấu hình
 ACCOUNT_TABLE = 'account'
 TEMP_VERIFICATION_TABLE = 'temp_registration' # Bảng TẠM để lưu dữ liệu form và mã code
@@ -156,6 +154,8 @@ class VerifyAndRegisterView(APIView):
 
             if not response_account.data:
                 raise Exception("Không thể tạo tài khoản Supabase. Lỗi DB.")
+            # Email vừa được đăng ký có thể đang nằm trong cache "không tồn tại" của login
+            forget_unknown_login(email=new_account_data['email'])
                 
             # 6. XÓA BẢN GHI TẠM THỜI
             supabase.table(TEMP_VERIFICATION_TABLE).delete().eq('email', email).execute()
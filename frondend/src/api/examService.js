@@ -107,4 +107,48 @@ export const submitListeningExam = async (examId, submissionData) => {
     method: 'POST',
     body: JSON.stringify(submissionData),
   });
-};
\ No newline at end of file
+};
+/**
+ * Lưu tạm câu trả lời lên server (chỉ gửi các câu vừa thay đổi)
+ * @param {string} examId - ID của bài thi
+ * @param {object} autosaveData - { part: 'full' | 'listening', answers: [...], cleared_questions: [...] }
+ */
+export const autosaveAnswers = async (examId, autosaveData) => {
+  return apiRequest(`${EXAM_BASE_ENDPOINT}/exams/${examId}/autosave/`, {
+    method: 'PUT',
+    body: JSON.stringify(autosaveData),
+  });
+};
+
+/**
+ * Lấy câu trả lời đã lưu tạm (khôi phục khi tải lại trang)
+ * @param {string} examId - ID của bài thi
+ * @param {string} part - 'full' | 'listening'
+ */
+export const getAutosavedAnswers = async (examId, part = 'full') => {
+  return apiRequest(`${EXAM_BASE_ENDPOINT}/exams/${examId}/autosave/?part=${part}`);
+};
+
+/**
+ * Nộp bài thi từ câu trả lời đã lưu tạm
+ * @param {string} examId - ID của bài thi
+ * @param {object} finalizeData - { duration: 123 }
+ */
+export const finalizeExam = async (examId, finalizeData) => {
+  return apiRequest(`${EXAM_BASE_ENDPOINT}/exams/${examId}/finalize/`, {
+    method: 'POST',
+    body: JSON.stringify(finalizeData),
+  });
+};
+
+/**
+ * Nộp bài listening từ câu trả lời đã lưu tạm
+ * @param {string} examId - ID của bài thi
+ * @param {object} finalizeData - { exam_result_id: 'xxx', duration: 123 }
+ */
+export const finalizeListeningExam = async (examId, finalizeData) => {
+  return apiRequest(`${EXAM_BASE_ENDPOINT}/exams/${examId}/finalize-listening/`, {
+    method: 'POST',
+    body: JSON.stringify(finalizeData),
+  });
+};
@@ -11,11 +11,18 @@ import { apiRequest } from '../apiService.js';
 const RESULTS_BASE_ENDPOINT = '/student/exam-results';
 
 /**
- * Lấy lịch sử bài làm của học sinh (từ API mới)
+ * Lấy lịch sử bài làm của học sinh (từ API mới), từng trang
+ * @param {string | null} cursor - 'next_cursor' của trang trước (bỏ trống = trang đầu)
+ * @param {number} [limit] - Số dòng mỗi trang (mặc định do backend quyết định)
+ * @returns {{results: Array, next_cursor: string | null}}
  */
-export const getExamHistory = async () => {
-  // GET /student/results/history/
-  return apiRequest(`${RESULTS_BASE_ENDPOINT}/history/`);
+export const getExamHistory = async (cursor = null, limit) => {
+  // GET /student/results/history/?limit=&cursor=
+  const params = new URLSearchParams();
+  if (limit) params.set('limit', limit);
+  if (cursor) params.set('cursor', cursor);
+  const queryString = params.toString() ? `?${params.toString()}` : '';
+  return apiRequest(`${RESULTS_BASE_ENDPOINT}/history/${queryString}`);
 };
 
 /**
@@ -26,4 +33,45 @@ export const getExamHistory = async () => {
 export const getExamResultDetail = async (examResultId) => {
   // GET /student/results/<exam_result_id>/
   return apiRequest(`${RESULTS_BASE_ENDPOINT}/${examResultId}/`);
-};
\ No newline at end of file
+};
+/**
+ * REVIEW GỌN: chỉ metadata, lựa chọn của học sinh và content version của đề
+ * @param {string | number} examResultId - ID của *kết quả* bài làm
+ * @returns {{result_info: Object, content_version: number, choices: Object<string, Array>}}
+ */
+export const getExamResultChoices = async (examResultId) => {
+  // GET /student/results/<exam_result_id>/choices/
+  return apiRequest(`${RESULTS_BASE_ENDPOINT}/${examResultId}/choices/`);
+};
+
+/**
+ * Gộp lựa chọn (getExamResultChoices) vào đề thi đã tải (getFullExamData) -> cùng dạng
+ * với 'exam_content' của getExamResultDetail. Không sửa examContent (trả về bản sao).
+ * Chỉ dùng khi examContent.content_version === content_version của bài làm.
+ */
+export const mergeReviewChoices = (examContent, choices) => ({
+  ...examContent,
+  sections: (examContent.sections || []).map((section) => ({
+    ...section,
+    question_types: (section.question_types || []).map((qt) => ({
+      ...qt,
+      questions: (qt.questions || []).map((q) => {
+        if (!q) return q;
+        const chosen = choices[q.id];
+        const chosenData = qt.is_Sort_Question
+          ? (chosen || null)
+          : (chosen && chosen.length ? chosen[chosen.length - 1] : null);
+        return {
+          ...q,
+          student_chosen_answer_id: chosenData,
+          ...(q.answers && {
+            answers: q.answers.map((a) => a && ({
+              ...a,
+              is_student_choice: Array.isArray(chosenData) ? chosenData.includes(a.id) : a.id === chosenData,
+            })),
+          }),
+        };
+      }),
+    })),
+  })),
+});